@@ -0,0 +1,186 @@
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, insert, select, text
+
+from ..database import retry_on_locked
+from ..models import db, ConfigChange
+
+logger = logging.getLogger(__name__)
+
+# Verrou Postgres sérialisant les écritures du journal jusqu'au commit : les
+# versions deviennent visibles dans l'ordre, aucun lecteur ne saute un id
+FEED_LOCK_KEY = 7261
+
+
+def record_changes(conn, guild_ids, now=None):
+    """Ajoute une version par serveur modifié, dans la transaction en cours"""
+    if not guild_ids:
+        return
+    if conn.dialect.name == 'postgresql':
+        conn.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': FEED_LOCK_KEY})
+    now = now or datetime.utcnow()
+    conn.execute(insert(ConfigChange.__table__),
+                 [{'guild_id': guild_id, 'changed_at': now} for guild_id in sorted(guild_ids)])
+
+
+def current_version():
+    return db.session.query(func.max(ConfigChange.id)).scalar() or 0
+
+
+def pruned_through():
+    """Dernière version purgée : tout ce qui précède la plus ancienne restante"""
+    first = db.session.query(func.min(ConfigChange.id)).scalar()
+    return first - 1 if first else 0
+
+
+class ConfigChangeFeed:
+    """Flux des modifications de configs pour les abonnés en long-poll.
+
+    Un seul thread par processus lit le journal config_changes toutes les
+    `poll_interval` secondes (immédiatement après une écriture locale) et
+    garde les dernières versions en mémoire ; les abonnés attendent sur une
+    condition et filtrent en mémoire. Le nombre de requêtes ne dépend donc
+    pas du nombre d'abonnés. Les modifications faites par d'autres workers
+    passent par `on_change` (invalidation des caches) avant d'être diffusées.
+    """
+
+    def __init__(self, poll_interval=0.5, window=10000, retention=timedelta(days=1),
+                 prune_interval=3600, on_change=None):
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.prune_interval = prune_interval
+        self.on_change = on_change
+        self.app = None
+        self.version = 0
+        self.pruned_through = 0
+        self.polls = 0
+        self._changes = deque(maxlen=window)
+        self._floor = 0
+        self._cond = threading.Condition()
+        self._wakeup = threading.Event()
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self._last_prune = 0.0
+
+    def init_app(self, app):
+        self.app = app
+
+    def start(self):
+        """Lance le thread de lecture au premier abonné (les tables existent alors)"""
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            with self.app.app_context():
+                self.version = self._floor = current_version()
+                self.pruned_through = pruned_through()
+            self._thread = threading.Thread(target=self._run, name='config-feed', daemon=True)
+            self._thread.start()
+
+    def notify(self):
+        """Une écriture vient d'être validée dans ce processus : lire sans attendre"""
+        self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+            try:
+                self.poll()
+                if time.monotonic() - self._last_prune >= self.prune_interval:
+                    self._last_prune = time.monotonic()
+                    with self.app.app_context():
+                        self.prune()
+            except Exception:
+                logger.exception("Erreur flux des configs")
+
+    def poll(self):
+        """Lit les nouvelles versions et réveille les abonnés"""
+        with self.app.app_context():
+            rows = db.session.execute(
+                select(ConfigChange.id, ConfigChange.guild_id)
+                .where(ConfigChange.id > self.version).order_by(ConfigChange.id)
+            ).all()
+            db.session.commit()
+        self.polls += 1
+        if not rows:
+            return 0
+        if self.on_change is not None:
+            for guild_id in {guild_id for _, guild_id in rows}:
+                self.on_change(guild_id)
+        with self._cond:
+            for version, guild_id in rows:
+                if len(self._changes) == self._changes.maxlen:
+                    self._floor = self._changes[0][0]
+                self._changes.append((version, guild_id))
+            self.version = rows[-1][0]
+            self._cond.notify_all()
+        return len(rows)
+
+    @retry_on_locked
+    def prune(self):
+        """Supprime les versions plus anciennes que `retention`.
+
+        La dernière version est toujours gardée : elle porte la version
+        courante et la limite de purge (MIN(id) - 1) lue par les autres workers.
+        """
+        cutoff = datetime.utcnow() - self.retention
+        last_id = db.session.query(func.max(ConfigChange.id)).filter(ConfigChange.changed_at < cutoff).scalar()
+        if last_id:
+            last_id = min(last_id, current_version() - 1)
+            db.session.execute(delete(ConfigChange).where(ConfigChange.id <= last_id))
+        # Purges faites par les autres workers comprises
+        through = pruned_through()
+        db.session.commit()
+        self.pruned_through = max(self.pruned_through, through)
+
+    def _collect(self, since, accept):
+        # Dernière version de chaque serveur suivi, modifié après `since`
+        changed = {}
+        for version, guild_id in reversed(self._changes):
+            if version <= since:
+                break
+            if guild_id not in changed and accept(guild_id):
+                changed[guild_id] = version
+        return changed
+
+    def _collect_from_db(self, since, accept, until):
+        changed = {}
+        rows = db.session.execute(
+            select(ConfigChange.id, ConfigChange.guild_id)
+            .where(ConfigChange.id > since, ConfigChange.id <= until).order_by(ConfigChange.id)
+        )
+        for version, guild_id in rows:
+            if accept(guild_id):
+                changed[guild_id] = version
+        return changed
+
+    def wait(self, since, accept, timeout):
+        """Attend des modifications après la version `since`.
+
+        Retourne (version, {guild_id: version}, reset). `version` est la
+        version à repasser en `since` ; reset vaut True si des versions
+        postérieures à `since` ont été purgées : l'abonné doit alors tout
+        relire (export groupé) puis reprendre à la version retournée.
+        """
+        self.start()
+        if since is None:
+            return self.version, {}, False
+        if since < self.pruned_through:
+            return self.version, {}, True
+        if since < self._floor:
+            # Reprise après une longue coupure : au-delà de la fenêtre en mémoire
+            until = self.version
+            return until, self._collect_from_db(since, accept, until), False
+
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                changed = self._collect(since, accept)
+                remaining = deadline - time.monotonic()
+                if changed or remaining <= 0:
+                    return max(since, self.version), changed, False
+                self._cond.wait(remaining)
@@ -1,43 +1,644 @@
-from flask import Blueprint, request, jsonify
-from ..models import db, GuildConfig
-from functools import wraps
-import os
-
-config_api = Blueprint('config_api', __name__)
-
-API_KEY = os.getenv('DASHBOARD_API_KEY', 'your-secret-key')
-
-def require_api_key(f):
-    @wraps(f)
-    def decorated(*args, **kwargs):
-        if request.headers.get('X-API-Key') != API_KEY:
-            return jsonify({'error': 'Unauthorized'}), 403
-        return f(*args, **kwargs)
-    return decorated
-
-@config_api.route('/guild/<guild_id>/config', methods=['GET'])
-@require_api_key
-def get_guild_config(guild_id):
-    """Endpoint pour que le bot récupère la config d'un serveur"""
-    config = GuildConfig.query.filter_by(guild_id=guild_id).first()
-    if config:
-        return jsonify(config.to_dict())
-    return jsonify({'error': 'Not found'}), 404
-
-@config_api.route('/guild/<guild_id>/config', methods=['POST'])
-@require_api_key
-def update_guild_config(guild_id):
-    """Le bot peut mettre à jour la config depuis ses actions"""
-    data = request.json
-    config = GuildConfig.query.filter_by(guild_id=guild_id).first()
-    if not config:
-        config = GuildConfig(guild_id=guild_id)
-        db.session.add(config)
-    
-    # Mettre à jour les champs
-    for key, value in data.items():
-        if hasattr(config, key):
-            setattr(config, key, value)
-    
-    db.session.commit()
-    return jsonify({'success': True})
\ No newline at end of file
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from sqlalchemy import BigInteger, cast, event, func
+from sqlalchemy.orm import Session
+from ..automod import AUTOMOD_FIELDS, get_matcher
+from ..giveaway_draw import (MAX_ENTRANT_WEIGHT, MAX_SEED_LENGTH, add_entrants, count_entrants,
+                             list_draws, run_draw)
+from ..custom_commands import (command_index, commands_by_guild, delete_command, invalidate_command_index,
+                               list_commands, normalize_trigger, replace_commands, set_command,
+                               validate_command, validate_commands)
+from ..models import CONFIG_DEFAULTS, Giveaway, GuildConfig, compact_config
+from ..timestamps import parse_timestamp
+from .changes import ConfigChangeFeed, current_version, record_changes
+from .events import ingest_events, parse_events, text_field
+from .write_buffer import COUNTER_FIELDS, ConfigWriteBuffer, check_value, clean_patch
+from cache import LRUCache
+from metrics import INGESTED_EVENTS
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from functools import wraps
+from itertools import chain
+import hashlib
+import io
+import json
+import math
+import os
+
+config_api = Blueprint('config_api', __name__)
+
+API_KEY = os.getenv('DASHBOARD_API_KEY', 'your-secret-key')
+
+# Cache des configs sérialisées : guild_id -> {format: (corps JSON, ETag)}.
+# Le TTL borne la durée pendant laquelle un autre worker peut servir une
+# config modifiée ailleurs ; dans ce processus, chaque écriture invalide.
+config_cache = LRUCache(
+    maxsize=int(os.getenv('CONFIG_CACHE_SIZE', 4096)),
+    ttl=float(os.getenv('CONFIG_CACHE_TTL', 30))
+)
+_invalidations = defaultdict(int)
+
+# Nombre d'ids par requête IN (limite de paramètres de SQLite)
+BULK_CHUNK_SIZE = 500
+
+# Nombre maximal d'événements par lot NDJSON (POST /api/events)
+INGEST_MAX_EVENTS = int(os.getenv('INGEST_MAX_EVENTS', 10000))
+
+# Lignes rejetées détaillées dans la réponse d'une ingestion de participants
+ENTRANTS_MAX_ERRORS = 100
+
+# Nombre maximal de messages par appel à l'automodération
+AUTOMOD_MAX_MESSAGES = int(os.getenv('AUTOMOD_MAX_MESSAGES', 10000))
+
+# Format compact, demandé par le bot avec Accept : seuls les champs
+# différents des valeurs par défaut (GET /api/guilds/config/defaults)
+COMPACT_MIMETYPE = 'application/vnd.paradise.config.compact+json'
+
+def require_api_key(f):
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        if request.headers.get('X-API-Key') != API_KEY:
+            return jsonify({'error': 'Unauthorized'}), 403
+        return f(*args, **kwargs)
+    return decorated
+
+def invalidate_guild_config(guild_id):
+    """Retire la config d'un serveur du cache"""
+    _invalidations[guild_id] += 1
+    config_cache.invalidate(guild_id)
+    # L'index des commandes dépend du préfixe
+    invalidate_command_index(guild_id)
+
+# Flux des modifications pour les bots abonnés (GET/POST /api/guilds/config/changes)
+config_feed = ConfigChangeFeed(
+    poll_interval=float(os.getenv('CONFIG_FEED_POLL_INTERVAL', 0.5)),
+    retention=timedelta(hours=float(os.getenv('CONFIG_FEED_RETENTION_HOURS', 24))),
+    on_change=invalidate_guild_config
+)
+config_api.record_once(lambda state: config_feed.init_app(state.app))
+# Durée d'attente d'un abonné sans modification (long-poll). Le maximum
+# reste sous le timeout des workers gunicorn (30 s par défaut), qui tuerait
+# la requête. Chaque abonné occupe un thread pendant l'attente : lancer
+# gunicorn avec des workers gthread (--threads) ou gevent, pas sync.
+CONFIG_FEED_DEFAULT_WAIT = 20
+CONFIG_FEED_MAX_WAIT = float(os.getenv('CONFIG_FEED_MAX_WAIT', 25))
+
+def _config_written(guild_id):
+    invalidate_guild_config(guild_id)
+    config_feed.notify()
+
+# Écritures du bot regroupées et appliquées en une transaction par intervalle
+write_buffer = ConfigWriteBuffer(
+    flush_interval=float(os.getenv('CONFIG_FLUSH_INTERVAL', 1)),
+    max_pending=int(os.getenv('CONFIG_FLUSH_MAX_PENDING', 1000)),
+    on_flush=_config_written
+)
+config_api.record_once(lambda state: write_buffer.init_app(state.app))
+
+def wants_compact():
+    """Le client a explicitement demandé le format compact"""
+    return any(value == COMPACT_MIMETYPE and quality > 0 for value, quality in request.accept_mimetypes)
+
+def _payload(values):
+    body = json.dumps(values, separators=(',', ':')).encode()
+    return body, hashlib.sha1(body).hexdigest()
+
+_defaults_payload = _payload(CONFIG_DEFAULTS)
+
+def get_config_payload(guild_id, compact=False):
+    """Retourne (corps JSON, ETag) de la config d'un serveur, ou None"""
+    # Lire ses propres écritures : appliquer celles encore en attente
+    if write_buffer.pending(guild_id):
+        write_buffer.flush()
+
+    fmt = 'compact' if compact else 'full'
+    payloads = config_cache.get(guild_id)
+    if payloads is not None:
+        return payloads[fmt]
+
+    generation = _invalidations[guild_id]
+    config = GuildConfig.query.filter_by(guild_id=guild_id).first()
+    if not config:
+        return None
+
+    values = config.to_dict()
+    payloads = {'full': _payload(values), 'compact': _payload(compact_config(values))}
+    # Ne pas mettre en cache une lecture dépassée par une écriture concurrente
+    if _invalidations[guild_id] == generation:
+        config_cache.set(guild_id, payloads)
+    return payloads[fmt]
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changed_configs(session, flush_context):
+    flushed = {
+        obj.guild_id for obj in chain(session.new, session.dirty, session.deleted)
+        if isinstance(obj, GuildConfig) and (obj not in session.dirty or session.is_modified(obj))
+    }
+    if flushed:
+        session.info.setdefault('changed_guild_configs', set()).update(flushed)
+        # Nouvelle version dans la même transaction que l'écriture
+        record_changes(session.connection(), flushed)
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_changed_configs(session):
+    # Invalider après le commit pour ne pas remettre en cache l'ancienne version
+    changed = session.info.pop('changed_guild_configs', ())
+    for guild_id in changed:
+        invalidate_guild_config(guild_id)
+    if changed:
+        config_feed.notify()
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_changed_configs(session):
+    session.info.pop('changed_guild_configs', None)
+
+@config_api.route('/guild/<guild_id>/config', methods=['GET'])
+@require_api_key
+def get_guild_config(guild_id):
+    """Endpoint pour que le bot récupère la config d'un serveur.
+
+    Supporte If-None-Match : si la config n'a pas changé, répond 304 sans corps.
+    Avec Accept: COMPACT_MIMETYPE, seuls les champs modifiés sont envoyés.
+    """
+    compact = wants_compact()
+    payload = get_config_payload(guild_id, compact=compact)
+    if payload is None:
+        return jsonify({'error': 'Not found'}), 404
+
+    body, etag = payload
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype=COMPACT_MIMETYPE if compact else 'application/json')
+    response.set_etag(etag)
+    response.vary.add('Accept')
+    return response
+
+@config_api.route('/guilds/config/defaults', methods=['GET'])
+@require_api_key
+def get_config_defaults():
+    """Valeurs par défaut des champs, pour compléter le format compact"""
+    body, etag = _defaults_payload
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    return response
+
+@config_api.route('/guild/<guild_id>/config', methods=['POST'])
+@require_api_key
+def update_guild_config(guild_id):
+    """Le bot peut mettre à jour la config depuis ses actions.
+
+    Seuls les champs de WRITABLE_FIELDS sont pris en compte, et chaque valeur
+    doit correspondre au type et à la longueur de sa colonne (400 sinon).
+    L'écriture est différée et regroupée avec les autres (voir ConfigWriteBuffer).
+    custom_commands ({trigger: réponse}) remplace toutes les commandes du
+    serveur dans la table custom_commands, immédiatement.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'JSON object attendu'}), 400
+
+    data = dict(data)
+    commands = data.pop('custom_commands', None)
+    try:
+        patch, ignored = clean_patch(data)
+        if commands is not None:
+            commands = validate_commands(commands)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if patch:
+        write_buffer.patch(guild_id, patch)
+    if commands is not None:
+        replace_commands(guild_id, commands)
+        _config_written(guild_id)
+    return jsonify({'success': True, 'ignored': ignored})
+
+def parse_counters(data):
+    """Valide un dict d'incréments de compteurs (entiers bornés comme la colonne)"""
+    counters = {key: value for key, value in data.items() if key != 'guild_id'}
+    columns = GuildConfig.__table__.columns
+    for key, value in counters.items():
+        if key not in COUNTER_FIELDS or value is None:
+            raise ValueError(f'compteur invalide: {key}')
+        check_value(columns[key], value)
+    return counters
+
+@config_api.route('/guild/<guild_id>/counters', methods=['POST'])
+@require_api_key
+def increment_guild_counters(guild_id):
+    """Incrémente les compteurs de modération, ex. {"total_warns": 1}"""
+    data = request.get_json(silent=True)
+    try:
+        counters = parse_counters(data if isinstance(data, dict) else {})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    write_buffer.increment(guild_id, counters)
+    return jsonify({'success': True})
+
+@config_api.route('/guilds/counters', methods=['POST'])
+@require_api_key
+def increment_counters_batch():
+    """Incréments groupés : [{"guild_id": "...", "total_bans": 1}, ...]"""
+    events = request.get_json(silent=True)
+    if not isinstance(events, list):
+        return jsonify({'error': 'Liste JSON attendue'}), 400
+    try:
+        batch = [(str(event['guild_id']), parse_counters(event)) for event in events]
+    except (KeyError, TypeError, ValueError, AttributeError) as e:
+        return jsonify({'error': f'Événement invalide: {e}'}), 400
+    for guild_id, counters in batch:
+        write_buffer.increment(guild_id, counters)
+    return jsonify({'success': True, 'accepted': len(batch)})
+
+@config_api.route('/guild/<guild_id>/commands', methods=['GET'])
+@require_api_key
+def get_custom_commands(guild_id):
+    """Commandes personnalisées d'un serveur, triées par trigger"""
+    return jsonify({'commands': [command.to_dict() for command in list_commands(guild_id)]})
+
+@config_api.route('/guild/<guild_id>/commands/resolve', methods=['GET'])
+@require_api_key
+def resolve_custom_command(guild_id):
+    """Commande appelée par un message (?message=!regles), ou command: null.
+
+    Le message est comparé au préfixe et aux triggers du serveur en un seul
+    parcours (voir CommandTrie) ; les arguments sont le texte qui suit.
+    """
+    message = request.args.get('message', '')
+    if write_buffer.pending(guild_id):
+        write_buffer.flush()
+    index = command_index(guild_id)
+    if index is None:
+        return jsonify({'error': 'Not found'}), 404
+    return jsonify({'command': index.resolve(message)})
+
+@config_api.route('/guild/<guild_id>/commands/<path:trigger>', methods=['PUT'])
+@require_api_key
+def put_custom_command(guild_id, trigger):
+    """Crée ou modifie une seule commande : {"response": "..."}"""
+    data = request.get_json(silent=True)
+    try:
+        trigger, response = validate_command(trigger, data.get('response') if isinstance(data, dict) else None)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    command, created = set_command(guild_id, trigger, response)
+    _config_written(guild_id)
+    return jsonify(command.to_dict()), 201 if created else 200
+
+@config_api.route('/guild/<guild_id>/commands/<path:trigger>', methods=['DELETE'])
+@require_api_key
+def delete_custom_command(guild_id, trigger):
+    if not delete_command(guild_id, normalize_trigger(trigger)):
+        return jsonify({'error': 'Not found'}), 404
+    _config_written(guild_id)
+    return jsonify({'success': True})
+
+def get_automod_matcher(guild_id):
+    """Règles d'automodération compilées d'un serveur, ou None"""
+    if write_buffer.pending(guild_id):
+        write_buffer.flush()
+    settings = GuildConfig.query.with_entities(
+        *(getattr(GuildConfig, field) for field in AUTOMOD_FIELDS)
+    ).filter_by(guild_id=guild_id).first()
+    return get_matcher(settings) if settings is not None else None
+
+@config_api.route('/guild/<guild_id>/automod/evaluate', methods=['POST'])
+@require_api_key
+def evaluate_automod(guild_id):
+    """Teste un lot de messages contre l'automodération du serveur.
+
+    Corps : {"messages": [{"id": "...", "content": "..."}, ...]} (ou des
+    textes). Seuls les messages en infraction sont renvoyés, avec leur
+    position dans le lot, la règle déclenchée et l'action à appliquer.
+    """
+    data = request.get_json(silent=True)
+    messages = data.get('messages') if isinstance(data, dict) else data
+    if not isinstance(messages, list):
+        return jsonify({'error': 'Liste de messages attendue'}), 400
+    if len(messages) > AUTOMOD_MAX_MESSAGES:
+        return jsonify({'error': f'Lot trop grand (max {AUTOMOD_MAX_MESSAGES} messages)'}), 413
+
+    matcher = get_automod_matcher(guild_id)
+    if matcher is None:
+        return jsonify({'error': 'Not found'}), 404
+    return jsonify({'checked': len(messages), 'flagged': matcher.evaluate(messages)})
+
+def parse_guild_ids(guild_ids):
+    """Liste d'ids de serveurs, en liste JSON ou "1,2,3" (None si absente)"""
+    if guild_ids is None:
+        return None
+    if isinstance(guild_ids, str):
+        guild_ids = [guild_id for guild_id in guild_ids.split(',') if guild_id]
+    return [str(guild_id) for guild_id in guild_ids]
+
+def request_params():
+    """Paramètres de la requête : corps JSON (objet) ou, sans corps, query string"""
+    data = request.get_json(silent=True)
+    if data is None:
+        return request.args
+    if not isinstance(data, dict):
+        raise ValueError('objet JSON attendu')
+    return data or request.args
+
+def bulk_config_queries(params):
+    """Construit la ou les requêtes de l'export groupé à partir des paramètres"""
+    query = GuildConfig.query.order_by(GuildConfig.id)
+
+    if params.get('changed_since') is not None:
+        since = parse_timestamp(params['changed_since'])
+        query = query.filter(func.coalesce(GuildConfig.updated_at, GuildConfig.created_at) >= since)
+
+    if params.get('shard_count') is not None:
+        # Formule de sharding Discord : (guild_id >> 22) % shard_count
+        shard_id, shard_count = int(params['shard_id']), int(params['shard_count'])
+        if not 0 <= shard_id < shard_count:
+            raise ValueError('shard_id doit être compris entre 0 et shard_count - 1')
+        shard = cast(GuildConfig.guild_id, BigInteger).op('>>')(22).op('%')(shard_count)
+        return [query.filter(shard == shard_id)]
+
+    guild_ids = parse_guild_ids(params.get('guild_ids'))
+    if guild_ids is not None:
+        return [
+            query.filter(GuildConfig.guild_id.in_(guild_ids[i:i + BULK_CHUNK_SIZE]))
+            for i in range(0, len(guild_ids), BULK_CHUNK_SIZE)
+        ]
+
+    if params.get('changed_since') is None:
+        raise ValueError('guild_ids, shard_id/shard_count ou changed_since requis')
+    return [query]
+
+@config_api.route('/guilds/config', methods=['GET', 'POST'])
+@require_api_key
+def bulk_guild_configs():
+    """Export groupé des configs en NDJSON (une config par ligne).
+
+    Paramètres (JSON ou query string) : guild_ids (liste ou "1,2,3"), ou
+    shard_id + shard_count, et/ou changed_since (timestamp Unix ou ISO).
+    L'en-tête X-Sync-Timestamp est la valeur à repasser en changed_since
+    à la prochaine synchronisation ; X-Config-Version, celle à passer en
+    since au flux des modifications. Avec Accept: COMPACT_MIMETYPE, chaque
+    ligne est au format compact.
+    """
+    try:
+        params = request_params()
+    except ValueError as e:
+        return jsonify({'error': f'Paramètres invalides: {e}'}), 400
+    if write_buffer.pending():
+        write_buffer.flush()
+    sync_timestamp = datetime.utcnow()
+    # Lue avant l'export : une modification pendant l'export sera renvoyée par le flux
+    config_version = current_version()
+    try:
+        queries = bulk_config_queries(params)
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': f'Paramètres invalides: {e}'}), 400
+
+    serialize = GuildConfig.to_compact_dict if wants_compact() else GuildConfig.to_dict
+
+    def generate():
+        for query in queries:
+            chunk = []
+            for config in query.yield_per(BULK_CHUNK_SIZE):
+                chunk.append(config)
+                if len(chunk) >= BULK_CHUNK_SIZE:
+                    yield serialize_chunk(chunk)
+                    chunk = []
+            if chunk:
+                yield serialize_chunk(chunk)
+
+    def serialize_chunk(configs):
+        # Commandes de tout le lot en une requête
+        commands = commands_by_guild([config.guild_id for config in configs])
+        return ''.join(json.dumps(serialize(config, commands[config.guild_id]), separators=(',', ':')) + '\n'
+                       for config in configs)
+
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    response.headers['X-Sync-Timestamp'] = sync_timestamp.isoformat()
+    response.headers['X-Config-Version'] = str(config_version)
+    response.vary.add('Accept')
+    return response
+
+def schedule_ingested_giveaways(events):
+    """Tient le planificateur de ce processus à jour (les autres le lisent en base)"""
+    scheduler = current_app.extensions.get('giveaway_scheduler')
+    if scheduler is None:
+        return
+    for _, event_type, row in events:
+        if event_type != 'giveaway':
+            continue
+        if row['ended'] or row['end_time'] is None:
+            scheduler.cancel(row['message_id'])
+        else:
+            scheduler.schedule(row['message_id'], row['end_time'])
+
+@config_api.route('/events', methods=['POST'])
+@require_api_key
+def ingest_bot_events():
+    """Ingestion des événements du bot en NDJSON (un événement par ligne).
+
+    Chaque ligne porte un event_id (clé d'idempotence) et un type :
+    moderation, giveaway ou log. Le lot est écrit en une transaction ;
+    l'accusé de réception compte les événements acceptés, les doublons
+    (déjà reçus, ignorés) et liste les lignes rejetées. Un lot sans accusé
+    peut être renvoyé tel quel. L'en-tête X-Batch-Id est renvoyé dans l'accusé.
+    """
+    lines = request.get_data().splitlines()
+    if len(lines) > INGEST_MAX_EVENTS:
+        return jsonify({'error': f'Lot trop grand (max {INGEST_MAX_EVENTS} événements)'}), 413
+
+    events, duplicates, rejected = parse_events(lines)
+    inserted = ingest_events(events)
+    schedule_ingested_giveaways(inserted)
+
+    accepted = Counter(event_type for _, event_type, _ in inserted)
+    for event_type, count in accepted.items():
+        INGESTED_EVENTS.inc(event_type, 'accepted', amount=count)
+    duplicates += len(events) - len(inserted)
+    if duplicates:
+        INGESTED_EVENTS.inc('all', 'duplicate', amount=duplicates)
+    if rejected:
+        INGESTED_EVENTS.inc('all', 'rejected', amount=len(rejected))
+
+    return jsonify({
+        'batch_id': request.headers.get('X-Batch-Id'),
+        'accepted': len(inserted),
+        'duplicates': duplicates,
+        'rejected': rejected
+    })
+
+def parse_entrants(lines, role_required, rejected):
+    """Valide un flux NDJSON de participants, ligne par ligne.
+
+    Chaque ligne : {"user_id": "...", "roles": ["..."], "weight": 1}. Si le
+    giveaway exige un rôle, il doit figurer dans roles. Génère des tuples
+    (user_id, weight) ; les rejets sont comptés dans `rejected`
+    ({'count', 'errors'}, les ENTRANTS_MAX_ERRORS premiers détaillés).
+    """
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            entrant = json.loads(line)
+            if not isinstance(entrant, dict):
+                raise ValueError('objet JSON attendu')
+            user_id = text_field(entrant, 'user_id', 80, required=True)
+            weight = int(entrant.get('weight', 1))
+            if not 1 <= weight <= MAX_ENTRANT_WEIGHT:
+                raise ValueError(f'weight doit être compris entre 1 et {MAX_ENTRANT_WEIGHT}')
+            if role_required and role_required not in map(str, entrant.get('roles') or ()):
+                raise ValueError(f'rôle requis manquant: {role_required}')
+        except (TypeError, ValueError, OverflowError) as e:
+            rejected['count'] += 1
+            if len(rejected['errors']) < ENTRANTS_MAX_ERRORS:
+                rejected['errors'].append({'line': number, 'error': str(e)})
+            continue
+        yield user_id, weight
+
+@config_api.route('/giveaway/<message_id>/entrants', methods=['POST'])
+@require_api_key
+def ingest_giveaway_entrants(message_id):
+    """Ingestion des participants d'un giveaway en NDJSON (un par ligne).
+
+    Le corps est lu au fil de l'eau et écrit par lots : un giveaway de
+    plusieurs centaines de milliers de participants peut être envoyé en une
+    requête. Les participants déjà inscrits sont ignorés (renvoi possible).
+    """
+    giveaway = Giveaway.query.filter_by(message_id=message_id).first()
+    if giveaway is None:
+        return jsonify({'error': 'Not found'}), 404
+    if giveaway.ended:
+        return jsonify({'error': 'Giveaway terminé'}), 409
+
+    rejected = {'count': 0, 'errors': []}
+    received = [0]
+
+    def entrants():
+        # request.stream lit ligne par ligne octet par octet : le tamponner
+        lines = io.BufferedReader(request.stream, buffer_size=64 * 1024)
+        for entrant in parse_entrants(lines, giveaway.role_required, rejected):
+            received[0] += 1
+            yield entrant
+
+    added, total = add_entrants(giveaway.id, entrants(), datetime.utcnow())
+    return jsonify({
+        'accepted': added,
+        'duplicates': received[0] - added,
+        'rejected': rejected['count'],
+        'errors': rejected['errors'],
+        'entrants': total
+    })
+
+def _draw_giveaway(message_id, reroll):
+    giveaway = Giveaway.query.filter_by(message_id=message_id).first()
+    if giveaway is None:
+        return jsonify({'error': 'Not found'}), 404
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        data = {}
+    try:
+        count = int(data.get('count', 1 if reroll else giveaway.winners_count or 1))
+        if count < 1:
+            raise ValueError('count doit être positif')
+        seed = text_field(data, 'seed', MAX_SEED_LENGTH)
+        # La graine sert de clé blake2b : 64 octets au plus une fois encodée
+        if seed is not None and len(seed.encode()) > MAX_SEED_LENGTH:
+            raise ValueError('seed trop long')
+    except (TypeError, ValueError, OverflowError) as e:
+        return jsonify({'error': f'Paramètres invalides: {e}'}), 400
+    try:
+        draw = run_draw(giveaway, count, seed=seed, reroll=reroll)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 409
+    return jsonify(draw.to_dict()), 201
+
+@config_api.route('/giveaway/<message_id>/draw', methods=['POST'])
+@require_api_key
+def draw_giveaway(message_id):
+    """Tirage initial : {"count": winners_count, "seed": aléatoire} (optionnels).
+
+    Le tirage est reproductible : la même graine sur les mêmes participants
+    donne les mêmes gagnants, quel que soit l'ordre de lecture.
+    """
+    return _draw_giveaway(message_id, reroll=False)
+
+@config_api.route('/giveaway/<message_id>/reroll', methods=['POST'])
+@require_api_key
+def reroll_giveaway(message_id):
+    """Relance : {"count": 1} gagnants de plus, hors gagnants des tirages précédents"""
+    return _draw_giveaway(message_id, reroll=True)
+
+@config_api.route('/giveaway/<message_id>/draws', methods=['GET'])
+@require_api_key
+def get_giveaway_draws(message_id):
+    """Historique des tirages (graines comprises) pour l'audit"""
+    giveaway = Giveaway.query.filter_by(message_id=message_id).first()
+    if giveaway is None:
+        return jsonify({'error': 'Not found'}), 404
+    return jsonify({
+        'message_id': message_id,
+        'entrants': count_entrants(giveaway.id),
+        'role_required': giveaway.role_required,
+        'draws': [draw.to_dict() for draw in list_draws(giveaway.id)]
+    })
+
+def shard_filter(shard_id, shard_count):
+    """Serveurs d'un shard Discord : (guild_id >> 22) % shard_count == shard_id"""
+    if not 0 <= shard_id < shard_count:
+        raise ValueError('shard_id doit être compris entre 0 et shard_count - 1')
+
+    def accept(guild_id):
+        try:
+            return (int(guild_id) >> 22) % shard_count == shard_id
+        except ValueError:
+            return False
+    return accept
+
+def subscription_filter(params):
+    """Serveurs suivis par un abonné : guild_ids, ou shard_id + shard_count"""
+    if params.get('shard_count') is not None:
+        return shard_filter(int(params['shard_id']), int(params['shard_count']))
+    guild_ids = parse_guild_ids(params.get('guild_ids'))
+    if guild_ids is None:
+        raise ValueError('guild_ids ou shard_id/shard_count requis')
+    return set(guild_ids).__contains__
+
+@config_api.route('/guilds/config/changes', methods=['GET', 'POST'])
+@require_api_key
+def config_changes():
+    """Flux des modifications de configs, en long-poll.
+
+    Paramètres (JSON ou query string) : guild_ids ou shard_id + shard_count,
+    since (dernière version reçue, ou X-Config-Version de l'export groupé)
+    et timeout (secondes, 20 par défaut, CONFIG_FEED_MAX_WAIT au plus). La réponse arrive dès qu'un
+    serveur suivi est modifié après `since`, ou à l'expiration du délai :
+    {"version": ..., "reset": false, "changes": [{"guild_id", "version", "config"}]}.
+    Repasser `version` en since à l'appel suivant, y compris après une
+    reconnexion. Avec reset: true, les versions manquées ont été purgées :
+    refaire un export groupé. Sans since, retourne la version courante.
+    """
+    try:
+        params = request_params()
+        accept = subscription_filter(params)
+        since = int(params['since']) if params.get('since') is not None else None
+        timeout = float(params.get('timeout', CONFIG_FEED_DEFAULT_WAIT))
+        if not math.isfinite(timeout):
+            raise ValueError(f'timeout invalide: {timeout}')
+        timeout = min(max(timeout, 0), CONFIG_FEED_MAX_WAIT)
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': f'Paramètres invalides: {e}'}), 400
+
+    version, changed, reset = config_feed.wait(since, accept, timeout)
+
+    # Corps des configs repris tels quels depuis le cache (déjà sérialisés)
+    compact = wants_compact()
+    changes = []
+    for guild_id, guild_version in sorted(changed.items(), key=lambda item: item[1]):
+        payload = get_config_payload(guild_id, compact=compact)
+        config = payload[0].decode() if payload else 'null'
+        changes.append(f'{{"guild_id":{json.dumps(guild_id)},"version":{guild_version},"config":{config}}}')
+    body = f'{{"version":{version},"reset":{json.dumps(reset)},"changes":[{",".join(changes)}]}}'
+    response = Response(body, mimetype='application/json')
+    response.vary.add('Accept')
+    return response
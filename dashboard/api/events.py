@@ -0,0 +1,224 @@
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.exc import IntegrityError
+
+from ..database import dialect_insert, retry_on_locked
+from ..models import db, BotLog, Giveaway, IngestedEvent, ModerationLog
+from ..timestamps import parse_timestamp
+
+# Tables alimentées par type d'événement
+EVENT_TABLES = {
+    'moderation': ModerationLog.__table__,
+    'giveaway': Giveaway.__table__,
+    'log': BotLog.__table__,
+}
+
+# Colonnes d'un giveaway mises à jour quand le bot renvoie le même message_id
+GIVEAWAY_UPDATE_FIELDS = ('prize', 'winners_count', 'entrants', 'end_time', 'ended', 'role_required', 'updated_at')
+
+# Nombre de clés par requête IN (limite de paramètres de SQLite)
+CHUNK_SIZE = 500
+
+# Durée de conservation des clés d'idempotence : un renvoi plus tardif
+# du même événement serait inséré à nouveau
+EVENT_KEY_TTL = timedelta(hours=float(os.getenv('INGEST_KEY_TTL_HOURS', 72)))
+PRUNE_INTERVAL = 3600
+
+_last_prune = 0.0
+
+
+def text_field(event, field, max_length, required=False):
+    value = event.get(field)
+    if value is None:
+        if required:
+            raise ValueError(f'{field} manquant')
+        return None
+    value = str(value)
+    if len(value) > max_length:
+        raise ValueError(f'{field} trop long')
+    return value
+
+
+def int_field(event, field, default, minimum=0, maximum=2 ** 31 - 1):
+    value = int(event.get(field, default))
+    if not minimum <= value <= maximum:
+        raise ValueError(f'{field} doit être compris entre {minimum} et {maximum}')
+    return value
+
+
+def date_field(event, field, default=None):
+    value = event.get(field)
+    return parse_timestamp(value) if value is not None else default
+
+
+def parse_moderation_event(event, now):
+    return {
+        'guild_id': text_field(event, 'guild_id', 80, required=True),
+        'action_type': text_field(event, 'action_type', 50, required=True),
+        'user_id': text_field(event, 'user_id', 80, required=True),
+        'user_name': text_field(event, 'user_name', 100),
+        'moderator_id': text_field(event, 'moderator_id', 80, required=True),
+        'moderator_name': text_field(event, 'moderator_name', 100),
+        'reason': text_field(event, 'reason', 4000),
+        'duration': text_field(event, 'duration', 20),
+        'created_at': date_field(event, 'created_at', now)
+    }
+
+
+def parse_giveaway_event(event, now):
+    return {
+        'message_id': text_field(event, 'message_id', 80, required=True),
+        'guild_id': text_field(event, 'guild_id', 80, required=True),
+        'channel_id': text_field(event, 'channel_id', 80, required=True),
+        'prize': text_field(event, 'prize', 200, required=True),
+        'winners_count': int_field(event, 'winners_count', 1),
+        'entrants': int_field(event, 'entrants', 0),
+        'host_id': text_field(event, 'host_id', 80, required=True),
+        'host_name': text_field(event, 'host_name', 100),
+        'end_time': date_field(event, 'end_time'),
+        'ended': bool(event.get('ended', False)),
+        'role_required': text_field(event, 'role_required', 80),
+        'created_at': date_field(event, 'created_at', now),
+        'updated_at': now
+    }
+
+
+def parse_log_event(event, now):
+    data = event.get('data')
+    return {
+        'guild_id': text_field(event, 'guild_id', 80),
+        'level': text_field(event, 'level', 10) or 'info',
+        'category': text_field(event, 'category', 50),
+        'message': text_field(event, 'message', 4000, required=True),
+        'data': json.dumps(data, separators=(',', ':')) if data is not None else None,
+        'created_at': date_field(event, 'created_at', now)
+    }
+
+
+EVENT_PARSERS = {
+    'moderation': parse_moderation_event,
+    'giveaway': parse_giveaway_event,
+    'log': parse_log_event,
+}
+
+
+def parse_events(lines):
+    """Valide les lignes NDJSON d'un lot.
+
+    Retourne (événements, doublons, rejets) : les événements sont des tuples
+    (clé, type, ligne de table) ; une clé répétée dans le lot n'est gardée
+    qu'une fois ; les rejets donnent le numéro de ligne (à partir de 1).
+    Une ligne invalide (y compris une date ou un nombre hors limites) est
+    rejetée seule, sans faire échouer le lot.
+    """
+    now = datetime.utcnow()
+    events, rejected = [], []
+    seen = set()
+    duplicates = 0
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            event = json.loads(line)
+            if not isinstance(event, dict):
+                raise ValueError('objet JSON attendu')
+            key = text_field(event, 'event_id', 120, required=True)
+            parser = EVENT_PARSERS.get(event.get('type'))
+            if parser is None:
+                raise ValueError(f"type inconnu: {event.get('type')}")
+            row = parser(event, now)
+        except (TypeError, ValueError, OverflowError) as e:
+            rejected.append({'line': number, 'error': str(e)})
+            continue
+        if key in seen:
+            duplicates += 1
+            continue
+        seen.add(key)
+        events.append((key, event['type'], row))
+    return events, duplicates, rejected
+
+
+def _upsert(table, index_elements, update_fields):
+    """INSERT ... ON CONFLICT DO UPDATE sur les colonnes données"""
+    stmt = dialect_insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=index_elements,
+        set_={field: stmt.excluded[field] for field in update_fields}
+    )
+
+
+def _known_keys(keys):
+    known = set()
+    for i in range(0, len(keys), CHUNK_SIZE):
+        known.update(db.session.scalars(
+            select(IngestedEvent.key).where(IngestedEvent.key.in_(keys[i:i + CHUNK_SIZE]))
+        ))
+    return known
+
+
+@retry_on_locked
+def _store(events):
+    now = datetime.utcnow()
+    known = _known_keys([key for key, _, _ in events])
+    new = [event for event in events if event[0] not in known]
+    if new:
+        db.session.execute(insert(IngestedEvent.__table__), [{'key': key, 'received_at': now} for key, _, _ in new])
+        for event_type, table in EVENT_TABLES.items():
+            rows = [row for _, kind, row in new if kind == event_type]
+            if not rows:
+                continue
+            if event_type == 'giveaway':
+                # Dernier état de chaque giveaway du lot (Postgres refuse deux
+                # mises à jour de la même ligne dans une instruction)
+                rows = list({row['message_id']: row for row in rows}.values())
+                stmt = _upsert(table, ['message_id'], GIVEAWAY_UPDATE_FIELDS)
+            else:
+                stmt = insert(table)
+            # Une seule instruction pour toutes les lignes (executemany)
+            db.session.execute(stmt, rows)
+    db.session.commit()
+    return new
+
+
+def ingest_events(events):
+    """Enregistre un lot d'événements (clé, type, ligne) en une transaction.
+
+    Les clés déjà reçues sont ignorées : le bot peut renvoyer un lot dont il
+    n'a pas eu l'accusé de réception sans créer de doublons. Chaque table
+    reçoit ses lignes en un seul executemany ; les giveaways sont mis à jour
+    s'ils existent déjà (même message_id). Retourne les événements insérés.
+    """
+    if not events:
+        return []
+    for attempt in range(3):
+        try:
+            new = _store(events)
+            break
+        except IntegrityError:
+            # Même clé insérée entre-temps par un autre worker : relire les clés
+            db.session.rollback()
+            if attempt == 2:
+                raise
+    maybe_prune_keys()
+    return new
+
+
+@retry_on_locked
+def prune_keys(older_than=None):
+    """Supprime les clés d'idempotence plus anciennes que EVENT_KEY_TTL"""
+    older_than = older_than or datetime.utcnow() - EVENT_KEY_TTL
+    deleted = db.session.execute(delete(IngestedEvent).where(IngestedEvent.received_at < older_than)).rowcount
+    db.session.commit()
+    return deleted
+
+
+def maybe_prune_keys():
+    """Lance prune_keys au plus une fois toutes les PRUNE_INTERVAL secondes"""
+    global _last_prune
+    if time.monotonic() - _last_prune >= PRUNE_INTERVAL:
+        _last_prune = time.monotonic()
+        prune_keys()
@@ -0,0 +1,266 @@
+import atexit
+import logging
+import threading
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import Boolean, Integer, String, bindparam, func, insert, select, update
+
+from ..automod import validate_bad_words
+from ..database import is_retryable, retry_on_locked
+from .changes import record_changes
+from ..models import db, GuildConfig
+
+# Compteurs que le bot incrémente à chaque action de modération
+COUNTER_FIELDS = ('total_warns', 'total_kicks', 'total_bans', 'total_mutes')
+
+# Colonnes que le bot a le droit de modifier
+WRITABLE_FIELDS = frozenset(
+    column.name for column in GuildConfig.__table__.columns
+    if column.name not in ('id', 'guild_id', 'custom_commands', 'created_at', 'updated_at')
+)
+
+# Colonnes stockées en JSON, acceptées décodées ou en texte JSON : valeur validée
+# puis ré-encodée
+JSON_FIELDS = {'bad_words': validate_bad_words}
+
+# Bornes des colonnes entières (INTEGER 32 bits sous Postgres)
+INT_MIN, INT_MAX = -2 ** 31, 2 ** 31 - 1
+
+# Taille des lots pour vérifier l'existence des lignes (limite de paramètres SQLite)
+CHUNK_SIZE = 500
+
+
+logger = logging.getLogger(__name__)
+
+
+def check_value(column, value):
+    """Vérifie qu'une valeur peut être écrite dans la colonne (ValueError sinon)"""
+    if value is None:
+        if not column.nullable:
+            raise ValueError(f'{column.name} ne peut pas être null')
+        return
+    if isinstance(column.type, Boolean):
+        if not isinstance(value, bool):
+            raise ValueError(f'{column.name} doit être un booléen')
+    elif isinstance(column.type, Integer):
+        if not isinstance(value, int) or isinstance(value, bool):
+            raise ValueError(f'{column.name} doit être un entier')
+        if not INT_MIN <= value <= INT_MAX:
+            raise ValueError(f'{column.name} hors limites')
+    elif isinstance(column.type, String):
+        if not isinstance(value, str):
+            raise ValueError(f'{column.name} doit être une chaîne')
+        if column.type.length is not None and len(value) > column.type.length:
+            raise ValueError(f'{column.name} trop long (max {column.type.length})')
+
+
+def clean_patch(data):
+    """Sépare les champs modifiables des champs ignorés.
+
+    Chaque valeur est vérifiée selon le type et la longueur de sa colonne :
+    lève ValueError pour un champ qui ne pourrait pas être écrit, plutôt
+    que de faire échouer plus tard l'écriture groupée.
+    """
+    columns = GuildConfig.__table__.columns
+    patch, ignored = {}, []
+    for key, value in data.items():
+        if key not in WRITABLE_FIELDS:
+            ignored.append(key)
+            continue
+        if key in JSON_FIELDS:
+            value = JSON_FIELDS[key](value)
+        check_value(columns[key], value)
+        patch[key] = value
+    return patch, ignored
+
+
+class ConfigWriteBuffer:
+    """Écritures différées des configs de serveurs.
+
+    Les modifications de champs et les incréments de compteurs sont
+    regroupés en mémoire, puis écrits en une seule transaction toutes les
+    `flush_interval` secondes ou dès que `max_pending` événements attendent.
+    Les incréments utilisent `SET total_warns = total_warns + ?`, ce qui
+    reste correct avec plusieurs workers.
+    """
+
+    def __init__(self, flush_interval=1.0, max_pending=1000, on_flush=None):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.on_flush = on_flush
+        self.app = None
+        self._patches = {}
+        self._increments = {}
+        self._pending = 0
+        # Serveurs dont l'écriture est en cours (retirés de _patches, pas encore validés)
+        self._flushing = frozenset()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self.flushed_events = 0
+        self.flushes = 0
+
+    def init_app(self, app):
+        self.app = app
+        atexit.register(self.flush)
+
+    def patch(self, guild_id, fields):
+        """Met en attente des modifications de champs (dernière valeur gagnante)"""
+        with self._lock:
+            self._patches.setdefault(guild_id, {}).update(fields)
+            self._enqueued()
+
+    def increment(self, guild_id, counters):
+        """Met en attente des incréments de compteurs, ex. {'total_warns': 1}"""
+        with self._lock:
+            self._add_counters(guild_id, counters)
+            self._enqueued()
+
+    def _add_counters(self, guild_id, counters):
+        # Cumul borné : des incréments valides un par un ne doivent pas
+        # dépasser ensemble la taille de la colonne
+        pending = self._increments.setdefault(guild_id, Counter())
+        for field, delta in counters.items():
+            pending[field] = max(INT_MIN, min(INT_MAX, pending[field] + int(delta)))
+
+    def _enqueued(self):
+        self._pending += 1
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='config-writer', daemon=True)
+            self._thread.start()
+        if self._pending >= self.max_pending:
+            self._wakeup.set()
+
+    def pending(self, guild_id=None):
+        """Indique s'il reste des écritures en attente ou en cours (pour un serveur ou au total).
+
+        Une écriture en cours compte : flush() attend qu'elle soit validée.
+        """
+        with self._lock:
+            if guild_id is None:
+                return self._pending > 0 or bool(self._flushing)
+            return guild_id in self._patches or guild_id in self._increments or guild_id in self._flushing
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Erreur écriture des configs")
+
+    def flush(self):
+        """Écrit tout ce qui est en attente en une transaction.
+
+        Sur une erreur transitoire (base verrouillée), tout est remis en
+        attente pour le prochain essai. Sur une autre erreur, les serveurs
+        sont réécrits un par un : ceux qui échouent encore ne pourront
+        jamais être écrits, leurs modifications sont abandonnées et journalisées.
+        """
+        with self._flush_lock:
+            with self._lock:
+                patches, self._patches = self._patches, {}
+                increments, self._increments = self._increments, {}
+                events, self._pending = self._pending, 0
+                self._flushing = frozenset(patches) | frozenset(increments)
+            if not events:
+                return 0
+
+            try:
+                with self.app.app_context():
+                    self._write(patches, increments)
+            except Exception as e:
+                if is_retryable(e):
+                    self._requeue(patches, increments, events)
+                    raise
+                logger.warning("Écriture groupée des configs refusée (%s), reprise serveur par serveur", e)
+                with self.app.app_context():
+                    self._write_each(patches, increments)
+            finally:
+                with self._lock:
+                    self._flushing = frozenset()
+
+            if self.on_flush is not None:
+                for guild_id in set(patches) | set(increments):
+                    self.on_flush(guild_id)
+            self.flushes += 1
+            self.flushed_events += events
+            return events
+
+    def _write_each(self, patches, increments):
+        # Champs et compteurs écrits séparément : l'échec de l'un ne fait pas
+        # perdre l'autre, déjà accepté par l'API
+        for guild_id in set(patches) | set(increments):
+            parts = []
+            if guild_id in patches:
+                parts.append(({guild_id: patches[guild_id]}, {}))
+            if guild_id in increments:
+                parts.append(({}, {guild_id: increments[guild_id]}))
+            for patch, counters in parts:
+                try:
+                    self._write(patch, counters)
+                except Exception as e:
+                    if is_retryable(e):
+                        self._requeue(patch, counters, 1)
+                    else:
+                        logger.error("Modifications de la config %s abandonnées: %s (%s)",
+                                     guild_id, e, patch.get(guild_id) or counters.get(guild_id))
+
+    def _requeue(self, patches, increments, events):
+        with self._lock:
+            for guild_id, fields in patches.items():
+                self._patches[guild_id] = {**fields, **self._patches.get(guild_id, {})}
+            for guild_id, counters in increments.items():
+                self._add_counters(guild_id, counters)
+            self._pending += events
+
+    @retry_on_locked
+    def _write(self, patches, increments):
+        table = GuildConfig.__table__
+        now = datetime.utcnow()
+        guild_ids = list(set(patches) | set(increments))
+
+        with db.engine.begin() as conn:
+            # Créer les lignes manquantes (valeurs par défaut des colonnes)
+            existing = set()
+            for i in range(0, len(guild_ids), CHUNK_SIZE):
+                chunk = guild_ids[i:i + CHUNK_SIZE]
+                existing.update(conn.execute(
+                    select(table.c.guild_id).where(table.c.guild_id.in_(chunk))
+                ).scalars())
+            missing = [{'guild_id': guild_id} for guild_id in guild_ids if guild_id not in existing]
+            if missing:
+                conn.execute(insert(table), missing)
+
+            # Modifications de champs, regroupées par ensemble de colonnes
+            groups = {}
+            for guild_id, fields in patches.items():
+                groups.setdefault(tuple(sorted(fields)), []).append(
+                    {'b_guild_id': guild_id, 'b_updated_at': now,
+                     **{f'b_{key}': value for key, value in fields.items()}}
+                )
+            for keys, rows in groups.items():
+                stmt = update(table).where(table.c.guild_id == bindparam('b_guild_id')).values(
+                    updated_at=bindparam('b_updated_at'),
+                    **{key: bindparam(f'b_{key}') for key in keys}
+                )
+                conn.execute(stmt, rows)
+
+            # Incréments atomiques des compteurs
+            if increments:
+                stmt = update(table).where(table.c.guild_id == bindparam('b_guild_id')).values(
+                    updated_at=bindparam('b_updated_at'),
+                    **{field: func.coalesce(table.c[field], 0) + bindparam(f'b_{field}')
+                       for field in COUNTER_FIELDS}
+                )
+                conn.execute(stmt, [
+                    {'b_guild_id': guild_id, 'b_updated_at': now,
+                     **{f'b_{field}': counters.get(field, 0) for field in COUNTER_FIELDS}}
+                    for guild_id, counters in increments.items()
+                ])
+
+            # Nouvelle version de chaque config modifiée (flux /api/guilds/config/changes)
+            record_changes(conn, guild_ids, now)
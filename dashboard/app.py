@@ -1,375 +1,218 @@
-import os
-import sys
-from datetime import datetime
-from pathlib import Path
-
-# Ajouter le chemin du projet pour les imports
-sys.path.append(str(Path(__file__).parent.parent))
-
-from flask import Flask, render_template, redirect, url_for, request, flash, jsonify, session, render_template_string
-from flask_login import LoginManager, login_user, logout_user, login_required, current_user, UserMixin
-from flask_sqlalchemy import SQLAlchemy
-import requests
-from dotenv import load_dotenv
-
-# Importer les modules locaux
-try:
-    from bot_api import get_bot_stats, get_moderation_actions, get_active_giveaways
-except ImportError:
-    # Fonctions factices si le module n'existe pas
-    def get_bot_stats():
-        return {'servers': 5, 'members': 100, 'commands': 50, 'active_giveaways': 2, 'uptime': 3600, 'cogs': 8}
-    def get_moderation_actions(limit=5):
-        return []
-    def get_active_giveaways():
-        return []
-
-load_dotenv()
-
-app = Flask(__name__)
-app.config['SECRET_KEY'] = os.urandom(24).hex()
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///paradise.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-# Initialisation de la base de données
-db = SQLAlchemy(app)
-login_manager = LoginManager(app)
-login_manager.login_view = 'login'
-
-# ==================== MODÈLES ====================
-
-class User(UserMixin, db.Model):
-    __tablename__ = 'users'
-    
-    id = db.Column(db.Integer, primary_key=True)
-    discord_id = db.Column(db.String(80), unique=True, nullable=False)
-    username = db.Column(db.String(80), nullable=False)
-    avatar = db.Column(db.String(200))
-    is_owner = db.Column(db.Boolean, default=False)
-    last_login = db.Column(db.DateTime, default=datetime.utcnow)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-
-class GuildConfig(db.Model):
-    __tablename__ = 'guild_configs'
-    
-    id = db.Column(db.Integer, primary_key=True)
-    guild_id = db.Column(db.String(80), unique=True, nullable=False)
-    guild_name = db.Column(db.String(100))
-    guild_icon = db.Column(db.String(200))
-    prefix = db.Column(db.String(10), default='!')
-    language = db.Column(db.String(10), default='fr')
-    log_channel_id = db.Column(db.String(80))
-    mod_log_channel_id = db.Column(db.String(80))
-    message_log_channel_id = db.Column(db.String(80))
-    voice_log_channel_id = db.Column(db.String(80))
-    member_log_channel_id = db.Column(db.String(80))
-    welcome_enabled = db.Column(db.Boolean, default=True)
-    welcome_channel_id = db.Column(db.String(80))
-    welcome_message = db.Column(db.Text, default='Bienvenue {member} sur {server} !')
-    welcome_dm_enabled = db.Column(db.Boolean, default=False)
-    welcome_dm_message = db.Column(db.Text, default='Bienvenue sur {server} !')
-    leave_enabled = db.Column(db.Boolean, default=True)
-    leave_channel_id = db.Column(db.String(80))
-    leave_message = db.Column(db.Text, default='{member} nous a quittés...')
-    auto_role_id = db.Column(db.String(80))
-    muted_role_id = db.Column(db.String(80))
-    auto_mod_enabled = db.Column(db.Boolean, default=True)
-    bad_words_enabled = db.Column(db.Boolean, default=True)
-    bad_words_action = db.Column(db.String(20), default='delete')
-    invites_enabled = db.Column(db.Boolean, default=True)
-    invites_action = db.Column(db.String(20), default='delete')
-    caps_enabled = db.Column(db.Boolean, default=True)
-    caps_percentage = db.Column(db.Integer, default=70)
-    caps_min_length = db.Column(db.Integer, default=10)
-    giveaway_channel_id = db.Column(db.String(80))
-    custom_commands = db.Column(db.Text, default='{}')
-    total_warns = db.Column(db.Integer, default=0)
-    total_kicks = db.Column(db.Integer, default=0)
-    total_bans = db.Column(db.Integer, default=0)
-    total_mutes = db.Column(db.Integer, default=0)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, onupdate=datetime.utcnow)
-
-    def to_dict(self):
-        return {
-            'guild_id': self.guild_id,
-            'guild_name': self.guild_name,
-            'guild_icon': self.guild_icon,
-            'prefix': self.prefix,
-            'language': self.language,
-            'log_channel_id': self.log_channel_id,
-            'mod_log_channel_id': self.mod_log_channel_id,
-            'message_log_channel_id': self.message_log_channel_id,
-            'voice_log_channel_id': self.voice_log_channel_id,
-            'member_log_channel_id': self.member_log_channel_id,
-            'welcome_enabled': self.welcome_enabled,
-            'welcome_channel_id': self.welcome_channel_id,
-            'welcome_message': self.welcome_message,
-            'welcome_dm_enabled': self.welcome_dm_enabled,
-            'welcome_dm_message': self.welcome_dm_message,
-            'leave_enabled': self.leave_enabled,
-            'leave_channel_id': self.leave_channel_id,
-            'leave_message': self.leave_message,
-            'auto_role_id': self.auto_role_id,
-            'muted_role_id': self.muted_role_id,
-            'auto_mod_enabled': self.auto_mod_enabled,
-            'bad_words_enabled': self.bad_words_enabled,
-            'bad_words_action': self.bad_words_action,
-            'invites_enabled': self.invites_enabled,
-            'invites_action': self.invites_action,
-            'caps_enabled': self.caps_enabled,
-            'caps_percentage': self.caps_percentage,
-            'caps_min_length': self.caps_min_length,
-            'giveaway_channel_id': self.giveaway_channel_id,
-            'custom_commands': json.loads(self.custom_commands) if self.custom_commands else {},
-            'total_warns': self.total_warns,
-            'total_kicks': self.total_kicks,
-            'total_bans': self.total_bans,
-            'total_mutes': self.total_mutes
-        }
-
-@login_manager.user_loader
-def load_user(user_id):
-    return User.query.get(int(user_id))
-
-# Créer les tables
-with app.app_context():
-    db.create_all()
-    print("✅ Base de données initialisée")
-
-# ==================== ROUTES ====================
-
-@app.route('/')
-def index():
-    """Page d'accueil publique"""
-    return render_template('index.html')
-
-@app.route('/debug')
-def debug():
-    """Page de débogage pour voir les templates disponibles"""
-    templates = app.jinja_env.list_templates()
-    return render_template_string("""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Debug - Templates</title>
-        <style>
-            body { font-family: Arial; padding: 20px; background: #1a1a1a; color: white; }
-            h1 { color: #5865F2; }
-            ul { list-style: none; padding: 0; }
-            li { padding: 8px; margin: 5px 0; background: #2a2a2a; border-radius: 5px; }
-            .ok { color: #57F287; }
-            .missing { color: #ED4245; }
-        </style>
-    </head>
-    <body>
-        <h1>🔍 Debug - Templates disponibles</h1>
-        <ul>
-        {% for template in templates %}
-            <li class="ok">✅ {{ template }}</li>
-        {% endfor %}
-        </ul>
-        <p>Total: {{ templates|length }} templates</p>
-    </body>
-    </html>
-    """, templates=templates)
-
-@app.route('/invite')
-def invite_page():
-    """Page d'invitation du bot"""
-    return render_template('invite.html', 
-                         client_id=os.getenv('DISCORD_CLIENT_ID', ''),
-                         permissions='8')
-
-@app.route('/commands')
-def commands_page():
-    """Page des commandes"""
-    return render_template('commands.html')
-
-@app.route('/login')
-def discord_login():
-    """Redirection vers Discord OAuth2"""
-    discord_oauth_url = (
-        f"https://discord.com/api/oauth2/authorize"
-        f"?client_id={os.getenv('DISCORD_CLIENT_ID')}"
-        f"&redirect_uri={os.getenv('DISCORD_REDIRECT_URI', 'http://localhost:5000/callback')}"
-        f"&response_type=code"
-        f"&scope=identify%20guilds"
-    )
-    return redirect(discord_oauth_url)
-
-@app.route('/callback')
-def discord_callback():
-    """Callback après authentification Discord"""
-    code = request.args.get('code')
-    
-    if not code:
-        flash("Code d'authentification manquant", 'danger')
-        return redirect(url_for('index'))
-    
-    # Échanger le code contre un token
-    data = {
-        'client_id': os.getenv('DISCORD_CLIENT_ID'),
-        'client_secret': os.getenv('DISCORD_CLIENT_SECRET'),
-        'grant_type': 'authorization_code',
-        'code': code,
-        'redirect_uri': os.getenv('DISCORD_REDIRECT_URI', 'http://localhost:5000/callback'),
-        'scope': 'identify guilds'
-    }
-    
-    headers = {'Content-Type': 'application/x-www-form-urlencoded'}
-    
-    try:
-        response = requests.post('https://discord.com/api/oauth2/token', data=data, headers=headers, timeout=10)
-        credentials = response.json()
-        
-        if 'access_token' not in credentials:
-            flash("Erreur d'authentification Discord", 'danger')
-            return redirect(url_for('index'))
-        
-        access_token = credentials['access_token']
-        
-        # Récupérer les informations utilisateur
-        user_response = requests.get('https://discord.com/api/users/@me', headers={
-            'Authorization': f'Bearer {access_token}'
-        }, timeout=10)
-        user_data = user_response.json()
-        
-        # Construire l'URL de l'avatar
-        if user_data.get('avatar'):
-            avatar_url = f"https://cdn.discordapp.com/avatars/{user_data['id']}/{user_data['avatar']}.png"
-        else:
-            avatar_url = f"https://cdn.discordapp.com/embed/avatars/{int(user_data.get('discriminator', 0)) % 5}.png"
-        
-        # Vérifier si c'est le propriétaire
-        is_owner = (int(user_data['id']) == 1274391702655864883)
-        
-        # Créer ou mettre à jour l'utilisateur
-        user = User.query.filter_by(discord_id=user_data['id']).first()
-        if not user:
-            user = User(
-                discord_id=user_data['id'],
-                username=user_data['username'],
-                avatar=avatar_url,
-                is_owner=is_owner
-            )
-            db.session.add(user)
-        else:
-            user.username = user_data['username']
-            user.avatar = avatar_url
-            user.last_login = datetime.utcnow()
-        
-        db.session.commit()
-        login_user(user)
-        
-        # Récupérer les serveurs de l'utilisateur
-        guilds_response = requests.get('https://discord.com/api/users/@me/guilds', headers={
-            'Authorization': f'Bearer {access_token}'
-        }, timeout=10)
-        guilds = guilds_response.json()
-        
-        # Filtrer les serveurs où l'utilisateur a les permissions admin
-        user_guilds = [g for g in guilds if (g.get('permissions', 0) & 0x8)]
-        session['guilds'] = user_guilds
-        
-        return redirect(url_for('dashboard'))
-        
-    except Exception as e:
-        flash(f"Erreur de connexion: {str(e)}", 'danger')
-        return redirect(url_for('index'))
-
-@app.route('/dashboard')
-@login_required
-def dashboard():
-    """Dashboard principal de l'utilisateur"""
-    guilds = session.get('guilds', [])
-    
-    # Statistiques
-    stats = {
-        'servers': len(guilds),
-        'members': sum(g.get('approximate_member_count', 0) for g in guilds),
-        'managed_servers': len(guilds),
-        'active_giveaways': 0
-    }
-    
-    return render_template('dashboard.html', 
-                         stats=stats,
-                         guilds=guilds[:6],
-                         user=current_user)
-
-@app.route('/dashboard/guild/<guild_id>')
-@login_required
-def guild_dashboard(guild_id):
-    """Dashboard de configuration pour un serveur spécifique"""
-    guilds = session.get('guilds', [])
-    guild = next((g for g in guilds if g['id'] == guild_id), None)
-    
-    if not guild:
-        flash("Vous n'avez pas accès à ce serveur", 'danger')
-        return redirect(url_for('dashboard'))
-    
-    # Récupérer ou créer la configuration
-    config = GuildConfig.query.filter_by(guild_id=guild_id).first()
-    if not config:
-        config = GuildConfig(
-            guild_id=guild_id,
-            guild_name=guild.get('name', 'Inconnu'),
-            guild_icon=f"https://cdn.discordapp.com/icons/{guild_id}/{guild.get('icon')}.png" if guild.get('icon') else None
-        )
-        db.session.add(config)
-        db.session.commit()
-    
-    return render_template('guild_dashboard.html', 
-                         guild=guild,
-                         config=config.to_dict())
-
-@app.route('/moderation')
-@login_required
-def moderation():
-    if not current_user.is_owner:
-        flash("Accès réservé au propriétaire", 'danger')
-        return redirect(url_for('dashboard'))
-    return render_template('moderation.html')
-
-@app.route('/giveaways')
-@login_required
-def giveaways():
-    if not current_user.is_owner:
-        flash("Accès réservé au propriétaire", 'danger')
-        return redirect(url_for('dashboard'))
-    return render_template('giveaways.html')
-
-@app.route('/logs')
-@login_required
-def logs():
-    if not current_user.is_owner:
-        flash("Accès réservé au propriétaire", 'danger')
-        return redirect(url_for('dashboard'))
-    return render_template('logs.html')
-
-@app.route('/logout')
-@login_required
-def logout():
-    logout_user()
-    session.clear()
-    return redirect(url_for('index'))
-
-# ==================== API ROUTES ====================
-
-@app.route('/api/bot/stats')
-@login_required
-def api_bot_stats():
-    if not current_user.is_owner:
-        return jsonify({'error': 'Unauthorized'}), 403
-    return jsonify(get_bot_stats())
-
-@app.route('/api/user/guilds')
-@login_required
-def api_user_guilds():
-    return jsonify(session.get('guilds', []))
-
-# ==================== LANCEMENT ====================
-
-if __name__ == '__main__':
-    port = int(os.getenv('PORT', 5000))
-    app.run(host='0.0.0.0', port=port, debug=True)
+import os
+import sys
+import time
+from pathlib import Path
+
+import click
+
+# Ajouter le chemin du projet pour les imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from flask import Flask, current_app
+from flask.cli import with_appcontext
+from flask_login import LoginManager
+
+# Importer les modules locaux
+from config import Config
+from dashboard.models import User
+from dashboard.database import init_db, upgrade_schema
+from dashboard.api.config import config_api, config_cache
+from dashboard.custom_commands import command_indexes, migrate_custom_commands
+from dashboard.http_cache import init_http_cache
+from dashboard.moderation_stats import ROLLUP_INTERVAL, check_rollups, update_rollups
+from dashboard.profiler import init_profiler
+from dashboard.views import main, bot_api, configured_guild_ids, fetch_user_guilds, refresh_discord_token
+from metrics import REGISTRY, cache_collector, family, init_metrics
+from session_store import LRUStore, ServerSideSessionInterface, GuildStore
+from stats_stream import StatsBroadcaster
+
+login_manager = LoginManager()
+login_manager.login_view = 'main.discord_login'
+
+@login_manager.user_loader
+def load_user(user_id):
+    return User.query.get(int(user_id))
+
+def load_secret_key(instance_path):
+    """Clé partagée par tous les workers, générée au premier démarrage.
+
+    O_EXCL garantit qu'un seul processus l'écrit ; les autres la relisent.
+    """
+    path = os.path.join(instance_path, 'secret_key')
+    os.makedirs(instance_path, exist_ok=True)
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        for _ in range(100):
+            with open(path) as f:
+                key = f.read().strip()
+            if key:
+                return key
+            # Fichier créé mais pas encore écrit par un autre worker
+            time.sleep(0.01)
+        raise RuntimeError(f"Clé secrète vide : {path}")
+    key = os.urandom(32).hex()
+    with os.fdopen(fd, 'w') as f:
+        f.write(key)
+    return key
+
+def create_app(config_class=Config):
+    """Crée l'application.
+
+    Rien n'est fait sur la base ici : les tables sont créées par la commande
+    `flask --app app init-db`, lancée une fois avant de démarrer les workers.
+    """
+    app = Flask(__name__)
+    app.config.from_object(config_class)
+    if not app.config.get('SECRET_KEY'):
+        app.config['SECRET_KEY'] = load_secret_key(app.instance_path)
+
+    # Sessions côté serveur : le cookie ne contient que l'identifiant de session.
+    # Fichier SQLite partagé par défaut : une session ouverte sur un worker
+    # est reconnue par les autres.
+    session_db_path = app.config['SESSION_DB_PATH']
+    if not session_db_path:
+        os.makedirs(app.instance_path, exist_ok=True)
+        session_db_path = os.path.join(app.instance_path, 'sessions.db')
+        # Relu par init_profiler (tampon des profils partagé entre workers)
+        app.config['SESSION_DB_PATH'] = session_db_path
+    app.session_interface = ServerSideSessionInterface(
+        LRUStore(maxsize=10000, sqlite_path=session_db_path, table='sessions')
+    )
+    app.extensions['guild_store'] = GuildStore(
+        LRUStore(maxsize=5000, sqlite_path=session_db_path, table='user_guilds'),
+        fetch=fetch_user_guilds,
+        ttl=app.config['GUILDS_TTL'],
+        refresh=refresh_discord_token,
+        configured=configured_guild_ids
+    )
+
+    # Un seul producteur interroge le bot pour tous les clients SSE
+    app.extensions['stats_broadcaster'] = StatsBroadcaster(
+        lambda: bot_api().get_bot_stats(),
+        interval=app.config['BOT_STATS_STREAM_INTERVAL'],
+        queue_size=app.config['BOT_STATS_STREAM_QUEUE']
+    )
+
+    # Initialisation de la base de données (DATABASE_URL, SQLite par défaut)
+    init_db(app)
+    login_manager.init_app(app)
+    # Avant init_http_cache : la latence mesurée inclut la compression
+    init_metrics(app)
+    init_http_cache(app)
+    init_profiler(app)
+    register_collectors(app)
+    app.register_blueprint(main)
+    app.register_blueprint(config_api, url_prefix='/api')
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(check_rollups_command)
+    app.cli.add_command(update_rollups_command)
+    app.cli.add_command(run_giveaway_scheduler_command)
+
+    return app
+
+def start_giveaway_scheduler(app, sync_interval=30, start=True):
+    """Planificateur de fin des giveaways ; un seul par déploiement"""
+    from dashboard.giveaway_scheduler import GiveawayScheduler, register_session_hooks
+    scheduler = GiveawayScheduler(lambda message_ids: bot_api().end_giveaways(message_ids),
+                                  sync_interval=sync_interval)
+    register_session_hooks(scheduler)
+    scheduler.init_app(app, start=start)
+    app.extensions['giveaway_scheduler'] = scheduler
+    return scheduler
+
+def register_collectors(app):
+    """Caches et sessions actives, exposés par /metrics"""
+    def caches():
+        caches = {
+            'page': app.extensions['page_cache'],
+            'config': config_cache,
+            'custom_commands': command_indexes,
+        }
+        # Sans importer bot_api s'il n'a pas encore servi (démarrage paresseux)
+        if 'bot_api' in sys.modules:
+            caches['bot_api'] = sys.modules['bot_api'].cache
+        return caches
+
+    def active_sessions():
+        # Une session est enregistrée avec une expiration à updated_at + durée de vie
+        lifetime = app.permanent_session_lifetime.total_seconds()
+        count = app.session_interface.store.count(since=time.time() - lifetime)
+        return [family('paradise_active_sessions', 'gauge', 'Sessions non expirées', (), [[[], count]])]
+
+    REGISTRY.collector('caches', cache_collector(caches))
+    # Le magasin de sessions est partagé (SQLite) : lu par le worker qui répond
+    REGISTRY.collector('sessions', active_sessions, live=True)
+
+# ==================== COMMANDES ====================
+
+@click.command('init-db')
+def init_db_command():
+    """Crée les tables et les index manquants, puis migre les données"""
+    upgrade_schema()
+    migrated, failed = migrate_custom_commands()
+    if migrated:
+        click.echo(f"{migrated} commandes personnalisées migrées vers la table custom_commands")
+    if failed:
+        click.echo(f"❌ Commandes non migrées pour {len(failed)} serveurs ({', '.join(failed[:10])}) : "
+                   "JSON laissé intact, corriger puis relancer init-db", err=True)
+        sys.exit(1)
+    click.echo("✅ Base de données initialisée")
+
+@click.command('check-rollups')
+@click.option('--rebuild', is_flag=True, help='Reconstruire les agrégats depuis les logs bruts')
+def check_rollups_command(rebuild):
+    """Vérifie les agrégats de modération par rapport aux logs bruts"""
+    mismatches = check_rollups(rebuild=rebuild)
+    if rebuild:
+        click.echo(f"Agrégats reconstruits ({mismatches} tranches corrigées)")
+    elif mismatches:
+        click.echo(f"❌ {mismatches} tranches incohérentes (relancer avec --rebuild)")
+        sys.exit(1)
+    else:
+        click.echo("✅ Agrégats cohérents")
+
+@click.command('run-giveaway-scheduler')
+@click.option('--sync-interval', type=float, default=5, show_default=True,
+              help='Secondes entre deux lectures des giveaways modifiés par les workers')
+@with_appcontext
+def run_giveaway_scheduler_command(sync_interval):
+    """Termine les giveaways à échéance (processus dédié, un seul par déploiement)"""
+    scheduler = start_giveaway_scheduler(current_app._get_current_object(), sync_interval, start=False)
+    click.echo(f"{len(scheduler)} giveaways en attente")
+    try:
+        scheduler.run()
+    except KeyboardInterrupt:
+        scheduler.stop()
+
+@click.command('update-rollups')
+@click.option('--loop', is_flag=True, help='Relancer en continu (processus dédié)')
+@click.option('--interval', type=float, default=ROLLUP_INTERVAL, show_default=True,
+              help='Secondes entre deux passages avec --loop')
+def update_rollups_command(loop, interval):
+    """Agrège les nouveaux logs de modération (graphiques de /moderation/stats)"""
+    while True:
+        try:
+            aggregated = update_rollups()
+            click.echo(f"{aggregated} logs agrégés")
+        except Exception as e:
+            if not loop:
+                raise
+            click.echo(f"Erreur agrégation: {e}", err=True)
+        if not loop:
+            return
+        time.sleep(interval)
+
+# ==================== LANCEMENT ====================
+
+if __name__ == '__main__':
+    app = create_app()
+    # Serveur de développement : un seul processus, le schéma peut être créé ici
+    with app.app_context():
+        upgrade_schema()
+        migrate_custom_commands()
+    # Le rechargeur relance ce module : planificateur dans le processus servi seulement
+    if app.config['GIVEAWAY_SCHEDULER'] and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_giveaway_scheduler(app)
+    port = int(os.getenv('PORT', 5000))
+    app.run(host='0.0.0.0', port=port, debug=True)
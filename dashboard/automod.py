@@ -0,0 +1,215 @@
+import json
+import os
+import re
+from collections import deque
+
+from cache import LRUCache
+
+# Réglages d'automodération d'un serveur, dans l'ordre des colonnes lues
+AUTOMOD_FIELDS = (
+    'auto_mod_enabled',
+    'bad_words_enabled', 'bad_words_action', 'bad_words',
+    'invites_enabled', 'invites_action',
+    'caps_enabled', 'caps_percentage', 'caps_min_length',
+)
+
+# Pas de colonne d'action pour les majuscules : le message est supprimé
+CAPS_ACTION = 'delete'
+
+# Liens d'invitation Discord (discord.gg, discord.com/invite, ...)
+INVITE_PATTERN = re.compile(
+    r'(?:https?://)?(?:www\.)?(?:discord(?:app)?\.com/invite|discord\.(?:gg|io|me|li)|dsc\.gg)/[\w-]+',
+    re.IGNORECASE
+)
+
+# Taille maximale de la liste de mots interdits d'un serveur
+MAX_BAD_WORDS = int(os.getenv('AUTOMOD_MAX_BAD_WORDS', 1000))
+MAX_BAD_WORD_LENGTH = 100
+
+# Règles compilées, indexées par les réglages eux-mêmes : une config
+# modifiée donne une nouvelle clé, et les serveurs aux réglages identiques
+# (la plupart gardent les valeurs par défaut) partagent la même entrée.
+_matchers = LRUCache(maxsize=int(os.getenv('AUTOMOD_CACHE_SIZE', 1024)))
+
+
+def parse_bad_words(raw):
+    """Liste de mots interdits stockée en JSON (None pour une ancienne ligne).
+
+    Une valeur illisible écrite avant la validation donne une liste vide
+    plutôt que de casser la config, l'export et l'automodération.
+    """
+    if not raw:
+        return []
+    try:
+        words = json.loads(raw)
+    except ValueError:
+        return []
+    return [str(word) for word in words] if isinstance(words, list) else []
+
+
+def validate_bad_words(words):
+    """Valide une liste de mots interdits (ou son JSON) ; retourne le JSON à stocker"""
+    if isinstance(words, str):
+        try:
+            words = json.loads(words)
+        except ValueError:
+            raise ValueError('bad_words doit être une liste de mots (JSON)') from None
+    if not isinstance(words, list):
+        raise ValueError('bad_words doit être une liste de mots')
+    if len(words) > MAX_BAD_WORDS:
+        raise ValueError(f'bad_words trop long (max {MAX_BAD_WORDS} mots)')
+    for word in words:
+        if not isinstance(word, str):
+            raise ValueError('bad_words ne doit contenir que des chaînes')
+        if len(word) > MAX_BAD_WORD_LENGTH:
+            raise ValueError(f'mot interdit trop long (max {MAX_BAD_WORD_LENGTH})')
+    return json.dumps(words)
+
+
+class WordMatcher:
+    """Recherche de tous les mots d'une liste en un seul passage (Aho-Corasick).
+
+    Le coût dépend de la longueur du message, pas du nombre de mots. Un mot
+    n'est reconnu qu'entier : « con » ne déclenche pas sur « contrat ».
+    La comparaison ignore la casse.
+    """
+
+    def __init__(self, words):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+        for word in words:
+            word = word.strip().casefold()
+            if word:
+                self._add(word)
+        self._link()
+
+    def __bool__(self):
+        return len(self._goto) > 1
+
+    def _add(self, word):
+        state = 0
+        for char in word:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            state = next_state
+        self._out[state] = (len(word),)
+
+    def _link(self):
+        # Liens d'échec en largeur : le plus long suffixe qui est aussi un préfixe
+        goto, fail, out = self._goto, self._fail, self._out
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in goto[state].items():
+                queue.append(next_state)
+                target = fail[state]
+                while target and char not in goto[target]:
+                    target = fail[target]
+                fail[next_state] = goto[target].get(char, 0)
+                if fail[next_state] == next_state:
+                    fail[next_state] = 0
+                out[next_state] = out[next_state] + out[fail[next_state]]
+
+    def find(self, text):
+        """Premier mot interdit trouvé dans `text`, ou None"""
+        goto, fail, out = self._goto, self._fail, self._out
+        text = text.casefold()
+        last = len(text) - 1
+        state = 0
+        for end, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                for length in out[state]:
+                    start = end - length + 1
+                    if (start == 0 or not text[start - 1].isalnum()) and \
+                            (end == last or not text[end + 1].isalnum()):
+                        return text[start:end + 1]
+        return None
+
+
+def caps_exceeded(text, percentage, min_length):
+    """Part de majuscules parmi les lettres >= percentage, en un seul passage"""
+    # Message sans majuscule (cas le plus courant) : pas de décompte
+    if len(text) < min_length or text.islower():
+        return False
+    letters = upper = 0
+    for char in text:
+        if char.isalpha():
+            letters += 1
+            if char.isupper():
+                upper += 1
+    return letters > 0 and upper * 100 >= percentage * letters
+
+
+class AutomodMatcher:
+    """Règles d'automodération d'un serveur, compilées une fois.
+
+    `check(content)` retourne les infractions d'un message, `evaluate`
+    traite un lot de messages.
+    """
+
+    def __init__(self, settings):
+        enabled = settings['auto_mod_enabled']
+        words = parse_bad_words(settings['bad_words']) if enabled and settings['bad_words_enabled'] else ()
+        self.words = WordMatcher(words)
+        self.bad_words_action = settings['bad_words_action']
+        self.invites = enabled and bool(settings['invites_enabled'])
+        self.invites_action = settings['invites_action']
+        self.caps = enabled and bool(settings['caps_enabled'])
+        self.caps_percentage = settings['caps_percentage'] or 0
+        self.caps_min_length = settings['caps_min_length'] or 0
+        self.active = bool(self.words) or self.invites or self.caps
+
+    def check(self, content):
+        """Infractions d'un message : [{'rule', 'action', 'match'}]"""
+        violations = []
+        if not self.active or not content:
+            return violations
+        if self.invites:
+            match = INVITE_PATTERN.search(content)
+            if match:
+                violations.append({'rule': 'invites', 'action': self.invites_action, 'match': match.group()})
+        if self.words:
+            word = self.words.find(content)
+            if word:
+                violations.append({'rule': 'bad_words', 'action': self.bad_words_action, 'match': word})
+        if self.caps and caps_exceeded(content, self.caps_percentage, self.caps_min_length):
+            violations.append({'rule': 'caps', 'action': CAPS_ACTION, 'match': None})
+        return violations
+
+    def evaluate(self, messages):
+        """Teste un lot de messages (textes ou dicts {'id', 'content'}).
+
+        Seuls les messages en infraction sont retournés :
+        [{'index', 'id', 'violations'}], index étant la position dans le lot.
+        """
+        results = []
+        if not self.active:
+            return results
+        for index, message in enumerate(messages):
+            if isinstance(message, dict):
+                message_id, content = message.get('id'), message.get('content')
+            else:
+                message_id, content = None, message
+            violations = self.check(content if isinstance(content, str) else '')
+            if violations:
+                results.append({'index': index, 'id': message_id, 'violations': violations})
+        return results
+
+
+def get_matcher(values):
+    """Règles compilées pour des réglages (valeurs de AUTOMOD_FIELDS, dans l'ordre)"""
+    key = tuple(values)
+    matcher = _matchers.get(key)
+    if matcher is None:
+        matcher = AutomodMatcher(dict(zip(AUTOMOD_FIELDS, key)))
+        _matchers.set(key, matcher)
+    return matcher
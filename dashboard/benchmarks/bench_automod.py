@@ -0,0 +1,148 @@
+"""Débit de l'automodération (messages/s) sur un corpus de discussion.
+
+Corpus généré : messages courts et longs, en français, avec une part de
+liens d'invitation, de messages en majuscules et de mots interdits. Mesure
+le moteur compilé seul (AutomodMatcher.evaluate), la recherche de mots
+comparée à une regex d'alternance et à une boucle naïve par mot, puis
+l'appel HTTP groupé POST /api/guild/<id>/automod/evaluate.
+
+Usage : python benchmarks/bench_automod.py [messages] [mots_interdits]
+"""
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from dashboard.automod import AUTOMOD_FIELDS, get_matcher  # noqa: E402
+
+VOCABULARY = (
+    "salut tout le monde quelqu'un a vu le dernier épisode ? moi je trouve que c'était "
+    "vraiment pas mal mais la fin est bizarre on lance une partie ce soir vers 21h "
+    "qui est chaud pour un tournoi merci pour l'aide avec le bot la commande marche "
+    "plus depuis la mise à jour ah ouais bien vu je regarde ça demain bonne nuit "
+    "gg wp le serveur est trop calme aujourd'hui vous jouez à quoi en ce moment"
+).split()
+API_KEY = 'bench-api-key'
+GUILD_ID = '100000000000000000'
+
+
+def bad_words(count, rng):
+    letters = 'abcdefghijklmnopqrstuvwxyzéè'
+    return sorted({''.join(rng.choice(letters) for _ in range(rng.randint(4, 10))) for _ in range(count)})
+
+
+def corpus(count, words, rng):
+    messages = []
+    for index in range(count):
+        length = rng.choice((2, 4, 6, 8, 12, 20, 40))
+        tokens = [rng.choice(VOCABULARY) for _ in range(length)]
+        kind = rng.random()
+        if kind < 0.02:
+            tokens.insert(rng.randrange(len(tokens) + 1), f'discord.gg/{rng.randrange(10 ** 8):x}')
+        elif kind < 0.05:
+            tokens.insert(rng.randrange(len(tokens) + 1), rng.choice(words))
+        content = ' '.join(tokens)
+        if rng.random() < 0.03:
+            content = content.upper()
+        elif rng.random() < 0.5:
+            content = content.capitalize()
+        messages.append({'id': str(index), 'content': content})
+    return messages
+
+
+def settings(words):
+    values = {
+        'auto_mod_enabled': True, 'bad_words_enabled': True, 'bad_words_action': 'delete',
+        'bad_words': json.dumps(words), 'invites_enabled': True, 'invites_action': 'delete',
+        'caps_enabled': True, 'caps_percentage': 70, 'caps_min_length': 10,
+    }
+    return values, tuple(values[field] for field in AUTOMOD_FIELDS)
+
+
+def timed(func, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    word_count = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    rng = random.Random(42)
+    words = bad_words(word_count, rng)
+    messages = corpus(count, words, rng)
+    texts = [message['content'] for message in messages]
+    values, key = settings(words)
+
+    start = time.perf_counter()
+    matcher = get_matcher(key)
+    compile_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    cached = get_matcher(key)
+    cached_us = (time.perf_counter() - start) * 1e6
+    print(f"compilation ({word_count} mots) : {compile_ms:.1f} ms ; config inchangée : "
+          f"{cached_us:.1f} µs ({'même objet' if cached is matcher else 'RECOMPILÉ'})")
+
+    elapsed, flagged = timed(lambda: matcher.evaluate(messages))
+    rules = {}
+    for result in flagged:
+        for violation in result['violations']:
+            rules[violation['rule']] = rules.get(violation['rule'], 0) + 1
+    print(f"evaluate         : {count / elapsed:>10,.0f} messages/s ({len(flagged)} signalés : {rules})")
+
+    # Recherche de mots seule : automate contre regex d'alternance et boucle naïve
+    ac_time, ac_found = timed(lambda: sum(1 for text in texts if matcher.words.find(text)))
+    pattern = re.compile(r'(?<!\w)(?:' + '|'.join(map(re.escape, words)) + r')(?!\w)', re.IGNORECASE)
+    re_time, re_found = timed(lambda: sum(1 for text in texts if pattern.search(text)))
+    naive_texts = texts[:200]
+    naive_time, _ = timed(lambda: [any(re.search(rf'(?<!\w){re.escape(word)}(?!\w)', text.casefold())
+                                       for word in words) for text in naive_texts], repeat=1)
+    print(f"mots, automate   : {count / ac_time:>10,.0f} messages/s ({ac_found} trouvés)")
+    print(f"mots, regex |    : {count / re_time:>10,.0f} messages/s ({re_found} trouvés)")
+    print(f"mots, boucle     : {len(naive_texts) / naive_time:>10,.0f} messages/s")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update({
+            'DATABASE_URL': f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+            'SECRET_KEY': 'bench',
+            'DASHBOARD_API_KEY': API_KEY,
+        })
+        import app as dashboard_app
+        from config import Config
+        from dashboard.database import upgrade_schema
+        from dashboard.models import db, GuildConfig
+
+        class BenchConfig(Config):
+            METRICS = False
+
+        application = dashboard_app.create_app(BenchConfig)
+        with application.app_context():
+            upgrade_schema()
+            db.session.add(GuildConfig(guild_id=GUILD_ID, **values))
+            db.session.commit()
+        client = application.test_client()
+        batch = 1000
+        bodies = [json.dumps({'messages': messages[i:i + batch]}) for i in range(0, count, batch)]
+        headers = {'X-API-Key': API_KEY, 'Content-Type': 'application/json'}
+
+        def post_all():
+            return sum(len(client.post(f'/api/guild/{GUILD_ID}/automod/evaluate', data=body,
+                                       headers=headers).get_json()['flagged']) for body in bodies)
+
+        elapsed, http_flagged = timed(post_all, repeat=3)
+        print(f"HTTP (lots {batch}) : {count / elapsed:>10,.0f} messages/s ({http_flagged} signalés, "
+              f"{elapsed / len(bodies) * 1000:.1f} ms/lot)")
+
+
+if __name__ == '__main__':
+    main()
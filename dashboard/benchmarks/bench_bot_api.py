@@ -0,0 +1,71 @@
+"""Compare les appels à l'API du bot : requests.get isolés, client partagé
+en série, et fan-out parallèle avec fetch_many (les trois appels de la page
+dashboard du propriétaire). Le cache est vidé avant chaque page : chaque
+variante fait réellement ses trois appels ; la dernière ligne donne le cas
+du cache chaud pour comparaison.
+
+Usage : python benchmarks/bench_bot_api.py [latence_ms] [iterations]
+"""
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import requests
+
+from benchmarks.stub_bot_api import start_stub
+
+
+def timed(label, func, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    elapsed = (time.perf_counter() - start) / iterations
+    print(f"{label:<32} {elapsed * 1000:8.1f} ms / page")
+    return elapsed
+
+
+def main():
+    latency = float(sys.argv[1]) / 1000 if len(sys.argv) > 1 else 0.05
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    server, url = start_stub(latency=latency)
+    os.environ['BOT_API_URL'] = url
+    import bot_api
+
+    paths = ['/api/stats', '/api/moderation/latest', '/api/giveaways/active']
+
+    def legacy_page():
+        # Ancien comportement : une connexion TCP par appel, en série
+        for path in paths:
+            requests.get(f"{url}{path}", headers={'X-API-Key': bot_api.BOT_API_KEY}, timeout=5).json()
+
+    def pooled_serial_page():
+        bot_api.cache.invalidate()
+        bot_api.get_bot_stats()
+        bot_api.get_moderation_actions(5)
+        bot_api.get_active_giveaways()
+
+    def fan_out_page(cold=True):
+        if cold:
+            bot_api.cache.invalidate()
+        bot_api.fetch_many(
+            stats=bot_api.get_bot_stats,
+            actions=(bot_api.get_moderation_actions, 5),
+            giveaways=bot_api.get_active_giveaways
+        )
+
+    print(f"Stub : {url}, latence {latency * 1000:.0f} ms, {iterations} pages de 3 appels")
+    legacy = timed("requests.get en série", legacy_page, iterations)
+    timed("client partagé en série", pooled_serial_page, iterations)
+    fan_out = timed("fetch_many (parallèle)", fan_out_page, iterations)
+    timed("fetch_many, cache chaud", lambda: fan_out_page(cold=False), iterations)
+    print(f"Gain fan-out : x{legacy / fan_out:.1f}")
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
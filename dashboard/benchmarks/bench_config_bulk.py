@@ -0,0 +1,72 @@
+"""Démarrage à froid d'un bot : une requête par serveur contre l'export
+groupé NDJSON de /api/guilds/config.
+
+Usage : python benchmarks/bench_config_bulk.py [nb_serveurs]
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from flask import Flask
+
+from dashboard.api.config import API_KEY, config_api, config_cache
+from dashboard.models import db, GuildConfig
+
+HEADERS = {'X-API-Key': API_KEY}
+
+
+def make_app(path, guilds):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    db.init_app(app)
+    app.register_blueprint(config_api, url_prefix='/api')
+    with app.app_context():
+        db.create_all()
+        db.session.bulk_insert_mappings(GuildConfig, [
+            {'guild_id': str((i << 22) + 1000), 'guild_name': f'Serveur {i}',
+             'custom_commands': '{"regles": "Lisez le salon #règles"}'}
+            for i in range(guilds)
+        ])
+        db.session.commit()
+    return app
+
+
+def main():
+    guilds = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, 'bench.db'), guilds)
+        client = app.test_client()
+        guild_ids = [str((i << 22) + 1000) for i in range(guilds)]
+
+        config_cache.clear()
+        start = time.perf_counter()
+        for guild_id in guild_ids:
+            client.get(f'/api/guild/{guild_id}/config', headers=HEADERS).get_json()
+        per_guild = time.perf_counter() - start
+
+        start = time.perf_counter()
+        response = client.post('/api/guilds/config', json={'guild_ids': guild_ids}, headers=HEADERS)
+        lines = response.get_data().splitlines()
+        bulk_ids = time.perf_counter() - start
+        assert len(lines) == guilds
+
+        start = time.perf_counter()
+        total = 0
+        for shard_id in range(4):
+            response = client.get(f'/api/guilds/config?shard_id={shard_id}&shard_count=4', headers=HEADERS)
+            total += len(response.get_data().splitlines())
+        bulk_shards = time.perf_counter() - start
+        assert total == guilds
+
+        print(f"{guilds} serveurs, démarrage à froid")
+        print(f"{'GET par serveur':<28} {per_guild:7.2f} s  ({guilds} requêtes)")
+        print(f"{'bulk (liste d ids)':<28} {bulk_ids:7.2f} s  (x{per_guild / bulk_ids:.0f})")
+        print(f"{'bulk (4 shards)':<28} {bulk_shards:7.2f} s  (x{per_guild / bulk_shards:.0f})")
+
+
+if __name__ == '__main__':
+    main()
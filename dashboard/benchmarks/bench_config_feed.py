@@ -0,0 +1,124 @@
+"""Flux des modifications de configs : coût en requêtes SQL et latence.
+
+N abonnés (threads en long-poll sur /api/guilds/config/changes, comme autant
+de shards du bot) attendent pendant que K configs sont modifiées. On compte
+les requêtes SQL exécutées pendant la mesure : elles ne doivent pas dépendre
+du nombre d'abonnés (un seul thread lit le journal, puis une lecture par
+config modifiée servie depuis le cache). Comparé au polling de l'export
+groupé, où chaque shard relit toutes ses configs à chaque intervalle.
+
+Usage : python benchmarks/bench_config_feed.py [serveurs] [modifications]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+API_KEY = 'bench-api-key'
+
+
+def main():
+    guilds = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    writes = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update({
+            'DATABASE_URL': f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+            'SECRET_KEY': 'bench',
+            'DASHBOARD_API_KEY': API_KEY,
+            'CONFIG_FEED_POLL_INTERVAL': '0.5',
+        })
+        import app as dashboard_app
+        from config import Config
+        from sqlalchemy import event
+        from dashboard.database import upgrade_schema
+        from dashboard.models import db, GuildConfig
+
+        class BenchConfig(Config):
+            METRICS = False
+
+        application = dashboard_app.create_app(BenchConfig)
+        guild_ids = [str(10 ** 17 + i) for i in range(guilds)]
+        with application.app_context():
+            upgrade_schema()
+            db.session.execute(db.insert(GuildConfig.__table__), [{'guild_id': g} for g in guild_ids])
+            db.session.commit()
+            engine = db.engine
+
+        queries = [0]
+
+        @event.listens_for(engine, 'before_cursor_execute')
+        def count(*args):
+            queries[0] += 1
+
+        headers = {'X-API-Key': API_KEY}
+        client = application.test_client()
+        version = client.get('/api/guilds/config/changes', query_string={'shard_id': 0, 'shard_count': 1},
+                             headers=headers).get_json()['version']
+
+        print("abonnés  requêtes SQL  requêtes/modif  latence moy.  reçues")
+        for subscribers in (1, 10, 100, 500):
+            stop = threading.Event()
+            latencies = []
+            received = [0]
+            written_at = {}
+            lock = threading.Lock()
+
+            def subscribe(shard_id, since=version):
+                local = application.test_client()
+                while not stop.is_set():
+                    body = local.post('/api/guilds/config/changes', headers=headers, json={
+                        'shard_id': shard_id, 'shard_count': subscribers, 'since': since, 'timeout': 2,
+                    }).get_json()
+                    now = time.perf_counter()
+                    since = body['version']
+                    with lock:
+                        for change in body['changes']:
+                            received[0] += 1
+                            if change['guild_id'] in written_at:
+                                latencies.append(now - written_at[change['guild_id']])
+
+            threads = [threading.Thread(target=subscribe, args=(i,), daemon=True) for i in range(subscribers)]
+            for thread in threads:
+                thread.start()
+            time.sleep(1)
+
+            queries[0] = 0
+            with application.app_context():
+                for i in range(writes):
+                    guild_id = guild_ids[(i * 7919) % guilds]
+                    config = GuildConfig.query.filter_by(guild_id=guild_id).first()
+                    config.caps_percentage = (config.caps_percentage + 1) % 100
+                    with lock:
+                        written_at[guild_id] = time.perf_counter()
+                    db.session.commit()
+                    time.sleep(0.05)
+            time.sleep(3)
+            stop.set()
+            for thread in threads:
+                thread.join()
+            total = queries[0]
+            with application.app_context():
+                version = client.get('/api/guilds/config/changes', query_string={'guild_ids': guild_ids[0]},
+                                     headers=headers).get_json()['version']
+            average = sum(latencies) / len(latencies) * 1000 if latencies else float('nan')
+            print(f"{subscribers:8}  {total:12}  {total / writes:14.1f}  {average:9.0f} ms  {received[0]:6}")
+
+        # Polling de l'export groupé : chaque shard relit toutes ses configs
+        queries[0] = 0
+        shards = 10
+        for shard_id in range(shards):
+            client.get('/api/guilds/config', headers=headers,
+                       query_string={'shard_id': shard_id, 'shard_count': shards})
+        print(f"polling de l'export groupé ({shards} shards, {guilds} serveurs) : "
+              f"{queries[0]} requêtes et {guilds} configs relues à chaque intervalle, "
+              f"modifiées ou non")
+
+
+if __name__ == '__main__':
+    main()
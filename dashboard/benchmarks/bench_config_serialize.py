@@ -0,0 +1,113 @@
+"""Sérialisation des GuildConfig : ancien to_dict() écrit à la main (json.loads
+de custom_commands à chaque appel) contre le sérialiseur généré depuis les
+colonnes, en format complet et compact.
+
+Mesure le temps CPU par config, la taille des corps, puis le coût d'un GET
+/api/guild/<id>/config sans cache (chaque requête relit la ligne).
+
+Usage : python benchmarks/bench_config_serialize.py [nb_configs] [requêtes]
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from flask import Flask
+
+from dashboard.api.config import API_KEY, COMPACT_MIMETYPE, config_api, config_cache
+from dashboard.models import db, GuildConfig
+
+
+def legacy_to_dict(self):
+    return {
+        'guild_id': self.guild_id, 'guild_name': self.guild_name, 'guild_icon': self.guild_icon,
+        'prefix': self.prefix, 'language': self.language, 'log_channel_id': self.log_channel_id,
+        'mod_log_channel_id': self.mod_log_channel_id, 'message_log_channel_id': self.message_log_channel_id,
+        'voice_log_channel_id': self.voice_log_channel_id, 'member_log_channel_id': self.member_log_channel_id,
+        'welcome_enabled': self.welcome_enabled, 'welcome_channel_id': self.welcome_channel_id,
+        'welcome_message': self.welcome_message, 'welcome_dm_enabled': self.welcome_dm_enabled,
+        'welcome_dm_message': self.welcome_dm_message, 'leave_enabled': self.leave_enabled,
+        'leave_channel_id': self.leave_channel_id, 'leave_message': self.leave_message,
+        'auto_role_id': self.auto_role_id, 'muted_role_id': self.muted_role_id,
+        'auto_mod_enabled': self.auto_mod_enabled, 'bad_words_enabled': self.bad_words_enabled,
+        'bad_words_action': self.bad_words_action, 'invites_enabled': self.invites_enabled,
+        'invites_action': self.invites_action, 'caps_enabled': self.caps_enabled,
+        'caps_percentage': self.caps_percentage, 'caps_min_length': self.caps_min_length,
+        'giveaway_channel_id': self.giveaway_channel_id,
+        'custom_commands': json.loads(self.custom_commands) if self.custom_commands else {},
+        'total_warns': self.total_warns, 'total_kicks': self.total_kicks,
+        'total_bans': self.total_bans, 'total_mutes': self.total_mutes
+    }
+
+
+def seed_row(rng, i):
+    """Config typique : quelques salons réglés, des compteurs, parfois des commandes"""
+    row = {
+        'guild_id': str(10 ** 17 + i), 'guild_name': f'Serveur {i}',
+        'log_channel_id': str(rng.randrange(10 ** 17, 10 ** 18)),
+        'total_warns': rng.randrange(500), 'total_bans': rng.randrange(50),
+    }
+    if rng.random() < 0.3:
+        row['welcome_channel_id'] = str(rng.randrange(10 ** 17, 10 ** 18))
+    if rng.random() < 0.2:
+        row['custom_commands'] = json.dumps({f'cmd{j}': f'Réponse de la commande {j}' for j in range(20)})
+    return row
+
+
+def timed(rows, serialize, dumps_kwargs, repeat=5):
+    best = float('inf')
+    size = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = sum(len(json.dumps(serialize(row), **dumps_kwargs)) for row in rows)
+        best = min(best, time.perf_counter() - start)
+    return best / len(rows) * 1e6, size / len(rows)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    requests_count = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    rng = random.Random(1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        db.init_app(app)
+        app.register_blueprint(config_api, url_prefix='/api')
+        with app.app_context():
+            db.create_all()
+            db.session.bulk_insert_mappings(GuildConfig, [seed_row(rng, i) for i in range(count)])
+            db.session.commit()
+            rows = GuildConfig.query.all()
+
+            compact = {'separators': (',', ':')}
+            results = [
+                ('ancien to_dict', *timed(rows, legacy_to_dict, {})),
+                ('to_dict', *timed(rows, GuildConfig.to_dict, compact)),
+                ('compact', *timed(rows, GuildConfig.to_compact_dict, compact)),
+            ]
+            print(f"{count} configs")
+            for label, micros, size in results:
+                print(f"{label:15}: {micros:6.1f} µs/config, {size:6.0f} octets/config")
+
+        client = app.test_client()
+        guild_ids = [str(10 ** 17 + rng.randrange(count)) for _ in range(requests_count)]
+        for label, accept in (('GET complet', 'application/json'), ('GET compact', COMPACT_MIMETYPE)):
+            headers = {'X-API-Key': API_KEY, 'Accept': accept}
+            size = 0
+            start = time.process_time()
+            for guild_id in guild_ids:
+                config_cache.clear()
+                size += len(client.get(f'/api/guild/{guild_id}/config', headers=headers).data)
+            cpu = time.process_time() - start
+            print(f"{label:15}: {cpu / requests_count * 1e6:6.0f} µs CPU/requête, "
+                  f"{size / requests_count:6.0f} octets/réponse")
+
+
+if __name__ == '__main__':
+    main()
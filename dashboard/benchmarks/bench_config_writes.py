@@ -0,0 +1,88 @@
+"""Débit des compteurs de modération sur SQLite : une transaction ORM par
+événement (ancien update_guild_config) contre le ConfigWriteBuffer.
+
+Usage : python benchmarks/bench_config_writes.py [événements] [nb_serveurs]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from flask import Flask
+
+from dashboard.api.config import API_KEY, config_api, write_buffer
+from dashboard.api.write_buffer import COUNTER_FIELDS
+from dashboard.models import db, GuildConfig
+
+
+def make_app(path, guilds):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    db.init_app(app)
+    app.register_blueprint(config_api, url_prefix='/api')
+    with app.app_context():
+        db.create_all()
+        db.session.bulk_insert_mappings(GuildConfig, [{'guild_id': str(i)} for i in range(guilds)])
+        db.session.commit()
+    return app
+
+
+def total_counts(app):
+    with app.app_context():
+        return sum(
+            sum(getattr(config, field) for field in COUNTER_FIELDS)
+            for config in GuildConfig.query.all()
+        )
+
+
+def main():
+    events_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    guilds = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    rng = random.Random(1)
+    events = [(str(rng.randrange(guilds)), rng.choice(COUNTER_FIELDS)) for _ in range(events_count)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Ancien chemin : lecture + setattr + commit par événement
+        app = make_app(os.path.join(tmp, 'legacy.db'), guilds)
+        legacy_events = events[:min(2000, events_count)]
+        with app.app_context():
+            start = time.perf_counter()
+            for guild_id, field in legacy_events:
+                config = GuildConfig.query.filter_by(guild_id=guild_id).first()
+                setattr(config, field, getattr(config, field) + 1)
+                db.session.commit()
+            legacy = len(legacy_events) / (time.perf_counter() - start)
+
+        # Buffer : incréments regroupés, une transaction par lot
+        app = make_app(os.path.join(tmp, 'buffer.db'), guilds)
+        start = time.perf_counter()
+        for guild_id, field in events:
+            write_buffer.increment(guild_id, {field: 1})
+        write_buffer.flush()
+        buffered = events_count / (time.perf_counter() - start)
+        assert total_counts(app) == events_count
+
+        # Même chose via HTTP, par lots de 100 événements
+        app = make_app(os.path.join(tmp, 'http.db'), guilds)
+        client = app.test_client()
+        start = time.perf_counter()
+        for i in range(0, events_count, 100):
+            client.post('/api/guilds/counters', headers={'X-API-Key': API_KEY}, json=[
+                {'guild_id': guild_id, field: 1} for guild_id, field in events[i:i + 100]
+            ])
+        write_buffer.flush()
+        http = events_count / (time.perf_counter() - start)
+        assert total_counts(app) == events_count
+
+    print(f"{events_count} événements sur {guilds} serveurs ({write_buffer.flushes} flushs)")
+    print(f"{'commit par événement':<30} {legacy:10.0f} événements/s")
+    print(f"{'ConfigWriteBuffer':<30} {buffered:10.0f} événements/s")
+    print(f"{'HTTP /guilds/counters':<30} {http:10.0f} événements/s")
+
+
+if __name__ == '__main__':
+    main()
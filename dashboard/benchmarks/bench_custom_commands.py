@@ -0,0 +1,140 @@
+"""Commandes personnalisées : migration, résolution par trie et écriture unitaire.
+
+1. Migration du JSON de guild_configs vers la table custom_commands.
+2. Résolution d'un message (préfixe + trigger) : trie contre parcours de
+   toutes les commandes, pour 10 à 1000 commandes par serveur.
+3. Modification d'une commande sur un serveur de 500 commandes : mise à
+   jour de sa ligne contre l'ancienne réécriture du JSON complet (lecture,
+   json.loads, modification, json.dumps, UPDATE), puis le PUT HTTP complet.
+
+Usage : python benchmarks/bench_custom_commands.py [serveurs] [commandes_par_serveur]
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+API_KEY = 'bench-api-key'
+WORDS = ('regles', 'aide', 'info', 'rang', 'musique', 'jeu', 'role', 'event', 'lien', 'boutique')
+
+
+def triggers(count, rng):
+    names = set()
+    while len(names) < count:
+        names.add(f'{rng.choice(WORDS)}{rng.randrange(10 * count)}')
+    return sorted(names)
+
+
+def linear_resolve(prefix, commands, message):
+    lowered = message.lower()
+    best = None
+    for trigger, response in commands:
+        text = prefix + trigger
+        if lowered.startswith(text) and (len(lowered) == len(text) or lowered[len(text)].isspace()):
+            if best is None or len(trigger) > len(best[0]):
+                best = trigger, response
+    return best
+
+
+def timed(func, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    guilds = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    per_guild = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    rng = random.Random(42)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update({
+            'DATABASE_URL': f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+            'SECRET_KEY': 'bench',
+            'DASHBOARD_API_KEY': API_KEY,
+        })
+        import app as dashboard_app
+        from config import Config
+        from dashboard.custom_commands import CommandTrie, migrate_custom_commands, set_command
+        from dashboard.database import upgrade_schema
+        from dashboard.models import db, CustomCommand, GuildConfig
+
+        class BenchConfig(Config):
+            METRICS = False
+
+        application = dashboard_app.create_app(BenchConfig)
+        with application.app_context():
+            upgrade_schema()
+            db.session.execute(db.insert(GuildConfig.__table__), [
+                {'guild_id': str(10 ** 17 + i), 'prefix': '!',
+                 'custom_commands': json.dumps({name: f'Réponse {name}' for name in triggers(per_guild, rng)})}
+                for i in range(guilds)
+            ])
+            db.session.commit()
+            start = time.perf_counter()
+            migrated, _ = migrate_custom_commands()
+            elapsed = time.perf_counter() - start
+            print(f"migration : {migrated} commandes de {guilds} serveurs en {elapsed:.2f} s "
+                  f"({migrated / elapsed:,.0f} commandes/s), "
+                  f"{db.session.query(CustomCommand).count()} lignes en table")
+
+        print("résolution (µs/message) :   trie   parcours")
+        for count in (10, 100, 1000):
+            commands = [(name, f'Réponse {name}') for name in triggers(count, rng)]
+            trie = CommandTrie('!', commands)
+            messages = [f'!{rng.choice(commands)[0]} @membre raison' if rng.random() < 0.7 else
+                        f'salut {rng.choice(WORDS)}' for _ in range(2000)]
+            assert all((trie.resolve(m) or {}).get('trigger') == (linear_resolve('!', commands, m) or (None,))[0]
+                       for m in messages)
+            trie_time = timed(lambda: [trie.resolve(m) for m in messages])
+            linear_time = timed(lambda: [linear_resolve('!', commands, m) for m in messages])
+            print(f"  {count:5} commandes          {trie_time / len(messages) * 1e6:6.2f}   "
+                  f"{linear_time / len(messages) * 1e6:8.2f}")
+
+        # Écriture d'une commande sur un gros serveur
+        client = application.test_client()
+        headers = {'X-API-Key': API_KEY}
+        big_guild = '1'
+        big = {name: f'Réponse {name}' for name in triggers(500, rng)}
+        with application.app_context():
+            db.session.add(GuildConfig(guild_id=big_guild, custom_commands=json.dumps(big)))
+            db.session.commit()
+            migrate_custom_commands()
+            db.session.add(GuildConfig(guild_id='2', custom_commands=json.dumps(big)))
+            db.session.commit()
+
+        updates = 300
+        with application.app_context():
+            start = time.perf_counter()
+            for i in range(updates):
+                set_command(big_guild, f'regles{i % 50}', f'v{i}')
+            row_time = (time.perf_counter() - start) / updates
+
+            start = time.perf_counter()
+            for i in range(updates):
+                config = GuildConfig.query.filter_by(guild_id='2').first()
+                commands = json.loads(config.custom_commands)
+                commands[f'regles{i % 50}'] = f'v{i}'
+                config.custom_commands = json.dumps(commands)
+                db.session.commit()
+            blob_time = (time.perf_counter() - start) / updates
+
+        start = time.perf_counter()
+        for i in range(updates):
+            client.put(f'/api/guild/{big_guild}/commands/regles{i % 50}', json={'response': f'v{i}'}, headers=headers)
+        put_time = (time.perf_counter() - start) / updates
+        print(f"modification d'une commande (500 sur le serveur) : ligne {row_time * 1000:.2f} ms, "
+              f"réécriture du JSON {blob_time * 1000:.2f} ms ; PUT HTTP complet {put_time * 1000:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
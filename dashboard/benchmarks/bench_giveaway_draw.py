@@ -0,0 +1,121 @@
+"""Tirage d'un giveaway à 1M de participants.
+
+1. Ingestion : flux NDJSON envoyé en une requête sur
+   POST /api/giveaway/<id>/entrants (participants sans le rôle requis rejetés).
+2. Tirage : un passage sur les participants lus par lots, tas de taille k,
+   comparé au chargement de toute la liste puis random.sample. Mémoire
+   mesurée avec tracemalloc.
+3. Relance hors gagnants précédents, puis vérification de la graine :
+   le même tirage refait dans un autre ordre donne les mêmes gagnants.
+
+Usage : python benchmarks/bench_giveaway_draw.py [participants] [gagnants]
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+API_KEY = 'bench-api-key'
+MESSAGE_ID = '900000000000000000'
+
+
+def measure(func):
+    """(résultat, durée, pic mémoire) ; tracemalloc ralentit : mesures séparées"""
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    winners = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    rng = random.Random(42)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update({
+            'DATABASE_URL': f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+            'SECRET_KEY': 'bench',
+            'DASHBOARD_API_KEY': API_KEY,
+        })
+        import app as dashboard_app
+        from config import Config
+        from sqlalchemy import select
+        from dashboard.database import upgrade_schema
+        from dashboard.giveaway_draw import DRAW_FETCH_SIZE, draw_winners, run_draw
+        from dashboard.models import db, Giveaway, GiveawayEntrant
+
+        class BenchConfig(Config):
+            METRICS = False
+
+        application = dashboard_app.create_app(BenchConfig)
+        with application.app_context():
+            upgrade_schema()
+            db.session.add(Giveaway(message_id=MESSAGE_ID, guild_id='1', channel_id='1', prize='Nitro',
+                                    host_id='1', winners_count=winners, role_required='42'))
+            db.session.commit()
+
+        # 2 % des lignes sans le rôle requis, 10 % avec des chances bonus
+        body = '\n'.join(json.dumps({
+            'user_id': str(10 ** 17 + i),
+            'roles': ['42'] if rng.random() >= 0.02 else ['7'],
+            'weight': 3 if rng.random() < 0.1 else 1,
+        }) for i in range(count)).encode()
+        client = application.test_client()
+        headers = {'X-API-Key': API_KEY}
+        start = time.perf_counter()
+        result = client.post(f'/api/giveaway/{MESSAGE_ID}/entrants', data=body, headers=headers).get_json()
+        elapsed = time.perf_counter() - start
+        print(f"ingestion : {count} lignes ({len(body) / 1e6:.0f} Mo) en {elapsed:.1f} s "
+              f"({count / elapsed:,.0f} lignes/s) : {result['accepted']} acceptés, "
+              f"{result['rejected']} rejetés (rôle)")
+
+        with application.app_context():
+            giveaway = Giveaway.query.filter_by(message_id=MESSAGE_ID).first()
+            entrants = select(GiveawayEntrant.user_id, GiveawayEntrant.weight).where(
+                GiveawayEntrant.giveaway_id == giveaway.id)
+
+            def stream_draw():
+                rows = db.session.connection().execute(entrants.execution_options(yield_per=DRAW_FETCH_SIZE))
+                return draw_winners(rows, winners, 'bench-seed')
+
+            def load_then_sample():
+                rows = db.session.execute(entrants).all()
+                population = [user_id for user_id, _ in rows]
+                return random.Random('bench-seed').sample(population, winners)
+
+            (stream_winners, candidates), stream_time, stream_peak = measure(stream_draw)
+            _, load_time, load_peak = measure(load_then_sample)
+            print(f"tirage de {winners} parmi {candidates} : un passage {stream_time:.2f} s, "
+                  f"pic mémoire {stream_peak / 1e6:.1f} Mo ; liste complète + random.sample "
+                  f"{load_time:.2f} s, pic {load_peak / 1e6:.1f} Mo (sans poids)")
+
+            start = time.perf_counter()
+            draw = run_draw(giveaway, winners)
+            draw_time = time.perf_counter() - start
+            start = time.perf_counter()
+            reroll = run_draw(giveaway, 1, reroll=True)
+            reroll_time = time.perf_counter() - start
+            print(f"run_draw (tirage enregistré) : {draw_time:.2f} s ; relance d'un gagnant "
+                  f"hors {reroll.excluded} précédents : {reroll_time:.2f} s")
+
+            rows = db.session.execute(entrants.order_by(GiveawayEntrant.id.desc())).all()
+            replay, _ = draw_winners(rows, winners, draw.seed)
+            print(f"graine {draw.seed} rejouée dans l'ordre inverse : "
+                  f"{'mêmes gagnants' if replay == json.loads(draw.winners) else 'DIFFÉRENT'}")
+            assert not set(json.loads(reroll.winners)) & set(json.loads(draw.winners))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""Planificateur de giveaways : 100k giveaways en cours, horloge simulée et
+faux serveur d'API du bot.
+
+Mesure le chargement initial, le coût des ajouts/reports/annulations, puis
+avance l'horloge pour terminer tous les giveaways et vérifie que chacun est
+terminé une seule fois, jamais avant son échéance.
+
+Usage : python benchmarks/bench_giveaway_scheduler.py [giveaways]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from benchmarks.stub_bot_api import start_stub
+
+server, url = start_stub()
+os.environ['BOT_API_URL'] = url
+os.environ['BOT_API_POOL_SIZE'] = '32'
+
+from flask import Flask
+
+import bot_api
+from dashboard.giveaway_scheduler import GiveawayScheduler, to_timestamp
+from dashboard.models import db, Giveaway
+
+START = datetime(2026, 1, 1)
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rng = random.Random(3)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        db.init_app(app)
+        with app.app_context():
+            db.create_all()
+            db.session.bulk_insert_mappings(Giveaway, [{
+                'message_id': str(i), 'guild_id': '1', 'channel_id': '1', 'prize': 'Nitro',
+                'host_id': '1', 'ended': False,
+                'end_time': START + timedelta(seconds=rng.randrange(7 * 86400)),
+            } for i in range(count)])
+            db.session.commit()
+            deadlines = {g.message_id: to_timestamp(g.end_time) for g in Giveaway.query}
+
+        fired = {}
+        bot_time = [0.0]
+        clock = FakeClock(to_timestamp(START))
+
+        def end_giveaways(message_ids):
+            for message_id in message_ids:
+                assert message_id not in fired, f"{message_id} terminé deux fois"
+                assert clock.now >= deadlines[message_id], f"{message_id} terminé trop tôt"
+                fired[message_id] = clock.now
+            t = time.perf_counter()
+            ended = bot_api.end_giveaways(message_ids)
+            bot_time[0] += time.perf_counter() - t
+            return ended
+
+        scheduler = GiveawayScheduler(end_giveaways, clock=clock, batch_size=500)
+        start = time.perf_counter()
+        scheduler.init_app(app, start=False)
+        print(f"chargement de {len(scheduler)} giveaways : {(time.perf_counter() - start) * 1000:.0f} ms")
+
+        # Reports et annulations sans relire la table
+        ops = count // 10
+        moved = rng.sample(sorted(deadlines), ops)
+        start = time.perf_counter()
+        for message_id in moved[:ops // 2]:
+            deadlines[message_id] += 3600
+            scheduler.schedule(message_id, deadlines[message_id])
+        cancelled = set(moved[ops // 2:])
+        for message_id in cancelled:
+            scheduler.cancel(message_id)
+        elapsed = time.perf_counter() - start
+        print(f"{ops} reports/annulations : {elapsed / ops * 1e6:.1f} µs/opération")
+        with app.app_context():
+            # Les annulations doivent aussi être visibles en base pour la revalidation
+            for message_id in moved[:ops // 2]:
+                Giveaway.query.filter_by(message_id=message_id).update(
+                    {'end_time': datetime.utcfromtimestamp(deadlines[message_id])})
+            db.session.commit()
+
+        # Avancer l'horloge heure par heure jusqu'à la dernière échéance
+        before = server.request_count
+        start = time.perf_counter()
+        end = max(deadlines.values()) + 3600
+        while clock.now <= end:
+            while scheduler.process_due():
+                pass
+            clock.now += 3600
+        elapsed = time.perf_counter() - start
+
+        expected = count - len(cancelled)
+        assert len(fired) == expected, (len(fired), expected)
+        assert not cancelled & set(fired)
+        with app.app_context():
+            assert Giveaway.query.filter_by(ended=True).count() == expected
+        print(f"{expected} giveaways terminés en {elapsed:.1f} s, dont {bot_time[0]:.1f} s d'appels "
+              f"HTTP au stub ({server.request_count - before} appels)")
+        print(f"coût du planificateur hors HTTP : {(elapsed - bot_time[0]) / expected * 1e6:.0f} µs/giveaway")
+        print("OK : chaque giveaway terminé une fois, à échéance, annulations respectées")
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""Débit de l'ingestion des événements du bot (POST /api/events, NDJSON).
+
+Envoie des lots mélangés (70 % modération, 25 % logs, 5 % giveaways) à
+une base SQLite en WAL, puis renvoie un lot déjà accepté pour vérifier le
+dédoublonnage et compare le nombre de lignes en base au nombre d'événements.
+
+Usage : python benchmarks/bench_ingest.py [événements] [taille_lot]
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+API_KEY = 'bench-api-key'
+
+
+def setup_env(database_url):
+    os.environ.update({
+        'DATABASE_URL': database_url,
+        'SECRET_KEY': 'bench',
+        'DASHBOARD_API_KEY': API_KEY,
+        'BOT_API_URL': 'http://127.0.0.1:9',
+    })
+
+
+def make_event(index, rng):
+    event_id = f'evt-{index}'
+    guild_id = str(10 ** 17 + rng.randrange(1000))
+    created_at = time.time() - rng.randrange(86400)
+    kind = rng.random()
+    if kind < 0.70:
+        return {'event_id': event_id, 'type': 'moderation', 'guild_id': guild_id,
+                'action_type': rng.choice(('warn', 'kick', 'ban', 'mute')),
+                'user_id': str(rng.randrange(10 ** 6)), 'user_name': 'membre',
+                'moderator_id': str(rng.randrange(50)), 'moderator_name': 'modo',
+                'reason': 'spam', 'created_at': created_at}
+    if kind < 0.95:
+        return {'event_id': event_id, 'type': 'log', 'guild_id': guild_id, 'level': 'info',
+                'category': 'command', 'message': f'Commande !help utilisée ({index})',
+                'data': {'channel_id': str(rng.randrange(10 ** 6))}, 'created_at': created_at}
+    return {'event_id': event_id, 'type': 'giveaway', 'guild_id': guild_id,
+            'message_id': str(5 * 10 ** 17 + rng.randrange(2000)), 'channel_id': '1', 'prize': 'Nitro',
+            'winners_count': 1, 'entrants': rng.randrange(500), 'host_id': '42',
+            'end_time': created_at + 7 * 86400, 'created_at': created_at}
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    rng = random.Random(42)
+    batches = []
+    for offset in range(0, total, batch_size):
+        lines = (json.dumps(make_event(i, rng)) for i in range(offset, min(total, offset + batch_size)))
+        batches.append('\n'.join(lines).encode())
+
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_env(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        import app as dashboard_app
+        from config import Config
+        from dashboard.database import upgrade_schema
+        from dashboard.models import db, BotLog, Giveaway, IngestedEvent, ModerationLog
+
+        class BenchConfig(Config):
+            METRICS = False
+
+        application = dashboard_app.create_app(BenchConfig)
+        with application.app_context():
+            upgrade_schema()
+        client = application.test_client()
+        headers = {'X-API-Key': API_KEY, 'Content-Type': 'application/x-ndjson'}
+
+        accepted = 0
+        start = time.perf_counter()
+        for number, body in enumerate(batches):
+            response = client.post('/api/events', data=body, headers=dict(headers, **{'X-Batch-Id': str(number)}))
+            ack = response.get_json()
+            assert response.status_code == 200 and not ack['rejected'], ack
+            accepted += ack['accepted']
+        elapsed = time.perf_counter() - start
+        print(f"{total} événements en lots de {batch_size} : {elapsed:.2f} s, "
+              f"{total / elapsed:,.0f} événements/s ({elapsed / len(batches) * 1000:.1f} ms/lot)")
+
+        # Renvoi d'un lot déjà acquitté (accusé perdu côté bot)
+        ack = client.post('/api/events', data=batches[0], headers=headers).get_json()
+        print(f"renvoi du premier lot : {ack['accepted']} accepté(s), {ack['duplicates']} doublon(s)")
+
+        with application.app_context():
+            rows = {
+                'moderation': db.session.query(ModerationLog).count(),
+                'log': db.session.query(BotLog).count(),
+                'giveaway': db.session.query(Giveaway).count(),
+                'clés': db.session.query(IngestedEvent).count(),
+            }
+        giveaway_events = sum(1 for body in batches for line in body.splitlines() if b'"giveaway"' in line)
+        print(f"en base : {rows} ; {accepted} acceptés ({giveaway_events} événements giveaway "
+              f"regroupés par message_id) : {'ok' if rows['clés'] == total == accepted else 'ÉCART'}")
+
+
+if __name__ == '__main__':
+    main()
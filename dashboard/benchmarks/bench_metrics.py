@@ -0,0 +1,173 @@
+"""Coût de l'instrumentation (/metrics) sur un mélange de requêtes.
+
+Chaque mode tourne dans un processus séparé (les hooks SQLAlchemy sont
+globaux), sans et avec métriques, en séries alternées. Mélange : page d'accueil, /health,
+lecture de config en base (cache de configs réduit à une entrée pour que
+chaque lecture fasse ses requêtes SQL) et 404. Vérifie ensuite le mode
+multi-processus : N workers écrivent leurs compteurs, un seul scrape les
+additionne, et mesure le temps de rendu de /metrics.
+
+Usage : python benchmarks/bench_metrics.py [requêtes_par_série] [workers]
+"""
+import multiprocessing
+import os
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+GUILDS = 500
+
+
+def setup_env(database_url, multiproc_dir=None):
+    os.environ.update({
+        'DATABASE_URL': database_url,
+        'SECRET_KEY': 'bench',
+        'CONFIG_CACHE_SIZE': '1',
+        'BOT_API_URL': 'http://127.0.0.1:9',
+    })
+    if multiproc_dir:
+        os.environ['METRICS_MULTIPROC_DIR'] = multiproc_dir
+
+
+def create(enabled):
+    import app as dashboard_app
+    from config import Config
+
+    class BenchConfig(Config):
+        METRICS = enabled
+        PAGE_CACHE = False
+
+    return dashboard_app.create_app(BenchConfig)
+
+
+def seed(database_url):
+    setup_env(database_url)
+    application = create(False)
+    from dashboard.database import upgrade_schema
+    from dashboard.models import db, GuildConfig
+    with application.app_context():
+        upgrade_schema()
+        db.session.add_all(GuildConfig(guild_id=str(10 ** 17 + i)) for i in range(GUILDS))
+        db.session.commit()
+
+
+def paths(count):
+    rng = random.Random(42)
+    mix = []
+    for i in range(count):
+        kind = i % 4
+        if kind == 0:
+            mix.append('/')
+        elif kind == 1:
+            mix.append('/health')
+        elif kind == 2:
+            mix.append(f'/api/guild/{10 ** 17 + rng.randrange(GUILDS)}/config')
+        else:
+            mix.append('/nope')
+    return mix
+
+
+def run_mode(database_url, enabled, count, conn):
+    """Exécute une série de requêtes à chaque demande du processus parent"""
+    setup_env(database_url)
+    application = create(enabled)
+    client = application.test_client()
+    headers = {'X-API-Key': os.getenv('DASHBOARD_API_KEY', 'your-secret-key')}
+    mix = paths(count)
+    for path in mix[:200]:
+        client.get(path, headers=headers)
+
+    while conn.recv():
+        start = time.perf_counter()
+        for path in mix:
+            client.get(path, headers=headers)
+        conn.send((time.perf_counter() - start) / count)
+
+    render = None
+    if enabled:
+        start = time.perf_counter()
+        for _ in range(50):
+            client.get('/metrics')
+        render = (time.perf_counter() - start) / 50
+    conn.send(render)
+
+
+def worker(database_url, multiproc_dir, count):
+    setup_env(database_url, multiproc_dir)
+    application = create(True)
+    client = application.test_client()
+    for _ in range(count):
+        client.get('/health')
+    # Equivalent du thread d'écriture périodique (multiprocessing sort sans atexit)
+    application.extensions['metrics'].write()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    rounds = 15
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        process = multiprocessing.Process(target=seed, args=(database_url,))
+        process.start()
+        process.join()
+
+        # Séries alternées entre quatre processus lancés dans l'ordre
+        # sans/avec/avec/sans : le bruit de la machine et l'écart propre à
+        # chaque processus touchent les deux modes de la même façon
+        processes = []
+        for enabled in (False, True, True, False):
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=run_mode, args=(database_url, enabled, count, child))
+            process.start()
+            processes.append((enabled, parent, process))
+        timings = {False: [], True: []}
+        for _ in range(rounds):
+            for enabled, parent, _ in processes:
+                parent.send(True)
+                timings[enabled].append(parent.recv())
+        renders = []
+        for enabled, parent, process in processes:
+            parent.send(False)
+            renders.append(parent.recv())
+            process.join()
+        medians = {enabled: statistics.median(values) for enabled, values in timings.items()}
+        for enabled in (False, True):
+            label = 'avec métriques' if enabled else 'sans métriques'
+            print(f"{label:15}: {medians[enabled] * 1e6:7.1f} µs/requête (médiane de {len(timings[enabled])} séries)")
+        render = statistics.mean(value for value in renders if value)
+        print(f"rendu /metrics : {render * 1000:7.2f} ms")
+        overhead = medians[True] - medians[False]
+        print(f"surcoût        : {overhead * 1e6:7.1f} µs/requête ({overhead / medians[False]:+.1%})")
+
+        # Mode multi-processus : chaque worker écrit son propre fichier
+        multiproc_dir = os.path.join(tmp, 'metrics')
+        per_worker = 250
+        processes = [
+            multiprocessing.Process(target=worker, args=(database_url, multiproc_dir, per_worker))
+            for _ in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        setup_env(database_url, multiproc_dir)
+        application = create(True)
+        start = time.perf_counter()
+        body = application.test_client().get('/metrics').get_data(as_text=True)
+        elapsed = time.perf_counter() - start
+        match = re.search(r'paradise_http_requests_total\{endpoint="main.health",method="GET",status="200"\} (\d+)', body)
+        total = int(match.group(1)) if match else 0
+        print(f"{workers} workers x {per_worker} requêtes /health : {total} comptées par un seul scrape "
+              f"({'ok' if total == workers * per_worker else 'ÉCART'}), agrégation {elapsed * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""Latence des pages de /api/guild/<id>/moderation sur une grosse table.
+
+Remplit moderation_logs (5M lignes par défaut), puis mesure le p99 d'une
+page sur la première page et sur des pages profondes (atteintes par
+curseur). Avec la pagination keyset, le p99 doit rester plat.
+
+Usage : python benchmarks/bench_moderation_pages.py [lignes] [échantillons]
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from flask import Flask
+
+from dashboard.models import db, ModerationLog
+from dashboard.moderation_logs import encode_cursor, moderation_page
+
+GUILD_ID = '1000'
+ACTIONS = ('warn', 'kick', 'ban', 'mute', 'unmute')
+
+
+def seed(path, rows):
+    """Insère `rows` lignes (la moitié pour GUILD_ID) directement avec sqlite3"""
+    rng = random.Random(7)
+    start = datetime(2024, 1, 1)
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode=OFF')
+    conn.execute('PRAGMA synchronous=OFF')
+    batch = 100000
+    for offset in range(0, rows, batch):
+        conn.executemany(
+            'INSERT INTO moderation_logs (guild_id, action_type, user_id, moderator_id, reason, created_at) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (
+                (GUILD_ID if i % 2 else str(2000 + i % 50), rng.choice(ACTIONS),
+                 str(rng.randrange(100000)), str(rng.randrange(20)), 'spam',
+                 (start + timedelta(seconds=i * 5)).isoformat(sep=' ', timespec='microseconds'))
+                for i in range(offset, min(offset + batch, rows))
+            )
+        )
+    conn.commit()
+    conn.close()
+
+
+def p99(samples):
+    samples = sorted(samples)
+    return samples[int(len(samples) * 0.99) - 1] * 1000
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000_000
+    samples = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+        db.init_app(app)
+        with app.app_context():
+            db.create_all()
+
+        start = time.perf_counter()
+        seed(path, rows)
+        print(f"{rows} lignes insérées en {time.perf_counter() - start:.0f} s")
+
+        with app.app_context():
+            guild_rows = ModerationLog.query.filter_by(guild_id=GUILD_ID).count()
+            depths = [0, guild_rows // 100, guild_rows // 10, guild_rows // 2, guild_rows - 100]
+            results = {}
+            for depth in depths:
+                cursor = None
+                if depth:
+                    anchor = (ModerationLog.query.filter_by(guild_id=GUILD_ID)
+                              .order_by(ModerationLog.created_at.desc(), ModerationLog.id.desc())
+                              .offset(depth - 1).first())
+                    cursor = encode_cursor(anchor)
+                for filters in ({}, {'action_type': 'ban'}):
+                    timings = []
+                    for _ in range(samples):
+                        t = time.perf_counter()
+                        logs, _ = moderation_page(GUILD_ID, cursor=cursor, limit=50, **filters)
+                        timings.append(time.perf_counter() - t)
+                        db.session.expunge_all()
+                    results[(depth, bool(filters))] = p99(timings)
+
+        print(f"{'profondeur':>12} {'p99 sans filtre':>16} {'p99 action=ban':>16}")
+        for depth in depths:
+            print(f"{depth:>12} {results[(depth, False)]:>13.2f} ms {results[(depth, True)]:>13.2f} ms")
+
+        first = max(results[(0, False)], results[(0, True)])
+        worst = max(results.values())
+        assert worst < first * 3 + 1, f"p99 non plat : {first:.2f} ms -> {worst:.2f} ms"
+        print("OK : p99 stable quelle que soit la profondeur")
+
+
+if __name__ == '__main__':
+    main()
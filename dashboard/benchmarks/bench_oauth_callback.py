@@ -0,0 +1,113 @@
+"""Connexion Discord (/callback) contre un faux serveur Discord local.
+
+Compare l'ancien enchaînement (3 appels requests en série, sans session)
+au callback actuel (échange du code puis utilisateur et serveurs en
+parallèle sur une session partagée). Vérifie ensuite la gestion des 429
+et le renouvellement du token par refresh token.
+
+Usage : python benchmarks/bench_oauth_callback.py [connexions] [latence_ms]
+"""
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from stub_discord import start_stub
+
+
+def legacy_login(api_url, code):
+    import requests
+    credentials = requests.post(f'{api_url}/oauth2/token', data={
+        'grant_type': 'authorization_code', 'code': code
+    }, timeout=10).json()
+    headers = {'Authorization': f"Bearer {credentials['access_token']}"}
+    requests.get(f'{api_url}/users/@me', headers=headers, timeout=10).json()
+    requests.get(f'{api_url}/users/@me/guilds', headers=headers, timeout=10).json()
+
+
+def login(application):
+    client = application.test_client()
+    response = client.get('/callback?code=bench')
+    return response.status_code == 302 and response.headers['Location'].endswith('/dashboard')
+
+
+def timed(func, count):
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - start)
+    return statistics.median(latencies) * 1000
+
+
+def concurrent_logins(application, threads, per_thread):
+    results = []
+
+    def worker():
+        results.extend(login(application) for _ in range(per_thread))
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return len(results) / (time.perf_counter() - start), results.count(False)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    latency = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.1
+    server, api_url = start_stub(latency=latency)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update({
+            'DISCORD_API_URL': api_url,
+            'DATABASE_URL': f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+            'SECRET_KEY': 'bench',
+        })
+        import app as dashboard_app
+        from dashboard.database import upgrade_schema
+
+        application = dashboard_app.create_app()
+        application.config['PAGE_CACHE'] = False
+        with application.app_context():
+            upgrade_schema()
+
+        print(f"Latence Discord simulée : {latency * 1000:.0f} ms par appel")
+        legacy = timed(lambda: legacy_login(api_url, 'bench'), count)
+        print(f"ancien callback (série)   : {legacy:6.0f} ms médian")
+        current = timed(lambda: login(application), count)
+        print(f"callback parallèle        : {current:6.0f} ms médian")
+
+        rate, failures = concurrent_logins(application, 8, max(1, count // 8))
+        print(f"8 connexions simultanées  : {rate:6.1f} connexions/s, {failures} échecs")
+
+        # Un appel sur 5 reçoit un 429 : le seau partagé attend retry_after
+        server.rate_limit_every = 5
+        rate, failures = concurrent_logins(application, 8, max(1, count // 8))
+        import discord_oauth
+        print(f"avec 429 (1 requête sur 5): {rate:6.1f} connexions/s, {failures} échecs, "
+              f"{server.rate_limited} réponses 429, seau : {discord_oauth.client.bucket.status()}")
+        server.rate_limit_every = 0
+
+        # Token expiré : la liste des serveurs est rafraîchie via le refresh token
+        server.expires_in = 1
+        login(application)
+        time.sleep(1.1)
+        guild_store = application.extensions['guild_store']
+        guild_store.ttl = 0
+        guilds = guild_store.get_all('1000')
+        print(f"refresh token             : {server.refresh_count} renouvellement(s), "
+              f"{len(guilds)} serveurs admin relus sans reconnexion")
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
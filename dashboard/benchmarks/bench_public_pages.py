@@ -0,0 +1,143 @@
+"""Débit des pages publiques (/, /commands, /invite) et du CSS, servis par un
+vrai serveur HTTP local (processus séparé) et interrogés par des clients
+concurrents en keep-alive, sans puis avec le cache de pages et la compression.
+
+Deux profils de clients : nouveaux visiteurs (Accept-Encoding: gzip, sans
+ETag) et revalidation (If-None-Match avec l'ETag reçu). Le temps passé dans
+l'application seule (client de test, sans réseau) est aussi mesuré : sur une
+petite machine, le serveur HTTP de développement et les clients dominent.
+
+Usage : python benchmarks/bench_public_pages.py [clients] [requêtes_par_client]
+"""
+import http.client
+import multiprocessing
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+PATHS = ['/', '/commands', '/invite']
+
+
+def serve(port, cached, database_url, ready):
+    os.environ['DATABASE_URL'] = database_url
+    os.environ.setdefault('SECRET_KEY', 'bench')
+    from werkzeug.serving import WSGIRequestHandler, make_server
+    import app as dashboard_app
+
+    application = dashboard_app.create_app()
+    application.config['PAGE_CACHE'] = cached
+    application.config['COMPRESS'] = cached
+
+    class Handler(WSGIRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server('127.0.0.1', port, application, threaded=True, request_handler=Handler)
+    ready.set()
+    server.serve_forever()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def client(port, paths, requests_count, revalidate, results):
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    etags = {}
+    latencies, sizes = [], []
+    for i in range(requests_count):
+        path = paths[i % len(paths)]
+        headers = {'Accept-Encoding': 'gzip'}
+        if revalidate and path in etags:
+            headers['If-None-Match'] = etags[path]
+        start = time.perf_counter()
+        conn.request('GET', path, headers=headers)
+        response = conn.getresponse()
+        body = response.read()
+        latencies.append(time.perf_counter() - start)
+        sizes.append(len(body))
+        if response.getheader('ETag'):
+            etags[path] = response.getheader('ETag')
+    conn.close()
+    results.append((latencies, sizes))
+
+
+def run(port, paths, clients, requests_count, revalidate):
+    results = []
+    threads = [
+        threading.Thread(target=client, args=(port, paths, requests_count, revalidate, results))
+        for _ in range(clients)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    latencies = sorted(latency for result in results for latency in result[0])
+    sizes = [size for result in results for size in result[1]]
+    return len(latencies) / elapsed, latencies[int(len(latencies) * 0.95)], statistics.mean(sizes)
+
+
+def app_time(database_url, cached, paths, count=1000):
+    os.environ['DATABASE_URL'] = database_url
+    os.environ.setdefault('SECRET_KEY', 'bench')
+    import app as dashboard_app
+
+    application = dashboard_app.create_app()
+    application.config['PAGE_CACHE'] = cached
+    application.config['COMPRESS'] = cached
+    client = application.test_client()
+    for path in paths:
+        client.get(path)
+    start = time.perf_counter()
+    for i in range(count):
+        client.get(paths[i % len(paths)], headers={'Accept-Encoding': 'gzip'})
+    return (time.perf_counter() - start) / count
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    requests_count = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    print(f"{clients} clients x {requests_count} requêtes")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        for label, cached in (('avant', False), ('après', True)):
+            port = free_port()
+            ready = multiprocessing.Event()
+            server = multiprocessing.Process(target=serve, args=(port, cached, database_url, ready), daemon=True)
+            server.start()
+            ready.wait(30)
+
+            # URL versionnée du CSS, telle que la page la référence
+            conn = http.client.HTTPConnection('127.0.0.1', port)
+            conn.request('GET', '/')
+            page = conn.getresponse().read().decode()
+            conn.close()
+            css = page[page.index('/static/css/style.css'):].split('"', 1)[0]
+
+            micros = app_time(database_url, cached, PATHS) * 1e6
+            print(f"{label:6} application seule  pages: {micros:7.0f} µs/requête")
+            for profile, revalidate in (('nouveaux visiteurs', False), ('revalidation', True)):
+                for name, paths in (('pages', PATHS), ('css', [css])):
+                    rate, p95, size = run(port, paths, clients, requests_count, revalidate)
+                    print(f"{label:6} {profile:18} {name:5}: {rate:7.0f} req/s, "
+                          f"p95 {p95 * 1000:6.1f} ms, {size:7.0f} octets/réponse")
+            server.terminate()
+            server.join()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Coût par requête de la session : liste des serveurs dans le cookie signé
+(ancien comportement) contre session côté serveur + GuildStore.
+
+Usage : python benchmarks/bench_sessions.py [nb_serveurs] [requêtes]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from flask import Flask, jsonify, session
+
+from session_store import GuildStore, LRUStore, ServerSideSessionInterface
+
+
+def make_guilds(count):
+    # Données peu compressibles, comme les vraies réponses Discord
+    rng = random.Random(42)
+    return [{
+        'id': str(rng.randrange(10 ** 17, 10 ** 18)),
+        'name': f"Serveur {rng.getrandbits(48):x}",
+        'icon': f"{rng.getrandbits(128):032x}",
+        'owner': False,
+        'permissions': 2147483647,
+        'features': rng.sample(['COMMUNITY', 'NEWS', 'PARTNERED', 'VERIFIED', 'DISCOVERABLE'], 2),
+    } for _ in range(count)]
+
+
+def cookie_app(guilds):
+    app = Flask(__name__)
+    app.secret_key = 'bench'
+
+    @app.route('/login')
+    def login():
+        session['_user_id'] = '1'
+        session['guilds'] = guilds
+        return 'ok'
+
+    @app.route('/guild/<guild_id>')
+    def guild(guild_id):
+        found = next((g for g in session.get('guilds', []) if g['id'] == guild_id), None)
+        return jsonify(found)
+
+    return app
+
+
+def server_side_app(guilds, sqlite_path=None):
+    app = Flask(__name__)
+    app.secret_key = 'bench'
+    app.session_interface = ServerSideSessionInterface(LRUStore(sqlite_path=sqlite_path, table='sessions'))
+    store = GuildStore(LRUStore(sqlite_path=sqlite_path, table='user_guilds'), fetch=lambda token: guilds)
+
+    @app.route('/login')
+    def login():
+        session['_user_id'] = '1'
+        store.put('1', guilds, 'token')
+        return 'ok'
+
+    @app.route('/guild/<guild_id>')
+    def guild(guild_id):
+        return jsonify(store.get(session['_user_id'], guild_id))
+
+    return app
+
+
+def bench(label, app, guild_id, requests_count):
+    client = app.test_client()
+    login = client.get('/login')
+    cookie = login.headers.get('Set-Cookie', '')
+    cookie_size = len(cookie.split(';')[0])
+
+    client.get(f'/guild/{guild_id}')
+    start = time.perf_counter()
+    for _ in range(requests_count):
+        client.get(f'/guild/{guild_id}')
+    elapsed = (time.perf_counter() - start) / requests_count
+    warning = '  (> 4 Ko, rejeté par les navigateurs)' if cookie_size > 4093 else ''
+    print(f"{label:<28} {elapsed * 1e6:9.0f} µs/requête   cookie {cookie_size:6d} o{warning}")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    requests_count = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    guilds = make_guilds(count)
+    last_id = guilds[-1]['id']
+
+    print(f"{count} serveurs par utilisateur, {requests_count} requêtes")
+    bench("cookie signé (avant)", cookie_app(guilds), last_id, requests_count)
+    bench("serveur, mémoire", server_side_app(guilds), last_id, requests_count)
+    with tempfile.TemporaryDirectory() as tmp:
+        bench("serveur, SQLite", server_side_app(guilds, os.path.join(tmp, 's.db')), last_id, requests_count)
+
+
+if __name__ == '__main__':
+    main()
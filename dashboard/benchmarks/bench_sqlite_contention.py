@@ -0,0 +1,126 @@
+"""Contention en écriture sur SQLite avec plusieurs processus (workers).
+
+Chaque processus enchaîne des transactions lecture + écriture (config du
+serveur puis log de modération), chacune suivie de lectures de pages de
+logs, comme les routes du dashboard. Deux
+réglages sont comparés sur le même fichier :
+  - avant : journal rollback, pas de pragmas, pas de nouvel essai
+  - après : init_db (WAL, synchronous=NORMAL, busy_timeout...) + retry_on_locked
+
+Usage : python benchmarks/bench_sqlite_contention.py [processus] [transactions] [nb_serveurs] [lectures]
+"""
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from flask import Flask
+from sqlalchemy import func, update
+from sqlalchemy.exc import OperationalError
+
+from dashboard.database import init_db, retry_on_locked
+from dashboard.models import db, GuildConfig, ModerationLog
+from dashboard.moderation_logs import moderation_page
+
+
+def make_app(path, tuned):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    if tuned:
+        init_db(app)
+    else:
+        db.init_app(app)
+    return app
+
+
+def write_event(guild_id, rng):
+    GuildConfig.query.filter_by(guild_id=guild_id).first()
+    db.session.execute(
+        update(GuildConfig).where(GuildConfig.guild_id == guild_id)
+        .values(total_warns=func.coalesce(GuildConfig.total_warns, 0) + 1)
+    )
+    db.session.add(ModerationLog(
+        guild_id=guild_id, action_type='warn',
+        user_id=str(rng.randrange(10 ** 6)), moderator_id='1', reason='bench'
+    ))
+    db.session.commit()
+
+
+def worker(path, tuned, transactions, guilds, reads, seed, start_at, results):
+    app = make_app(path, tuned)
+    rng = random.Random(seed)
+    write = retry_on_locked(write_event) if tuned else write_event
+    done = errors = 0
+    with app.app_context():
+        while time.time() < start_at:
+            time.sleep(0.001)
+        begin = time.perf_counter()
+        for _ in range(transactions):
+            guild_id = str(rng.randrange(guilds))
+            try:
+                write(guild_id, rng)
+                done += 1
+                for _ in range(reads):
+                    moderation_page(guild_id, limit=50)
+                db.session.commit()
+            except OperationalError:
+                db.session.rollback()
+                errors += 1
+        results.put((done, errors, time.perf_counter() - begin))
+
+
+def run(path, tuned, processes, transactions, guilds, reads):
+    app = make_app(path, tuned)
+    with app.app_context():
+        db.create_all()
+        db.session.bulk_insert_mappings(GuildConfig, [{'guild_id': str(i)} for i in range(guilds)])
+        db.session.commit()
+        db.engine.dispose()
+
+    results = multiprocessing.Queue()
+    start_at = time.time() + 1.0
+    procs = [
+        multiprocessing.Process(target=worker, args=(path, tuned, transactions, guilds, reads, seed, start_at, results))
+        for seed in range(processes)
+    ]
+    for proc in procs:
+        proc.start()
+    outcomes = [results.get() for _ in procs]
+    for proc in procs:
+        proc.join()
+
+    done = sum(outcome[0] for outcome in outcomes)
+    errors = sum(outcome[1] for outcome in outcomes)
+    elapsed = max(outcome[2] for outcome in outcomes)
+    with app.app_context():
+        counted = db.session.query(func.sum(GuildConfig.total_warns)).scalar() or 0
+        logs = ModerationLog.query.count()
+    return done, errors, elapsed, counted, logs
+
+
+def main():
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    transactions = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    guilds = int(sys.argv[3]) if len(sys.argv) > 3 else 100
+    reads = int(sys.argv[4]) if len(sys.argv) > 4 else 3
+    total = processes * transactions
+    print(f"{processes} processus x {transactions} transactions, {guilds} serveurs, "
+          f"{reads} lectures par transaction")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, tuned in (('avant', False), ('après', True)):
+            done, errors, elapsed, counted, logs = run(
+                os.path.join(tmp, f'{label}.db'), tuned, processes, transactions, guilds, reads
+            )
+            print(f"{label:6} : {done / elapsed:8.0f} tx/s, "
+                  f"erreurs de verrou {errors}/{total} ({errors / total:.1%}), "
+                  f"compteurs {counted}, logs {logs}")
+
+
+if __name__ == '__main__':
+    main()
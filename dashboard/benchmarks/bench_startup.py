@@ -0,0 +1,70 @@
+"""Coût de démarrage d'un worker : temps d'import + create_app() et RSS.
+
+Lance N processus en parallèle (comme gunicorn sans --preload) et vérifie
+qu'ils partagent la même clé secrète. La seconde ligne importe aussi
+bot_api (et donc requests) au démarrage, comme le faisait l'ancien app.py.
+
+Usage : python benchmarks/bench_startup.py [workers]
+"""
+import hashlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+DASHBOARD_DIR = Path(__file__).parent.parent
+
+WORKER = """
+import json, sys, time
+start = time.perf_counter()
+import app
+application = app.create_app()
+if {eager}:
+    import bot_api
+elapsed = time.perf_counter() - start
+rss = 0
+with open('/proc/self/status') as f:
+    for line in f:
+        if line.startswith('VmRSS:'):
+            rss = int(line.split()[1])
+print(json.dumps({{
+    'seconds': elapsed,
+    'rss_kb': rss,
+    'requests': 'requests' in sys.modules,
+    'secret': application.config['SECRET_KEY'],
+}}))
+"""
+
+
+def boot(eager, env):
+    output = subprocess.run(
+        [sys.executable, '-c', WORKER.format(eager=eager)],
+        cwd=DASHBOARD_DIR, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        env.pop('SECRET_KEY', None)
+        print(f"{workers} workers démarrés en parallèle")
+        for label, eager in (('create_app', False), ('+ bot_api', True)):
+            with ThreadPoolExecutor(workers) as pool:
+                results = list(pool.map(lambda _: boot(eager, env), range(workers)))
+            seconds = [r['seconds'] for r in results]
+            rss = [r['rss_kb'] / 1024 for r in results]
+            secrets = {hashlib.sha1(r['secret'].encode()).hexdigest() for r in results}
+            print(f"{label:11}: démarrage médian {statistics.median(seconds) * 1000:6.0f} ms "
+                  f"(max {max(seconds) * 1000:.0f} ms), RSS médian {statistics.median(rss):5.1f} Mo, "
+                  f"total {sum(rss):6.0f} Mo, requests importé : {any(r['requests'] for r in results)}, "
+                  f"clés secrètes distinctes : {len(secrets)}")
+
+
+if __name__ == '__main__':
+    main()
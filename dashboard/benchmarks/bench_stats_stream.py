@@ -0,0 +1,71 @@
+"""Test de charge du flux SSE des statistiques.
+
+Abonne 1, 10 puis N clients simulés au même StatsBroadcaster et vérifie que
+le nombre d'appels au bot par seconde reste constant.
+
+Usage : python benchmarks/bench_stats_stream.py [clients] [durée_s]
+"""
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.stub_bot_api import RESPONSES, start_stub
+from stats_stream import StatsBroadcaster
+
+
+def run(broadcaster, clients, duration):
+    received = [0] * clients
+    stop = threading.Event()
+
+    def client(i):
+        sub = broadcaster.subscribe()
+        try:
+            while not stop.is_set():
+                if sub.get(timeout=0.1) is not None:
+                    received[i] += 1
+        finally:
+            broadcaster.unsubscribe(sub)
+
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(clients)]
+    calls_before = broadcaster.upstream_calls
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    calls = broadcaster.upstream_calls - calls_before
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return calls, sum(received)
+
+
+def main():
+    max_clients = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    duration = float(sys.argv[2]) if len(sys.argv) > 2 else 3.0
+    interval = 0.1
+
+    server, url = start_stub()
+    os.environ['BOT_API_URL'] = url
+    import bot_api
+
+    def fetch():
+        # Les stats changent à chaque appel pour produire des deltas
+        RESPONSES['/api/stats']['members'] += 1
+        return bot_api.client.get_json('stats')
+
+    print(f"Intervalle producteur {interval * 1000:.0f} ms, {duration:.0f} s par palier")
+    print(f"{'clients':>8} {'appels bot/s':>14} {'événements livrés':>18} {'upstream stub':>14}")
+    for clients in (1, 10, max_clients):
+        broadcaster = StatsBroadcaster(fetch, interval=interval)
+        before = server.request_count
+        calls, events = run(broadcaster, clients, duration)
+        print(f"{clients:>8} {calls / duration:>14.1f} {events:>18} {server.request_count - before:>14}")
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
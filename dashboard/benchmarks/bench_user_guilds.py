@@ -0,0 +1,119 @@
+"""Liste des serveurs d'un utilisateur : index précalculé contre liste complète.
+
+Pour des utilisateurs de 10 à 1000 serveurs (admin), mesure p50/p99 de :
+- l'ancien /api/user/guilds (liste complète en JSON) et l'ancien calcul du
+  dashboard (somme des membres sur toute la liste à chaque affichage) ;
+- le nouveau /api/user/guilds paginé (50 par page), avec et sans recherche
+  par préfixe, et les agrégats du dashboard lus dans l'index.
+Les vues sont appelées dans un contexte de requête, store SQLite partagé.
+
+Usage : python benchmarks/bench_user_guilds.py [requêtes]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+WORDS = ('Paradise', 'Gaming', 'Club', 'Team', 'Café', 'Anime', 'Musique', 'Dev', 'Alpha', 'Zone')
+
+
+def make_guilds(count, rng):
+    return [{
+        'id': str(10 ** 17 + rng.randrange(10 ** 17)),
+        'name': f'{rng.choice(WORDS)} {rng.choice(WORDS)} {i}',
+        'icon': 'a' * 32,
+        'owner': False,
+        'permissions': '8',
+        'features': ['COMMUNITY', 'NEWS'],
+        'approximate_member_count': rng.randrange(10, 100000),
+        'approximate_presence_count': rng.randrange(1, 10000),
+    } for i in range(count)]
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return samples[len(samples) // 2] * 1e6, samples[int(len(samples) * 0.99)] * 1e6
+
+
+def main():
+    requests_count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    rng = random.Random(42)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update({
+            'DATABASE_URL': f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+            'SESSION_DB_PATH': os.path.join(tmp, 'sessions.db'),
+            'SECRET_KEY': 'bench',
+        })
+        import app as dashboard_app
+        from config import Config
+        from flask import jsonify
+        from flask_login import login_user
+        from dashboard import views
+        from dashboard.database import upgrade_schema
+        from dashboard.models import db, GuildConfig, User
+
+        class BenchConfig(Config):
+            METRICS = False
+
+        application = dashboard_app.create_app(BenchConfig)
+        store = application.extensions['guild_store']
+        with application.app_context():
+            upgrade_schema()
+
+        def timed(path, func, user):
+            samples = []
+            for _ in range(requests_count):
+                start = time.perf_counter()
+                with application.test_request_context(path):
+                    login_user(user)
+                    func().get_data()
+                samples.append(time.perf_counter() - start)
+            return percentiles(samples)
+
+        def old_list():
+            return jsonify(store.get_all(views.current_user.discord_id))
+
+        def old_dashboard():
+            guilds = store.get_all(views.current_user.discord_id)
+            return jsonify({'members': sum(g.get('approximate_member_count', 0) for g in guilds),
+                            'guilds': guilds[:6]})
+
+        def new_dashboard():
+            guilds, _, _ = store.page(views.current_user.discord_id, limit=6)
+            return jsonify({'stats': store.stats(views.current_user.discord_id), 'guilds': guilds})
+
+        print("serveurs  (p50 / p99 en µs)   liste complète   page de 50   préfixe 'ca'   "
+              "dashboard avant   dashboard après   index (put)")
+        for count in (10, 50, 200, 1000):
+            guilds = make_guilds(count, rng)
+            with application.app_context():
+                user = User(discord_id=str(count), username=f'bench-{count}')
+                db.session.add(user)
+                db.session.execute(db.insert(GuildConfig.__table__),
+                                   [{'guild_id': g['id']} for g in guilds[::3]])
+                db.session.commit()
+                start = time.perf_counter()
+                store.put(user.discord_id, guilds, 'token')
+                put_ms = (time.perf_counter() - start) * 1000
+                db.session.refresh(user)
+                db.session.expunge(user)
+
+            results = [
+                timed('/api/user/guilds', old_list, user),
+                timed('/api/user/guilds?limit=50', views.api_user_guilds, user),
+                timed('/api/user/guilds?q=ca&limit=50', views.api_user_guilds, user),
+                timed('/dashboard', old_dashboard, user),
+                timed('/dashboard', new_dashboard, user),
+            ]
+            cells = '   '.join(f'{p50:6.0f} / {p99:6.0f}' for p50, p99 in results)
+            print(f"{count:8}  {cells}   {put_ms:6.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,449 @@
+"""Test de charge du dashboard : gunicorn + faux bot + faux Discord + base remplie.
+
+    python benchmarks/load_test.py run [--mix default] [--duration 30] [--users 16]
+    python benchmarks/load_test.py compare ancien.json nouveau.json [--threshold 10]
+
+`run` lance l'application sous gunicorn sur une copie de la base générée par
+seed_data.py (10k serveurs, 2M logs, 5k giveaways à l'échelle 1), avec le faux
+bot (stub_bot_api.py) et le faux Discord (stub_discord.py). Chaque client
+virtuel est un utilisateur Discord qui se connecte puis enchaîne les actions
+du mélange choisi ; le bot interroge et modifie les configs en parallèle.
+
+Le rapport JSON (p50/p95/p99, débit et erreurs par route, commit git) est
+écrit dans benchmarks/results/ ; `compare` affiche les écarts entre deux
+rapports et sort en erreur si un p95 régresse de plus du seuil.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+import requests
+
+BENCH_DIR = Path(__file__).parent
+DASHBOARD_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(BENCH_DIR))
+
+from seed_data import discord_guilds, guild_id, seeded_database, user_guild_ids, user_id
+from stub_bot_api import start_stub as start_bot_stub
+from stub_discord import start_stub as start_discord_stub
+
+API_KEY = 'bench-api-key'
+OWNER_ID = '1274391702655864883'
+
+# Mélanges de trafic : action -> poids
+MIXES = {
+    'default': {
+        'login': 2, 'dashboard': 8, 'guild_dashboard': 15, 'moderation_page': 10,
+        'moderation_stats': 8, 'config_poll': 35, 'config_update': 8, 'counters': 6,
+        'stats_poll': 5, 'public': 3,
+    },
+    'browse': {
+        'login': 5, 'dashboard': 20, 'guild_dashboard': 35, 'moderation_page': 20,
+        'moderation_stats': 15, 'public': 5,
+    },
+    'bot': {'config_poll': 70, 'config_update': 15, 'counters': 15},
+    'login': {'login': 100},
+}
+
+# Actions qui demandent une session ; stats_poll est réservé au propriétaire
+SESSION_ACTIONS = {'dashboard', 'guild_dashboard', 'moderation_page', 'moderation_stats', 'stats_poll'}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def git_revision():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=BENCH_DIR,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, bool(dirty)
+
+
+def percentile(sorted_values, fraction):
+    """Percentile au rang le plus proche (liste triée)"""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class Recorder:
+    """Latences et statuts par route, partagés par les clients"""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.recording = False
+        self._lock = threading.Lock()
+
+    def record(self, route, elapsed, status, ok):
+        if not self.recording:
+            return
+        with self._lock:
+            self.samples[route].append(elapsed)
+            self.statuses[route][str(status)] += 1
+            if not ok:
+                self.errors[route] += 1
+
+    def report(self, duration):
+        routes = {}
+        for route, values in sorted(self.samples.items()):
+            values = sorted(values)
+            routes[route] = {
+                'count': len(values),
+                'errors': self.errors[route],
+                'rps': round(len(values) / duration, 2),
+                'mean_ms': round(sum(values) / len(values) * 1000, 3),
+                'p50_ms': round(percentile(values, 0.50) * 1000, 3),
+                'p95_ms': round(percentile(values, 0.95) * 1000, 3),
+                'p99_ms': round(percentile(values, 0.99) * 1000, 3),
+                'max_ms': round(values[-1] * 1000, 3),
+                'statuses': dict(self.statuses[route]),
+            }
+        everything = sorted(value for values in self.samples.values() for value in values)
+        total = {
+            'count': len(everything),
+            'errors': sum(self.errors.values()),
+            'rps': round(len(everything) / duration, 2),
+        }
+        if everything:
+            total.update({
+                'p50_ms': round(percentile(everything, 0.50) * 1000, 3),
+                'p95_ms': round(percentile(everything, 0.95) * 1000, 3),
+                'p99_ms': round(percentile(everything, 0.99) * 1000, 3),
+            })
+        return routes, total
+
+
+class VirtualUser:
+    """Un utilisateur Discord (ou le bot) qui enchaîne les actions d'un mélange"""
+
+    def __init__(self, base_url, index, mix, guilds, recorder, seed, think_time=0.0):
+        self.base_url = base_url
+        self.discord_id = OWNER_ID if index == 0 else user_id(index)
+        self.is_owner = index == 0
+        self.guild_ids = user_guild_ids(index, guilds)
+        self.guilds = guilds
+        self.recorder = recorder
+        self.think_time = think_time
+        self.rng = random.Random(seed + index)
+        actions = {action: weight for action, weight in mix.items()
+                   if action != 'stats_poll' or self.is_owner}
+        self.actions = list(actions)
+        self.weights = list(actions.values())
+        self.session = requests.Session()
+        self.bot = requests.Session()
+        self.bot.headers['X-API-Key'] = API_KEY
+        self.etags = {}
+        self.logged_in = False
+
+    def request(self, route, session, method, path, ok_statuses=(200,), **kwargs):
+        start = time.perf_counter()
+        try:
+            response = session.request(method, f'{self.base_url}{path}', allow_redirects=False,
+                                       timeout=30, **kwargs)
+        except requests.RequestException:
+            self.recorder.record(route, time.perf_counter() - start, 'error', False)
+            return None
+        self.recorder.record(route, time.perf_counter() - start, response.status_code,
+                             response.status_code in ok_statuses)
+        return response
+
+    def login(self):
+        self.session.cookies.clear()
+        response = self.request('GET /callback', self.session, 'GET', f'/callback?code={self.discord_id}',
+                                ok_statuses=(302,))
+        self.logged_in = (response is not None and response.status_code == 302
+                          and response.headers.get('Location', '').endswith('/dashboard'))
+
+    def step(self):
+        action = self.rng.choices(self.actions, self.weights)[0]
+        if action in SESSION_ACTIONS and not self.logged_in:
+            action = 'login'
+        getattr(self, f'do_{action}')()
+        if self.think_time:
+            time.sleep(self.rng.expovariate(1 / self.think_time))
+
+    def do_login(self):
+        self.login()
+
+    def do_dashboard(self):
+        self.request('GET /dashboard', self.session, 'GET', '/dashboard')
+
+    def do_guild_dashboard(self):
+        gid = self.rng.choice(self.guild_ids)
+        self.request('GET /dashboard/guild/<id>', self.session, 'GET', f'/dashboard/guild/{gid}')
+
+    def do_moderation_page(self):
+        gid = self.rng.choice(self.guild_ids)
+        self.request('GET /api/guild/<id>/moderation', self.session, 'GET',
+                     f'/api/guild/{gid}/moderation?limit=50')
+
+    def do_moderation_stats(self):
+        gid = self.rng.choice(self.guild_ids)
+        granularity = self.rng.choice(('day', 'hour'))
+        self.request('GET /api/guild/<id>/moderation/stats', self.session, 'GET',
+                     f'/api/guild/{gid}/moderation/stats?granularity={granularity}')
+
+    def do_stats_poll(self):
+        self.request('GET /api/bot/stats', self.session, 'GET', '/api/bot/stats')
+
+    def do_public(self):
+        self.request('GET /', self.session, 'GET', '/')
+
+    def _bot_guild(self):
+        return guild_id(int(self.rng.paretovariate(1.2)) % self.guilds)
+
+    def do_config_poll(self):
+        gid = self._bot_guild()
+        headers = {'If-None-Match': self.etags[gid]} if gid in self.etags else {}
+        response = self.request('GET /api/guild/<id>/config', self.bot, 'GET', f'/api/guild/{gid}/config',
+                                ok_statuses=(200, 304), headers=headers)
+        if response is not None and response.headers.get('ETag'):
+            self.etags[gid] = response.headers['ETag']
+
+    def do_config_update(self):
+        gid = self._bot_guild()
+        self.request('POST /api/guild/<id>/config', self.bot, 'POST', f'/api/guild/{gid}/config',
+                     json={'prefix': self.rng.choice(('!', '?', '$', '.')),
+                           'caps_percentage': self.rng.choice((60, 70, 80))})
+
+    def do_counters(self):
+        gid = self._bot_guild()
+        field = self.rng.choice(('total_warns', 'total_kicks', 'total_bans', 'total_mutes'))
+        self.request('POST /api/guild/<id>/counters', self.bot, 'POST', f'/api/guild/{gid}/counters',
+                     json={field: 1})
+
+    def run(self, stop):
+        while not stop.is_set():
+            self.step()
+
+
+def start_server(database_path, port, workers, threads, bot_url, discord_url, run_dir):
+    env = dict(
+        os.environ,
+        DATABASE_URL=f'sqlite:///{database_path}',
+        SECRET_KEY='bench',
+        SESSION_DB_PATH=os.path.join(run_dir, 'sessions.db'),
+        DASHBOARD_API_KEY=API_KEY,
+        BOT_API_URL=bot_url,
+        BOT_API_KEY=API_KEY,
+        DISCORD_API_URL=discord_url,
+        # Le faux Discord n'a pas la limite de débit de l'API réelle
+        DISCORD_RATE_LIMIT='10000',
+    )
+    env.pop('GIVEAWAY_SCHEDULER', None)
+    env.pop('METRICS_MULTIPROC_DIR', None)
+    command = [
+        sys.executable, '-m', 'gunicorn', '--workers', str(workers), '--threads', str(threads),
+        '--bind', f'127.0.0.1:{port}', '--log-level', 'warning', 'app:create_app()',
+    ]
+    # Comme en production : init-db avant les workers (base générée par une version antérieure)
+    subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'init-db'],
+                   cwd=DASHBOARD_DIR, env=env, check=True, stdout=subprocess.DEVNULL)
+    server = subprocess.Popen(command, cwd=DASHBOARD_DIR, env=env, start_new_session=True)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"gunicorn s'est arrêté (code {server.returncode})")
+        try:
+            if requests.get(f'http://127.0.0.1:{port}/health', timeout=1).status_code == 200:
+                return server
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    stop_server(server)
+    raise RuntimeError("gunicorn n'a pas démarré en 60 s")
+
+
+def stop_server(server):
+    try:
+        os.killpg(server.pid, signal.SIGTERM)
+        server.wait(timeout=30)
+    except (ProcessLookupError, subprocess.TimeoutExpired):
+        os.killpg(server.pid, signal.SIGKILL)
+
+
+def run(args):
+    mix = MIXES[args.mix]
+    database, sizes = seeded_database(args.data_dir, args.scale, args.seed)
+    commit, dirty = git_revision()
+
+    with tempfile.TemporaryDirectory(prefix='paradise-load-') as run_dir:
+        # Chaque run repart de la même base
+        database_path = os.path.join(run_dir, 'dashboard.db')
+        shutil.copyfile(database, database_path)
+
+        bot_stub, bot_url = start_bot_stub(latency=args.bot_latency / 1000)
+        discord_stub, discord_url = start_discord_stub(latency=args.discord_latency / 1000)
+        discord_stub.guilds_for = lambda discord_id: discord_guilds(discord_id, sizes['guilds'])
+
+        port = free_port()
+        server = start_server(database_path, port, args.workers, args.threads, bot_url, discord_url, run_dir)
+        try:
+            recorder = Recorder()
+            base_url = f'http://127.0.0.1:{port}'
+            users = [VirtualUser(base_url, index, mix, sizes['guilds'], recorder, args.seed, args.think / 1000)
+                     for index in range(args.users)]
+            stop = threading.Event()
+            threads = [threading.Thread(target=user.run, args=(stop,), daemon=True) for user in users]
+            for thread in threads:
+                thread.start()
+
+            print(f"Mélange {args.mix}, {args.users} clients, {args.workers} workers x {args.threads} threads : "
+                  f"chauffe {args.warmup} s puis mesure {args.duration} s", flush=True)
+            time.sleep(args.warmup)
+            recorder.recording = True
+            start = time.perf_counter()
+            time.sleep(args.duration)
+            recorder.recording = False
+            elapsed = time.perf_counter() - start
+            stop.set()
+            for thread in threads:
+                thread.join(timeout=35)
+        finally:
+            stop_server(server)
+            bot_stub.shutdown()
+            discord_stub.shutdown()
+
+    routes, total = recorder.report(elapsed)
+    report = {
+        'meta': {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'commit': commit,
+            'dirty': dirty,
+            'mix': args.mix,
+            'weights': mix,
+            'users': args.users,
+            'workers': args.workers,
+            'threads': args.threads,
+            'duration': round(elapsed, 2),
+            'warmup': args.warmup,
+            'think_ms': args.think,
+            'bot_latency_ms': args.bot_latency,
+            'discord_latency_ms': args.discord_latency,
+            'sizes': sizes,
+            'seed': args.seed,
+            'python': platform.python_version(),
+            'cpus': os.cpu_count(),
+        },
+        'total': total,
+        'routes': routes,
+    }
+    print_report(report)
+
+    output = args.output
+    if output is None:
+        os.makedirs(BENCH_DIR / 'results', exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        output = BENCH_DIR / 'results' / f"{stamp}-{commit or 'nogit'}-{args.mix}.json"
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(f"Rapport : {output}")
+
+
+def print_report(report):
+    print(f"{'route':40} {'req':>7} {'err':>5} {'req/s':>8} {'p50':>9} {'p95':>9} {'p99':>9}")
+    rows = list(report['routes'].items()) + [('TOTAL', report['total'])]
+    for route, stats in rows:
+        if not stats.get('count'):
+            continue
+        print(f"{route:40} {stats['count']:>7} {stats['errors']:>5} {stats['rps']:>8.1f} "
+              f"{stats['p50_ms']:>7.1f}ms {stats['p95_ms']:>7.1f}ms {stats['p99_ms']:>7.1f}ms")
+
+
+def _change(old, new):
+    if old is None or new is None:
+        return '', 0.0
+    ratio = (new - old) / old if old else 0.0
+    return f'{ratio:+.0%}', ratio
+
+
+def compare(args):
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    print(f"ancien : {old['meta'].get('commit')} ({old['meta']['date']}, mélange {old['meta']['mix']})")
+    print(f"nouveau: {new['meta'].get('commit')} ({new['meta']['date']}, mélange {new['meta']['mix']})")
+    if old['meta']['mix'] != new['meta']['mix']:
+        print("Attention : mélanges de trafic différents")
+    print(f"{'route':40} {'p50 (ms)':>21} {'p95 (ms)':>21} {'p99 (ms)':>21} {'req/s':>19}")
+
+    regressions = []
+    routes = sorted(set(old['routes']) | set(new['routes'])) + ['TOTAL']
+    for route in routes:
+        before = old['total'] if route == 'TOTAL' else old['routes'].get(route, {})
+        after = new['total'] if route == 'TOTAL' else new['routes'].get(route, {})
+        columns = []
+        for key in ('p50_ms', 'p95_ms', 'p99_ms'):
+            label, ratio = _change(before.get(key), after.get(key))
+            columns.append(f"{before[key]:7.1f} >{after[key]:7.1f} {label:>5}"
+                           if before.get(key) is not None and after.get(key) is not None else '-')
+            if key == 'p95_ms' and ratio * 100 > args.threshold:
+                regressions.append(route)
+        label, _ = _change(before.get('rps'), after.get('rps'))
+        columns.append(f"{before.get('rps', 0):6.0f} >{after.get('rps', 0):6.0f} {label:>5}")
+        flag = ' ⚠' if route in regressions else ''
+        print(f"{route:40} {columns[0]:>21} {columns[1]:>21} {columns[2]:>21} {columns[3]:>19}{flag}")
+
+    if regressions:
+        print(f"Régression du p95 de plus de {args.threshold:g} % : {', '.join(regressions)}")
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='lance un test de charge et écrit le rapport JSON')
+    run_parser.add_argument('--mix', choices=sorted(MIXES), default='default')
+    run_parser.add_argument('--duration', type=float, default=30, help='durée mesurée (s)')
+    run_parser.add_argument('--warmup', type=float, default=5, help='chauffe non mesurée (s)')
+    run_parser.add_argument('--users', type=int, default=16, help='clients simultanés')
+    run_parser.add_argument('--think', type=float, default=0, help='pause moyenne entre actions (ms)')
+    run_parser.add_argument('--workers', type=int, default=2)
+    run_parser.add_argument('--threads', type=int, default=4)
+    run_parser.add_argument('--scale', type=float, default=1.0, help='taille des données (1 = 10k serveurs, 2M logs)')
+    run_parser.add_argument('--seed', type=int, default=42)
+    run_parser.add_argument('--bot-latency', type=float, default=5, help='latence du faux bot (ms)')
+    run_parser.add_argument('--discord-latency', type=float, default=50, help='latence du faux Discord (ms)')
+    run_parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'paradise-bench'),
+                            help='dossier des bases générées (réutilisées entre les runs)')
+    run_parser.add_argument('--output', help='fichier du rapport (défaut : benchmarks/results/...)')
+    run_parser.set_defaults(func=run)
+
+    compare_parser = commands.add_parser('compare', help='compare deux rapports JSON')
+    compare_parser.add_argument('old')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('--threshold', type=float, default=10, help='régression tolérée du p95 (%%)')
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+"""Base SQLite de test de charge : serveurs, logs de modération, giveaways.
+
+La base est générée une fois par jeu de tailles et réutilisée (copiée avant
+chaque run pour que tous partent du même état). Les serveurs dont un
+utilisateur est administrateur sont déterminés par `user_guild_ids`, partagé
+avec le faux serveur Discord.
+
+Usage : python benchmarks/seed_data.py [dossier] [échelle]
+"""
+import json
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+# Tailles par défaut (multipliées par l'échelle)
+SIZES = {
+    'guilds': 10_000,
+    'moderation_logs': 2_000_000,
+    'giveaways': 5_000,
+}
+USERS = 500
+GUILDS_PER_USER = 25
+FIRST_GUILD_ID = 10 ** 17
+FIRST_USER_ID = 10 ** 6
+
+ACTIONS = ('warn', 'kick', 'ban', 'mute', 'unmute')
+BATCH_SIZE = 100_000
+
+
+def guild_id(index):
+    return str(FIRST_GUILD_ID + index)
+
+
+def user_id(index):
+    return str(FIRST_USER_ID + index)
+
+
+def user_index(discord_id):
+    """Index d'un utilisateur de test (le propriétaire et les inconnus : 0)"""
+    index = int(discord_id) - FIRST_USER_ID
+    return index if 0 <= index < USERS else 0
+
+
+def user_guild_ids(index, guilds):
+    """Serveurs administrés par l'utilisateur `index` (chevauchements entre utilisateurs)"""
+    return [guild_id((index * 7 + k * 13) % guilds) for k in range(GUILDS_PER_USER)]
+
+
+def discord_guilds(discord_id, guilds):
+    """Réponse de /users/@me/guilds pour le faux serveur Discord"""
+    return [
+        {'id': gid, 'name': f'Serveur {gid[-5:]}', 'icon': None, 'permissions': '8',
+         'approximate_member_count': 100 + int(gid) % 5000}
+        for gid in user_guild_ids(user_index(discord_id), guilds)
+    ]
+
+
+def scaled_sizes(scale):
+    return {name: max(1, int(size * scale)) for name, size in SIZES.items()}
+
+
+def _guild_weights(guilds):
+    # Quelques gros serveurs concentrent l'essentiel de l'activité
+    return [1 / (index + 1) ** 0.8 for index in range(guilds)]
+
+
+def _create_schema(path):
+    from flask import Flask
+    from dashboard.database import init_db, upgrade_schema
+    from dashboard.models import db
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    init_db(app)
+    with app.app_context():
+        upgrade_schema()
+        # Libérer le fichier pour l'insertion en masse avec sqlite3
+        db.engine.dispose()
+    return app
+
+
+def _insert_guilds(conn, guilds, rng):
+    now = datetime.utcnow().isoformat(sep=' ')
+    conn.executemany(
+        'INSERT INTO guild_configs (guild_id, guild_name, prefix, language, welcome_enabled, '
+        'welcome_message, welcome_dm_enabled, welcome_dm_message, leave_enabled, leave_message, '
+        'auto_mod_enabled, bad_words_enabled, bad_words_action, invites_enabled, invites_action, '
+        'caps_enabled, caps_percentage, caps_min_length, custom_commands, total_warns, total_kicks, '
+        'total_bans, total_mutes, created_at) '
+        'VALUES (?, ?, ?, ?, 1, ?, 0, ?, 1, ?, 1, 1, ?, 1, ?, 1, ?, 10, ?, 0, 0, 0, 0, ?)',
+        (
+            (guild_id(index), f'Serveur {index}', rng.choice(('!', '!', '?', '$')), 'fr',
+             'Bienvenue {member} sur {server} !', 'Bienvenue sur {server} !', '{member} nous a quittés...',
+             rng.choice(('delete', 'warn')), 'delete', rng.choice((60, 70, 80)),
+             json.dumps({f'cmd{k}': f'Réponse {k}' for k in range(rng.randrange(0, 6))}), now)
+            for index in range(guilds)
+        )
+    )
+
+
+def _insert_moderation_logs(conn, rows, guilds, rng):
+    weights = _guild_weights(guilds)
+    start = datetime.utcnow() - timedelta(days=365)
+    step = 365 * 86400 / rows
+    for offset in range(0, rows, BATCH_SIZE):
+        count = min(BATCH_SIZE, rows - offset)
+        targets = rng.choices(range(guilds), weights=weights, k=count)
+        conn.executemany(
+            'INSERT INTO moderation_logs (guild_id, action_type, user_id, moderator_id, reason, created_at) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (
+                (guild_id(target), rng.choice(ACTIONS), str(rng.randrange(1_000_000)),
+                 str(rng.randrange(50)), 'spam',
+                 (start + timedelta(seconds=(offset + i) * step)).isoformat(sep=' ', timespec='microseconds'))
+                for i, target in enumerate(targets)
+            )
+        )
+
+
+def _insert_giveaways(conn, count, guilds, rng):
+    now = datetime.utcnow()
+    conn.executemany(
+        'INSERT INTO giveaways (message_id, guild_id, channel_id, prize, winners_count, entrants, '
+        'host_id, end_time, ended, role_required, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        (
+            (str(5 * 10 ** 17 + index), guild_id(rng.randrange(guilds)), str(rng.randrange(10 ** 6)),
+             'Nitro', rng.randint(1, 3), rng.randrange(5000), user_id(rng.randrange(USERS)),
+             (now + timedelta(minutes=rng.randint(-30 * 24 * 60, 7 * 24 * 60))).isoformat(sep=' '),
+             # Une partie des giveaways passés est déjà terminée
+             int(index % 3 == 0), None if index % 4 else str(rng.randrange(10 ** 6)),
+             now.isoformat(sep=' '))
+            for index in range(count)
+        )
+    )
+
+
+def seed(path, sizes, seed_value=42):
+    """Crée la base `path` avec les tailles données, puis calcule les agrégats"""
+    app = _create_schema(path)
+    rng = random.Random(seed_value)
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode=OFF')
+    conn.execute('PRAGMA synchronous=OFF')
+    _insert_guilds(conn, sizes['guilds'], rng)
+    _insert_moderation_logs(conn, sizes['moderation_logs'], sizes['guilds'], rng)
+    _insert_giveaways(conn, sizes['giveaways'], sizes['guilds'], rng)
+    conn.execute('CREATE TABLE bench_seed (sizes TEXT NOT NULL, seed INTEGER NOT NULL)')
+    conn.execute('INSERT INTO bench_seed VALUES (?, ?)', (json.dumps(sizes, sort_keys=True), seed_value))
+    conn.commit()
+    conn.close()
+
+    # Agrégats et commandes déjà migrés, comme sur une instance en production
+    from dashboard.custom_commands import migrate_custom_commands
+    from dashboard.models import db
+    from dashboard.moderation_stats import update_rollups
+    with app.app_context():
+        update_rollups(lag=timedelta(0))
+        migrate_custom_commands()
+        db.engine.dispose()
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    conn.execute('PRAGMA journal_mode=DELETE')
+    conn.close()
+
+
+def seeded_database(directory, scale=1.0, seed_value=42):
+    """Chemin d'une base générée pour ces tailles (créée au premier appel)"""
+    sizes = scaled_sizes(scale)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"seed-{sizes['guilds']}-{sizes['moderation_logs']}-"
+                                   f"{sizes['giveaways']}-{seed_value}.db")
+    if not os.path.exists(path):
+        tmp_path = f'{path}.tmp'
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        start = time.perf_counter()
+        print(f"Génération de la base de test {sizes} ...", flush=True)
+        seed(tmp_path, sizes, seed_value)
+        os.replace(tmp_path, path)
+        print(f"Base générée en {time.perf_counter() - start:.0f} s : {path}", flush=True)
+    return path, sizes
+
+
+if __name__ == '__main__':
+    directory = sys.argv[1] if len(sys.argv) > 1 else os.path.join('/tmp', 'paradise-bench')
+    scale = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+    print(seeded_database(directory, scale)[0])
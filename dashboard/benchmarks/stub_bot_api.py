@@ -0,0 +1,85 @@
+"""Faux serveur d'API du bot pour les benchmarks locaux.
+
+Usage : python benchmarks/stub_bot_api.py [port] [latence_ms]
+"""
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+RESPONSES = {
+    '/api/stats': {'servers': 42, 'members': 12345, 'commands': 67, 'active_giveaways': 3, 'uptime': 86400, 'cogs': 8},
+    '/api/moderation/latest': [
+        {'action_type': 'warn', 'user_id': '1', 'moderator_id': '2', 'reason': 'spam'}
+    ],
+    '/api/giveaways/active': [
+        {'message_id': '100', 'prize': 'Nitro', 'entrants': 12}
+    ],
+    '/api/servers': [{'id': '1', 'name': 'Paradise'}],
+    '/api/logs': [{'level': 'INFO', 'message': 'ok'}],
+}
+
+
+class StubBotHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+    disable_nagle_algorithm = True
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self):
+        server = self.server
+        with server.lock:
+            server.request_count += 1
+        if server.latency:
+            time.sleep(server.latency)
+        if server.fail:
+            return self._reply(503, {'error': 'unavailable'})
+
+        path = urlparse(self.path).path
+        if self.command == 'POST' and path.startswith('/api/giveaway/') and path.endswith('/end'):
+            return self._reply(200, {'success': True})
+        if path in RESPONSES:
+            return self._reply(200, RESPONSES[path])
+        return self._reply(404, {'error': 'Not found'})
+
+    do_GET = _handle
+    do_POST = _handle
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub(port=0, latency=0.0):
+    """Démarre le serveur dans un thread et retourne (server, url).
+
+    server.latency et server.fail peuvent être modifiés à chaud,
+    server.request_count compte les requêtes reçues.
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', port), StubBotHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.fail = False
+    server.request_count = 0
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == '__main__':
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 5001
+    latency = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.0
+    server, url = start_stub(port, latency)
+    print(f"Stub API du bot sur {url} (latence {latency * 1000:.0f} ms)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,151 @@
+"""Faux serveur OAuth2 / API Discord pour les benchmarks locaux.
+
+Endpoints : POST /api/oauth2/token (authorization_code et refresh_token),
+GET /api/users/@me et GET /api/users/@me/guilds.
+
+Un code OAuth numérique devient l'id de l'utilisateur connecté (un code
+quelconque donne l'utilisateur 1000) : chaque client d'un test de charge
+peut ainsi se connecter avec son propre compte.
+
+Usage : python benchmarks/stub_discord.py [port] [latence_ms]
+puis DISCORD_API_URL=http://127.0.0.1:<port>/api pour le dashboard.
+"""
+import itertools
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class StubDiscordHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+    disable_nagle_algorithm = True
+
+    def _reply(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _issue_tokens(self, user_id):
+        server = self.server
+        n = next(server.counter)
+        access_token, refresh_token = f'at-{n}', f'rt-{n}'
+        with server.lock:
+            server.access_tokens[access_token] = (time.time() + server.expires_in, user_id)
+            server.refresh_tokens[refresh_token] = user_id
+        return self._reply(200, {
+            'access_token': access_token,
+            'refresh_token': refresh_token,
+            'expires_in': server.expires_in,
+            'token_type': 'Bearer',
+            'scope': 'identify guilds'
+        })
+
+    def _token(self, body):
+        form = {key: values[0] for key, values in parse_qs(body.decode()).items()}
+        grant_type = form.get('grant_type')
+        code = form.get('code')
+        if grant_type == 'authorization_code' and code:
+            return self._issue_tokens(code if code.isdigit() else '1000')
+        if grant_type == 'refresh_token':
+            with self.server.lock:
+                # Un refresh token ne sert qu'une fois
+                user_id = self.server.refresh_tokens.pop(form.get('refresh_token'), None)
+                self.server.refresh_count += user_id is not None
+            if user_id is not None:
+                return self._issue_tokens(user_id)
+        return self._reply(400, {'error': 'invalid_grant'})
+
+    def _authorized_user(self):
+        """Id de l'utilisateur du token, ou None si absent ou expiré"""
+        token = self.headers.get('Authorization', '').removeprefix('Bearer ')
+        with self.server.lock:
+            expires, user_id = self.server.access_tokens.get(token, (0, None))
+        return user_id if expires > time.time() else None
+
+    def _handle(self):
+        # Toujours lire le corps, même pour un 429 (connexion keep-alive)
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        server = self.server
+        with server.lock:
+            server.request_count += 1
+            limited = server.rate_limit_every and server.request_count % server.rate_limit_every == 0
+            if limited:
+                server.rate_limited += 1
+        if server.latency:
+            time.sleep(server.latency)
+        if limited:
+            return self._reply(429, {
+                'message': 'You are being rate limited.',
+                'retry_after': server.retry_after,
+                'global': False
+            }, headers={'Retry-After': str(server.retry_after)})
+
+        path = urlparse(self.path).path
+        if self.command == 'POST' and path == '/api/oauth2/token':
+            return self._token(body)
+        user_id = self._authorized_user()
+        if user_id is None:
+            return self._reply(401, {'message': '401: Unauthorized', 'code': 0})
+        if path == '/api/users/@me':
+            return self._reply(200, {'id': user_id, 'username': f'bench-{user_id}', 'avatar': None, 'discriminator': '0'})
+        if path == '/api/users/@me/guilds':
+            return self._reply(200, server.guilds_for(user_id) if server.guilds_for else server.guilds)
+        return self._reply(404, {'message': '404: Not Found', 'code': 0})
+
+    do_GET = _handle
+    do_POST = _handle
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub(port=0, latency=0.0, guilds=20, expires_in=604800):
+    """Démarre le serveur dans un thread et retourne (server, url de l'API).
+
+    À chaud : server.latency, server.expires_in, server.rate_limit_every
+    (une requête sur N reçoit un 429), server.retry_after et
+    server.guilds_for (user_id -> liste de serveurs ; par défaut la même
+    liste pour tous). Compteurs : server.request_count, server.rate_limited,
+    server.refresh_count.
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', port), StubDiscordHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.expires_in = expires_in
+    server.rate_limit_every = 0
+    server.retry_after = 0.05
+    server.request_count = 0
+    server.rate_limited = 0
+    server.refresh_count = 0
+    server.access_tokens = {}
+    server.refresh_tokens = {}
+    server.guilds_for = None
+    server.counter = itertools.count(1)
+    server.guilds = [
+        {'id': str(10 ** 17 + i), 'name': f'Serveur {i}', 'icon': None,
+         'permissions': '8' if i % 2 == 0 else '0'}
+        for i in range(guilds)
+    ]
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/api"
+
+
+if __name__ == '__main__':
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 5002
+    latency = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.0
+    server, url = start_stub(port, latency)
+    print(f"Stub Discord sur {url} (latence {latency * 1000:.0f} ms)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -1,108 +1,236 @@
-import requests
+import logging
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 
+from cache import SWRCache
+from circuit_breaker import CircuitBreaker
+from metrics import BOT_API_ERRORS, BOT_API_FALLBACKS, BOT_API_LATENCY
+
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Configuration de l'API du bot
 BOT_API_URL = os.getenv('BOT_API_URL', 'http://localhost:5001')
 BOT_API_KEY = os.getenv('BOT_API_KEY', 'your-secret-key')
+BOT_API_POOL_SIZE = int(os.getenv('BOT_API_POOL_SIZE', 10))
+BOT_API_CONNECT_TIMEOUT = float(os.getenv('BOT_API_CONNECT_TIMEOUT', 2))
+
+# Disjoncteur : échecs consécutifs avant ouverture, délai initial et maximal avant un test
+BOT_API_FAILURE_THRESHOLD = int(os.getenv('BOT_API_FAILURE_THRESHOLD', 5))
+BOT_API_RESET_TIMEOUT = float(os.getenv('BOT_API_RESET_TIMEOUT', 5))
+BOT_API_MAX_RESET_TIMEOUT = float(os.getenv('BOT_API_MAX_RESET_TIMEOUT', 300))
+
+# Endpoints connus : nom -> (méthode, chemin, timeout de lecture en secondes)
+ENDPOINTS = {
+    'stats': ('GET', '/api/stats', 3),
+    'moderation': ('GET', '/api/moderation/latest', 5),
+    'giveaways': ('GET', '/api/giveaways/active', 5),
+    'end_giveaway': ('POST', '/api/giveaway/{message_id}/end', 10),
+    'servers': ('GET', '/api/servers', 5),
+    'logs': ('GET', '/api/logs', 5),
+}
+
+# Cache des lectures : nom -> (ttl, fenêtre stale-while-revalidate) en secondes
+CACHE_TTL = {
+    'stats': (float(os.getenv('BOT_STATS_TTL', 10)), 300),
+    'moderation': (5, 60),
+    'giveaways': (5, 60),
+    'servers': (60, 600),
+    'logs': (5, 60),
+}
+
+# Données par défaut si l'API n'est pas disponible
+DEFAULT_STATS = {
+    'servers': 0,
+    'members': 0,
+    'commands': 0,
+    'active_giveaways': 0,
+    'uptime': 0,
+    'cogs': 0
+}
+
+
+class BotAPIError(Exception):
+    """Erreur lors d'un appel à l'API du bot"""
+
+
+class CircuitOpenError(BotAPIError):
+    """Appel refusé sans contacter le bot car le disjoncteur est ouvert"""
+
+
+class BotAPIClient:
+    """Client partagé pour l'API du bot.
+
+    Une seule session HTTP garde les connexions ouvertes (keep-alive) et un
+    pool de threads permet de lancer plusieurs appels en parallèle. Un
+    disjoncteur coupe les appels tant que le bot ne répond pas.
+    """
+
+    def __init__(self, base_url=BOT_API_URL, api_key=BOT_API_KEY,
+                 pool_size=BOT_API_POOL_SIZE, timeouts=None, breaker=None):
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+        self.timeouts = {name: read for name, (_, _, read) in ENDPOINTS.items()}
+        self.timeouts.update(timeouts or {})
+
+        self.session = requests.Session()
+        self.session.headers['X-API-Key'] = api_key
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self.executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='bot-api')
+        self.breaker = breaker or CircuitBreaker(
+            'bot_api',
+            failure_threshold=BOT_API_FAILURE_THRESHOLD,
+            reset_timeout=BOT_API_RESET_TIMEOUT,
+            max_reset_timeout=BOT_API_MAX_RESET_TIMEOUT
+        )
+
+    def call(self, endpoint, params=None, **path_args):
+        """Appelle un endpoint du bot et retourne la réponse (lève BotAPIError)"""
+        method, path, _ = ENDPOINTS[endpoint]
+        timeout = (BOT_API_CONNECT_TIMEOUT, self.timeouts[endpoint])
+        if not self.breaker.allow():
+            BOT_API_ERRORS.inc(endpoint, 'circuit_open')
+            raise CircuitOpenError(f"{endpoint}: circuit ouvert")
+
+        start = time.perf_counter()
+        try:
+            response = self.session.request(
+                method,
+                f"{self.base_url}{path.format(**path_args)}",
+                params=params,
+                timeout=timeout
+            )
+        except requests.RequestException as e:
+            BOT_API_LATENCY.observe(time.perf_counter() - start, endpoint)
+            BOT_API_ERRORS.inc(endpoint, 'timeout' if isinstance(e, requests.Timeout) else 'connection')
+            self.breaker.record_failure()
+            raise BotAPIError(f"{endpoint}: {e}") from e
+        BOT_API_LATENCY.observe(time.perf_counter() - start, endpoint)
+
+        # Seules les erreurs serveur comptent : un 4xx prouve que le bot répond
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        if response.status_code != 200:
+            BOT_API_ERRORS.inc(endpoint, f'http_{response.status_code // 100}xx')
+            raise BotAPIError(f"{endpoint}: HTTP {response.status_code}")
+        return response
+
+    def get_json(self, endpoint, params=None, **path_args):
+        """Appelle un endpoint et décode sa réponse JSON (lève BotAPIError)"""
+        response = self.call(endpoint, params=params, **path_args)
+        try:
+            return response.json()
+        except ValueError as e:
+            BOT_API_ERRORS.inc(endpoint, 'invalid_json')
+            raise BotAPIError(f"{endpoint}: réponse JSON invalide") from e
+
+    def fetch_many(self, **calls):
+        """Exécute plusieurs appels en parallèle et retourne leurs résultats.
+
+        Chaque valeur est une fonction ou un tuple (fonction, *args) :
+            fetch_many(stats=get_bot_stats, actions=(get_moderation_actions, 5))
+        La durée totale est celle de l'appel le plus lent.
+        """
+        futures = {}
+        for key, call in calls.items():
+            func, *args = call if isinstance(call, tuple) else (call,)
+            futures[key] = self.executor.submit(func, *args)
+        return {key: future.result() for key, future in futures.items()}
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        self.session.close()
+
+
+# Client et cache partagés par tout le processus
+client = BotAPIClient()
+cache = SWRCache()
+
+
+def cached_get(endpoint, params=None):
+    """Lecture JSON via le cache (lève BotAPIError si aucune valeur n'est disponible)"""
+    ttl, stale_ttl = CACHE_TTL[endpoint]
+    key = (endpoint, tuple(sorted((params or {}).items())))
+    return cache.get(key, lambda: client.get_json(endpoint, params=params), ttl, stale_ttl)
+
+def fetch_many(**calls):
+    """Raccourci vers client.fetch_many"""
+    return client.fetch_many(**calls)
 
 def get_bot_stats():
     """Récupère les statistiques du bot"""
     try:
-        response = requests.get(
-            f"{BOT_API_URL}/api/stats",
-            headers={'X-API-Key': BOT_API_KEY},
-            timeout=5
-        )
-        if response.status_code == 200:
-            return response.json()
-    except Exception as e:
-        print(f"Erreur API stats: {e}")
-    
-    # Données par défaut si l'API n'est pas disponible
-    return {
-        'servers': 0,
-        'members': 0,
-        'commands': 0,
-        'active_giveaways': 0,
-        'uptime': 0,
-        'cogs': 0
-    }
+        return cached_get('stats')
+    except BotAPIError as e:
+        BOT_API_FALLBACKS.inc('stats')
+        logger.warning("Erreur API stats: %s", e)
+
+    return dict(DEFAULT_STATS)
 
 def get_moderation_actions(limit=10):
     """Récupère les dernières actions de modération"""
     try:
-        response = requests.get(
-            f"{BOT_API_URL}/api/moderation/latest",
-            params={'limit': limit},
-            headers={'X-API-Key': BOT_API_KEY},
-            timeout=5
-        )
-        if response.status_code == 200:
-            return response.json()
-    except Exception as e:
-        print(f"Erreur API moderation: {e}")
-    
+        return cached_get('moderation', params={'limit': limit})
+    except BotAPIError as e:
+        BOT_API_FALLBACKS.inc('moderation')
+        logger.warning("Erreur API moderation: %s", e)
+
     return []
 
 def get_active_giveaways():
     """Récupère les giveaways actifs"""
     try:
-        response = requests.get(
-            f"{BOT_API_URL}/api/giveaways/active",
-            headers={'X-API-Key': BOT_API_KEY},
-            timeout=5
-        )
-        if response.status_code == 200:
-            return response.json()
-    except Exception as e:
-        print(f"Erreur API giveaways: {e}")
-    
+        return cached_get('giveaways')
+    except BotAPIError as e:
+        BOT_API_FALLBACKS.inc('giveaways')
+        logger.warning("Erreur API giveaways: %s", e)
+
     return []
 
 def end_giveaway(message_id):
     """Termine un giveaway"""
     try:
-        response = requests.post(
-            f"{BOT_API_URL}/api/giveaway/{message_id}/end",
-            headers={'X-API-Key': BOT_API_KEY},
-            timeout=5
-        )
-        return response.status_code == 200
-    except Exception as e:
-        print(f"Erreur API end giveaway: {e}")
-    
+        client.call('end_giveaway', message_id=message_id)
+        cache.invalidate(('giveaways', ()))
+        return True
+    except BotAPIError as e:
+        BOT_API_FALLBACKS.inc('end_giveaway')
+        logger.warning("Erreur API end giveaway: %s", e)
+
     return False
 
+def end_giveaways(message_ids):
+    """Termine plusieurs giveaways en parallèle ; retourne les ids terminés"""
+    futures = {message_id: client.executor.submit(end_giveaway, message_id) for message_id in message_ids}
+    return [message_id for message_id, future in futures.items() if future.result()]
+
 def get_servers():
     """Récupère la liste des serveurs"""
     try:
-        response = requests.get(
-            f"{BOT_API_URL}/api/servers",
-            headers={'X-API-Key': BOT_API_KEY},
-            timeout=5
-        )
-        if response.status_code == 200:
-            return response.json()
-    except Exception as e:
-        print(f"Erreur API servers: {e}")
-    
+        return cached_get('servers')
+    except BotAPIError as e:
+        BOT_API_FALLBACKS.inc('servers')
+        logger.warning("Erreur API servers: %s", e)
+
     return []
 
 def get_logs(limit=100):
     """Récupère les logs"""
     try:
-        response = requests.get(
-            f"{BOT_API_URL}/api/logs",
-            params={'limit': limit},
-            headers={'X-API-Key': BOT_API_KEY},
-            timeout=5
-        )
-        if response.status_code == 200:
-            return response.json()
-    except Exception as e:
-        print(f"Erreur API logs: {e}")
-    
+        return cached_get('logs', params={'limit': limit})
+    except BotAPIError as e:
+        BOT_API_FALLBACKS.inc('logs')
+        logger.warning("Erreur API logs: %s", e)
+
     return []
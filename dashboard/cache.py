@@ -0,0 +1,143 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+class LRUCache:
+    """Cache mémoire borné (LRU), avec expiration optionnelle des entrées"""
+
+    def __init__(self, maxsize=1024, ttl=None, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (self.ttl is not None and self.clock() - entry[1] >= self.ttl):
+                self.counters['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.counters['hits'] += 1
+            return entry[0]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, self.clock())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.counters['evictions'] += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self.counters['invalidations'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats['entries'] = len(self._entries)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        return stats
+
+
+class SWRCache:
+    """Cache mémoire avec TTL par clé et stale-while-revalidate.
+
+    - valeur fraîche (âge < ttl) : retournée directement
+    - valeur périmée (âge < ttl + stale_ttl) : retournée directement, un seul
+      rafraîchissement est lancé en arrière-plan
+    - absente ou trop vieille : chargement synchrone ; les appels concurrents
+      sur la même clé attendent le même chargement (un seul appel amont)
+
+    Le loader doit lever une exception en cas d'échec pour que la dernière
+    bonne valeur ne soit jamais remplacée par un résultat de secours.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._entries = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.counters = {
+            'hits': 0,
+            'stale_hits': 0,
+            'misses': 0,
+            'coalesced': 0,
+            'refreshes': 0,
+            'errors': 0,
+        }
+
+    def get(self, key, loader, ttl, stale_ttl=0):
+        """Retourne la valeur de `key`, en la chargeant avec `loader()` si besoin"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                age = self.clock() - entry[1]
+                if age < ttl:
+                    self.counters['hits'] += 1
+                    return entry[0]
+                if age < ttl + stale_ttl:
+                    self.counters['stale_hits'] += 1
+                    if key not in self._inflight:
+                        self._inflight[key] = Future()
+                        threading.Thread(target=self._load, args=(key, loader),
+                                         daemon=True).start()
+                    return entry[0]
+
+            self.counters['misses'] += 1
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+            else:
+                self.counters['coalesced'] += 1
+
+        if owner:
+            self._load(key, loader)
+        return future.result()
+
+    def _load(self, key, loader):
+        future = self._inflight[key]
+        try:
+            value = loader()
+        except Exception as e:
+            with self._lock:
+                self.counters['errors'] += 1
+                del self._inflight[key]
+            future.set_exception(e)
+            return
+
+        with self._lock:
+            self.counters['refreshes'] += 1
+            self._entries[key] = (value, self.clock())
+            del self._inflight[key]
+        future.set_result(value)
+
+    def invalidate(self, key=None):
+        """Supprime une clé (ou tout le cache si key est None)"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self):
+        """Compteurs du cache, à exposer pour le monitoring"""
+        with self._lock:
+            stats = dict(self.counters)
+            stats['entries'] = len(self._entries)
+            stats['inflight'] = len(self._inflight)
+        lookups = stats['hits'] + stats['stale_hits'] + stats['misses']
+        stats['hit_ratio'] = round((stats['hits'] + stats['stale_hits']) / lookups, 4) if lookups else 0.0
+        return stats
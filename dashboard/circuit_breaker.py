@@ -0,0 +1,88 @@
+import logging
+import threading
+import time
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """Disjoncteur pour un service amont.
+
+    - closed : les appels passent, les échecs consécutifs sont comptés
+    - open : après `failure_threshold` échecs, les appels sont refusés
+      immédiatement pendant `reset_timeout` secondes
+    - half_open : un seul appel de test est autorisé ; s'il réussit le circuit
+      se referme, sinon il se rouvre avec un délai multiplié par
+      `backoff_factor` (plafonné à `max_reset_timeout`)
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=5.0,
+                 max_reset_timeout=300.0, backoff_factor=2.0, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.backoff_factor = backoff_factor
+        self.clock = clock
+
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.current_timeout = reset_timeout
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Indique si un appel peut être tenté maintenant"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and self.clock() - self.opened_at >= self.current_timeout:
+                # Laisser passer un seul appel de test
+                self.state = HALF_OPEN
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self.opened_at = None
+            self.current_timeout = self.reset_timeout
+
+    def record_failure(self):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self.current_timeout = min(self.current_timeout * self.backoff_factor,
+                                           self.max_reset_timeout)
+                self._open()
+                return
+            self.failures += 1
+            if self.state == CLOSED and self.failures >= self.failure_threshold:
+                self._open()
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = self.clock()
+        logger.warning("Circuit %s ouvert pour %gs", self.name, self.current_timeout)
+
+    def status(self):
+        """État courant, pour l'endpoint de santé"""
+        with self._lock:
+            retry_in = None
+            if self.state == OPEN:
+                retry_in = max(0.0, self.current_timeout - (self.clock() - self.opened_at))
+            return {
+                'name': self.name,
+                'state': self.state,
+                'failures': self.failures,
+                'failure_threshold': self.failure_threshold,
+                'reset_timeout': self.current_timeout,
+                'retry_in': round(retry_in, 2) if retry_in is not None else None,
+                'rejected': self.rejected,
+            }
@@ -4,8 +4,11 @@ from dotenv import load_dotenv
 load_dotenv()
 
 class Config:
-    SECRET_KEY = os.urandom(24).hex()
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///dashboard.db'
+    # Doit être identique pour tous les workers ; sans SECRET_KEY, une clé
+    # est générée une fois et gardée dans instance/secret_key
+    SECRET_KEY = os.getenv('SECRET_KEY')
+    # SQLite par défaut ; DATABASE_URL=postgresql://... pour Postgres
+    SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///paradise.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
     # ID du propriétaire du bot (vous)
@@ -13,4 +16,30 @@ class Config:
     
     # Configuration du bot
     BOT_TOKEN = os.getenv('DISCORD_TOKEN')
-    BOT_PREFIX = os.getenv('PREFIX', '!')
\ No newline at end of file
+    BOT_PREFIX = os.getenv('PREFIX', '!')
+    
+    # Sessions côté serveur (fichier SQLite partagé entre les workers ;
+    # par défaut instance/sessions.db)
+    SESSION_DB_PATH = os.getenv('SESSION_DB_PATH')
+    GUILDS_TTL = int(os.getenv('GUILDS_TTL', 300))
+    
+    # Flux SSE des statistiques du bot (un producteur par worker ; chaque client
+    # garde un thread : workers gthread, voir gunicorn.conf.py)
+    BOT_STATS_STREAM_INTERVAL = float(os.getenv('BOT_STATS_STREAM_INTERVAL', 5))
+    BOT_STATS_STREAM_QUEUE = int(os.getenv('BOT_STATS_STREAM_QUEUE', 16))
+    
+    # Fin automatique des giveaways dans le serveur de développement (python app.py) ;
+    # en production : flask run-giveaway-scheduler, dans un seul processus
+    GIVEAWAY_SCHEDULER = os.getenv('GIVEAWAY_SCHEDULER') == '1'
+    
+    # URL publique du site (https://...), pour les liens absolus des pages (og:image)
+    PUBLIC_URL = os.getenv('PUBLIC_URL', '')
+    
+    # /metrics (Prometheus) : protégé par Authorization: Bearer <METRICS_TOKEN> s'il est défini,
+    # sinon réservé aux clients locaux (127.0.0.1, ::1)
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+    
+    # Profilage à la demande (?_profile=1, propriétaire) : profils gardés, seuil N+1
+    PROFILE_BUFFER_SIZE = int(os.getenv('PROFILE_BUFFER_SIZE', 50))
+    PROFILE_N_PLUS_ONE_THRESHOLD = int(os.getenv('PROFILE_N_PLUS_ONE_THRESHOLD', 5))
+    PROFILE_TOP_FUNCTIONS = int(os.getenv('PROFILE_TOP_FUNCTIONS', 30))
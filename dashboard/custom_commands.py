@@ -0,0 +1,290 @@
+import json
+import logging
+import os
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+
+from cache import LRUCache
+
+from .api.changes import record_changes
+from .database import dialect_insert, retry_on_locked
+from .models import db, CustomCommand, GuildConfig
+
+MAX_TRIGGER_LENGTH = CustomCommand.__table__.c.trigger.type.length
+# Limite de longueur d'un message Discord
+MAX_RESPONSE_LENGTH = 2000
+DEFAULT_PREFIX = '!'
+
+logger = logging.getLogger(__name__)
+
+# Clé de fin de déclencheur dans le trie (aucun caractère n'est vide)
+_END = ''
+
+# Index des commandes par serveur. Comme pour les configs, le TTL borne la
+# durée pendant laquelle un autre worker sert un index modifié ailleurs ;
+# dans ce processus, chaque écriture invalide.
+command_indexes = LRUCache(
+    maxsize=int(os.getenv('COMMAND_INDEX_CACHE_SIZE', 4096)),
+    ttl=float(os.getenv('COMMAND_INDEX_TTL', 30))
+)
+_invalidations = defaultdict(int)
+
+
+def normalize_trigger(trigger):
+    """Les déclencheurs sont insensibles à la casse et sans espaces autour"""
+    return str(trigger).strip().lower()
+
+
+def validate_command(trigger, response):
+    """Retourne (trigger normalisé, réponse) ou lève ValueError"""
+    trigger = normalize_trigger(trigger)
+    if not trigger:
+        raise ValueError('trigger vide')
+    if len(trigger) > MAX_TRIGGER_LENGTH:
+        raise ValueError(f'trigger trop long (max {MAX_TRIGGER_LENGTH})')
+    if not isinstance(response, str) or not response.strip():
+        raise ValueError('response doit être un texte non vide')
+    if len(response) > MAX_RESPONSE_LENGTH:
+        raise ValueError(f'response trop longue (max {MAX_RESPONSE_LENGTH})')
+    return trigger, response
+
+
+def validate_commands(commands):
+    """Valide un dict {trigger: réponse} ; retourne le dict normalisé ou lève ValueError"""
+    if not isinstance(commands, dict):
+        raise ValueError('custom_commands doit être un objet {trigger: réponse}')
+    validated = {}
+    for trigger, response in commands.items():
+        try:
+            trigger, response = validate_command(trigger, response)
+        except ValueError as e:
+            raise ValueError(f'commande {trigger!r}: {e}') from e
+        validated[trigger] = response
+    return validated
+
+
+class CommandTrie:
+    """Déclencheurs d'un serveur, préfixe compris, dans un trie.
+
+    `resolve(message)` parcourt le message une seule fois depuis le début :
+    le coût dépend de la longueur du message, pas du nombre de commandes.
+    Le déclencheur le plus long suivi d'un espace (ou de la fin du message)
+    l'emporte, ce qui permet des déclencheurs de plusieurs mots.
+    """
+
+    def __init__(self, prefix, commands=()):
+        self.prefix = (prefix or DEFAULT_PREFIX).lower()
+        self._root = {}
+        self.size = 0
+        for trigger, response in commands:
+            self.add(trigger, response)
+
+    def __len__(self):
+        return self.size
+
+    def add(self, trigger, response):
+        node = self._root
+        for char in self.prefix + trigger:
+            node = node.setdefault(char, {})
+        if _END not in node:
+            self.size += 1
+        node[_END] = (trigger, response)
+
+    def resolve(self, message):
+        """Commande appelée par `message` : {'trigger', 'response', 'args'} ou None"""
+        node = self._root
+        match = None
+        last = len(message) - 1
+        for index, char in enumerate(message):
+            node = node.get(char.lower())
+            if node is None:
+                break
+            entry = node.get(_END)
+            if entry is not None and (index == last or message[index + 1].isspace()):
+                match = entry, index + 1
+        if match is None:
+            return None
+        (trigger, response), end = match
+        return {'trigger': trigger, 'response': response, 'args': message[end:].strip()}
+
+
+def invalidate_command_index(guild_id):
+    """Retire l'index d'un serveur du cache (commandes ou préfixe modifiés)"""
+    _invalidations[guild_id] += 1
+    command_indexes.invalidate(guild_id)
+
+
+def command_index(guild_id):
+    """Index des commandes d'un serveur (None si le serveur n'a pas de config)"""
+    index = command_indexes.get(guild_id)
+    if index is not None:
+        return index
+
+    generation = _invalidations[guild_id]
+    config = db.session.query(GuildConfig.prefix).filter_by(guild_id=guild_id).first()
+    if config is None:
+        return None
+    commands = db.session.query(CustomCommand.trigger, CustomCommand.response).filter_by(guild_id=guild_id)
+    index = CommandTrie(config.prefix, commands)
+    # Ne pas mettre en cache une lecture dépassée par une écriture concurrente
+    if _invalidations[guild_id] == generation:
+        command_indexes.set(guild_id, index)
+    return index
+
+
+def _config_changed(guild_id):
+    """Les commandes font partie de la config : nouvelle version dans la transaction
+    en cours (flux des modifications, export changed_since)"""
+    now = datetime.utcnow()
+    db.session.execute(update(GuildConfig).where(GuildConfig.guild_id == guild_id).values(updated_at=now))
+    record_changes(db.session.connection(), [guild_id], now)
+
+
+def list_commands(guild_id):
+    return CustomCommand.query.filter_by(guild_id=guild_id).order_by(CustomCommand.trigger).all()
+
+
+def commands_by_guild(guild_ids):
+    """{guild_id: {trigger: réponse}} pour plusieurs serveurs, en une requête"""
+    commands = {guild_id: {} for guild_id in guild_ids}
+    rows = db.session.query(CustomCommand.guild_id, CustomCommand.trigger, CustomCommand.response).filter(
+        CustomCommand.guild_id.in_(guild_ids)
+    ).order_by(CustomCommand.trigger)
+    for guild_id, trigger, response in rows:
+        commands[guild_id][trigger] = response
+    return commands
+
+
+@retry_on_locked
+def set_command(guild_id, trigger, response):
+    """Crée ou modifie une commande ; retourne (commande, créée)"""
+    command = CustomCommand.query.filter_by(guild_id=guild_id, trigger=trigger).first()
+    created = command is None
+    if created:
+        command = CustomCommand(guild_id=guild_id, trigger=trigger, response=response)
+        db.session.add(command)
+    else:
+        command.response = response
+    try:
+        db.session.flush()
+        _config_changed(guild_id)
+        db.session.commit()
+    except IntegrityError:
+        # Créée entre-temps par une autre requête : la modifier
+        db.session.rollback()
+        command = CustomCommand.query.filter_by(guild_id=guild_id, trigger=trigger).first()
+        command.response = response
+        created = False
+        _config_changed(guild_id)
+        db.session.commit()
+    invalidate_command_index(guild_id)
+    return command, created
+
+
+@retry_on_locked
+def delete_command(guild_id, trigger):
+    """Supprime une commande ; retourne False si elle n'existait pas"""
+    deleted = CustomCommand.query.filter_by(guild_id=guild_id, trigger=trigger).delete()
+    if deleted:
+        _config_changed(guild_id)
+    db.session.commit()
+    if deleted:
+        invalidate_command_index(guild_id)
+    return bool(deleted)
+
+
+@retry_on_locked
+def replace_commands(guild_id, commands):
+    """Remplace toutes les commandes d'un serveur par `commands` (déjà validées).
+
+    Ancien comportement du champ custom_commands de la config : les
+    commandes absentes sont supprimées, en une transaction.
+    """
+    table = CustomCommand.__table__
+    db.session.execute(delete(table).where(
+        table.c.guild_id == guild_id, table.c.trigger.notin_(list(commands))
+    ))
+    if commands:
+        stmt = dialect_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['guild_id', 'trigger'],
+            set_={'response': stmt.excluded.response, 'updated_at': stmt.excluded.updated_at}
+        )
+        now = datetime.utcnow()
+        db.session.execute(stmt, [
+            {'guild_id': guild_id, 'trigger': trigger, 'response': response,
+             'created_at': now, 'updated_at': now}
+            for trigger, response in commands.items()
+        ])
+    _config_changed(guild_id)
+    db.session.commit()
+    invalidate_command_index(guild_id)
+
+
+def parse_legacy_commands(raw):
+    """Commandes validées d'un ancien JSON de guild_configs (ValueError sinon)"""
+    try:
+        parsed = json.loads(raw)
+    except ValueError as e:
+        raise ValueError(f'JSON illisible: {e}') from e
+    return validate_commands(parsed)
+
+
+@retry_on_locked
+def migrate_custom_commands(batch_size=500):
+    """Copie les commandes du JSON de guild_configs dans la table custom_commands.
+
+    Lancée par init-db. Chaque lot est copié dans la même transaction que
+    l'effacement du JSON des configs concernées : relancer la migration ne
+    reprend que ce qui reste. Une commande déjà présente dans la table
+    (créée par l'API) n'est pas écrasée.
+
+    Le JSON d'une config n'est effacé que si toutes ses commandes sont
+    valides : sinon la ligne est laissée intacte, rien n'en est copié, et
+    elle sera reprise à la relance une fois corrigée. Retourne (commandes
+    copiées, serveurs non migrés).
+    """
+    total, failed = 0, []
+    last_id = 0
+    legacy = GuildConfig.custom_commands
+    while True:
+        rows = db.session.query(GuildConfig.id, GuildConfig.guild_id, legacy).filter(
+            GuildConfig.id > last_id, legacy.isnot(None), legacy.notin_(('', '{}'))
+        ).order_by(GuildConfig.id).limit(batch_size).all()
+        if not rows:
+            db.session.commit()
+            return total, failed
+        last_id = rows[-1][0]
+
+        commands, migrated = {}, []
+        for config_id, guild_id, raw in rows:
+            try:
+                parsed = parse_legacy_commands(raw)
+            except ValueError as e:
+                logger.error("Commandes du serveur %s non migrées: %s", guild_id, e)
+                failed.append(guild_id)
+                continue
+            for trigger, response in parsed.items():
+                commands[(guild_id, trigger)] = response
+            migrated.append((config_id, guild_id))
+
+        if commands:
+            stmt = dialect_insert(CustomCommand.__table__).on_conflict_do_nothing(
+                index_elements=['guild_id', 'trigger']
+            )
+            db.session.execute(stmt, [
+                {'guild_id': guild_id, 'trigger': trigger, 'response': response}
+                for (guild_id, trigger), response in commands.items()
+            ])
+        if migrated:
+            db.session.execute(
+                update(GuildConfig).where(GuildConfig.id.in_([config_id for config_id, _ in migrated]))
+                .values(custom_commands='{}')
+            )
+        db.session.commit()
+        total += len(commands)
+        for _, guild_id in migrated:
+            invalidate_command_index(guild_id)
@@ -0,0 +1,143 @@
+import os
+import random
+import time
+from functools import wraps
+
+from sqlalchemy import event, inspect, literal
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import OperationalError
+
+from .models import db
+
+DEFAULT_DATABASE_URL = 'sqlite:///paradise.db'
+
+# Réglages SQLite appliqués à chaque nouvelle connexion
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000))
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',            # lecteurs et écrivain ne se bloquent plus
+    'synchronous': 'NORMAL',          # sûr en WAL, un fsync par checkpoint
+    'busy_timeout': SQLITE_BUSY_TIMEOUT_MS,
+    'cache_size': -int(os.getenv('SQLITE_CACHE_KB', 65536)),
+    'mmap_size': int(os.getenv('SQLITE_MMAP_BYTES', 256 * 1024 * 1024)),
+    'temp_store': 'MEMORY',
+    'foreign_keys': 'ON',
+}
+
+# Codes d'erreur Postgres à rejouer : sérialisation et deadlock
+RETRYABLE_PGCODES = {'40001', '40P01'}
+
+
+def database_url():
+    return os.getenv('DATABASE_URL', DEFAULT_DATABASE_URL)
+
+
+def engine_options(url):
+    """Options du moteur SQLAlchemy selon la base (SQLite ou Postgres)"""
+    pool_size = int(os.getenv('DB_POOL_SIZE', 10))
+    options = {
+        'pool_size': pool_size,
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', pool_size * 2)),
+        'pool_timeout': 10,
+    }
+    if url.startswith('sqlite'):
+        if ':memory:' in url or url in ('sqlite://', 'sqlite:///'):
+            return {}
+        options['connect_args'] = {'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000, 'check_same_thread': False}
+    else:
+        options['pool_pre_ping'] = True
+        options['pool_recycle'] = 1800
+    return options
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for pragma, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f'PRAGMA {pragma}={value}')
+    cursor.close()
+
+
+def init_db(app):
+    """Configure et initialise la base pour l'application.
+
+    DATABASE_URL choisit la base (SQLite par défaut, Postgres possible) ;
+    pour SQLite, les pragmas de production sont appliqués à la connexion.
+    """
+    app.config.setdefault('SQLALCHEMY_DATABASE_URI', database_url())
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config['SQLALCHEMY_DATABASE_URI']))
+    db.init_app(app)
+
+    with app.app_context():
+        if db.engine.dialect.name == 'sqlite':
+            event.listen(db.engine, 'connect', _apply_sqlite_pragmas)
+
+
+def _add_missing_columns(table):
+    """ALTER TABLE ... ADD COLUMN pour les colonnes ajoutées au modèle depuis"""
+    existing = {column['name'] for column in inspect(db.engine).get_columns(table.name)}
+    dialect = db.engine.dialect
+    with db.engine.begin() as conn:
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=dialect)}'
+            if column.default is not None and column.default.is_scalar:
+                value = literal(column.default.arg, column.type)
+                ddl += f" DEFAULT {value.compile(dialect=dialect, compile_kwargs={'literal_binds': True})}"
+            conn.exec_driver_sql(ddl)
+
+
+def upgrade_schema():
+    """Crée les tables, colonnes et index manquants (commande init-db).
+
+    create_all n'ajoute ni les colonnes ni les index aux tables existantes :
+    les colonnes sont ajoutées par ALTER TABLE (avec leur valeur par défaut
+    pour les lignes existantes), les index un par un avec checkfirst.
+    """
+    db.create_all()
+    for table in db.metadata.sorted_tables:
+        _add_missing_columns(table)
+        for index in table.indexes:
+            index.create(bind=db.engine, checkfirst=True)
+
+
+def dialect_insert(table):
+    """INSERT avec ON CONFLICT (upsert) pour la base utilisée"""
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        return sqlite.insert(table)
+    if dialect == 'postgresql':
+        return postgresql.insert(table)
+    raise NotImplementedError(f"Upsert non supporté pour {dialect}")
+
+
+def is_retryable(error):
+    """Erreur transitoire de verrou, qui disparaît en rejouant la transaction"""
+    if not isinstance(error, OperationalError):
+        return False
+    if getattr(error.orig, 'pgcode', None) in RETRYABLE_PGCODES:
+        return True
+    message = str(error.orig).lower()
+    return 'database is locked' in message or 'database table is locked' in message
+
+
+def retry_on_locked(func=None, attempts=6, base_delay=0.02, max_delay=1.0):
+    """Rejoue une transaction d'écriture quand la base est verrouillée.
+
+    La fonction décorée doit contenir toute la transaction (lecture,
+    modification, commit) pour pouvoir être rejouée depuis le début. Le
+    délai entre deux essais double à chaque fois, avec un peu d'aléa.
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            for attempt in range(attempts):
+                try:
+                    return f(*args, **kwargs)
+                except OperationalError as e:
+                    db.session.rollback()
+                    if not is_retryable(e) or attempt == attempts - 1:
+                        raise
+                    delay = min(max_delay, base_delay * 2 ** attempt)
+                    time.sleep(delay * random.uniform(0.5, 1.5))
+        return wrapper
+    return decorator(func) if func is not None else decorator
@@ -0,0 +1,190 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+from rate_limit import RateLimited, SharedTokenBucket, TokenBucket
+
+load_dotenv()
+
+# DISCORD_API_URL permet de viser un faux serveur (benchmarks/stub_discord.py)
+DISCORD_API_URL = os.getenv('DISCORD_API_URL', 'https://discord.com/api')
+DISCORD_POOL_SIZE = int(os.getenv('DISCORD_POOL_SIZE', 10))
+DISCORD_CONNECT_TIMEOUT = float(os.getenv('DISCORD_CONNECT_TIMEOUT', 3))
+DISCORD_READ_TIMEOUT = float(os.getenv('DISCORD_READ_TIMEOUT', 10))
+
+# Limite globale de Discord : 50 requêtes/s pour tout le déploiement (seau
+# partagé entre les workers, voir share_rate_limit) ; attente maximale avant d'abandonner
+DISCORD_RATE_LIMIT = float(os.getenv('DISCORD_RATE_LIMIT', 50))
+DISCORD_MAX_WAIT = float(os.getenv('DISCORD_MAX_WAIT', 5))
+# Pauses par seau gardées en mémoire avant de purger celles terminées
+MAX_ROUTE_PAUSES = 10000
+
+
+class DiscordAPIError(Exception):
+    """Erreur lors d'un appel à l'API Discord"""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class DiscordClient:
+    """Client OAuth2 / API Discord partagé par le processus.
+
+    Une session HTTP keep-alive, un pool de threads pour lancer les appels
+    en parallèle, et un seau à jetons commun pour la limite globale (par
+    processus, ou entre processus avec share_rate_limit).
+
+    Les limites de Discord sont par seau (en-tête X-RateLimit-Bucket) et par
+    token : un 429 ou X-RateLimit-Remaining: 0 ne met en pause que les appels
+    du même seau avec le même token. Seul un 429 marqué X-RateLimit-Global
+    met en pause tous les appels du seau à jetons. Les pauses par seau de
+    Discord restent propres au processus qui a reçu la réponse.
+    """
+
+    def __init__(self, api_url=DISCORD_API_URL, client_id=None, client_secret=None,
+                 redirect_uri=None, pool_size=DISCORD_POOL_SIZE, bucket=None,
+                 max_wait=DISCORD_MAX_WAIT, max_retries=5):
+        self.api_url = api_url.rstrip('/')
+        self.client_id = client_id or os.getenv('DISCORD_CLIENT_ID')
+        self.client_secret = client_secret or os.getenv('DISCORD_CLIENT_SECRET')
+        self.redirect_uri = redirect_uri or os.getenv('DISCORD_REDIRECT_URI', 'http://localhost:5000/callback')
+        self.timeout = (DISCORD_CONNECT_TIMEOUT, DISCORD_READ_TIMEOUT)
+        self.max_wait = max_wait
+        self.max_retries = max_retries
+        self.bucket = bucket or TokenBucket(DISCORD_RATE_LIMIT)
+        # (méthode, chemin) -> seau annoncé par Discord ; (seau, token) -> fin de pause
+        self._route_buckets = {}
+        self._paused = {}
+        self._lock = threading.Lock()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='discord')
+
+    def request(self, method, path, **kwargs):
+        """Appelle l'API et décode la réponse JSON (lève DiscordAPIError)"""
+        route = (method, path)
+        token = (kwargs.get('headers') or {}).get('Authorization')
+        for attempt in range(self.max_retries + 1):
+            self._wait_route(route, token)
+            self.bucket.acquire(timeout=self.max_wait)
+            try:
+                response = self.session.request(method, f"{self.api_url}{path}", timeout=self.timeout, **kwargs)
+            except requests.RequestException as e:
+                raise DiscordAPIError(f"{path}: {e}") from e
+
+            self._observe_rate_limit(response, route, token)
+            if response.status_code == 429 and attempt < self.max_retries:
+                continue
+            if response.status_code >= 400:
+                raise DiscordAPIError(f"{path}: HTTP {response.status_code}", status=response.status_code)
+            try:
+                return response.json()
+            except ValueError as e:
+                raise DiscordAPIError(f"{path}: réponse JSON invalide") from e
+
+    def _bucket_key(self, route, token):
+        # Avant la première réponse, la route sert de seau
+        return self._route_buckets.get(route, route), token
+
+    def _wait_route(self, route, token):
+        """Attend la fin de la pause du seau de la route pour ce token"""
+        with self._lock:
+            until = self._paused.get(self._bucket_key(route, token), 0.0)
+        delay = until - time.monotonic()
+        if delay > self.max_wait:
+            raise RateLimited(delay)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _pause_route(self, route, token, seconds):
+        with self._lock:
+            now = time.monotonic()
+            if len(self._paused) >= MAX_ROUTE_PAUSES:
+                self._paused = {key: until for key, until in self._paused.items() if until > now}
+            key = self._bucket_key(route, token)
+            self._paused[key] = max(self._paused.get(key, 0.0), now + seconds)
+
+    def _observe_rate_limit(self, response, route, token=None):
+        headers = response.headers
+        if headers.get('X-RateLimit-Bucket'):
+            with self._lock:
+                self._route_buckets[route] = headers['X-RateLimit-Bucket']
+        if response.status_code == 429:
+            retry_after = headers.get('Retry-After')
+            if retry_after is None:
+                try:
+                    retry_after = response.json().get('retry_after', 1)
+                except ValueError:
+                    retry_after = 1
+            if headers.get('X-RateLimit-Global', '').lower() == 'true':
+                self.bucket.pause(float(retry_after))
+            else:
+                self._pause_route(route, token, float(retry_after))
+        elif headers.get('X-RateLimit-Remaining') == '0':
+            self._pause_route(route, token, float(headers.get('X-RateLimit-Reset-After', 1)))
+
+    def _token(self, data):
+        return self.request('POST', '/oauth2/token', data={
+            'client_id': self.client_id,
+            'client_secret': self.client_secret,
+            **data
+        }, headers={'Content-Type': 'application/x-www-form-urlencoded'})
+
+    def exchange_code(self, code):
+        """Échange le code OAuth2 contre access_token / refresh_token / expires_in"""
+        return self._token({
+            'grant_type': 'authorization_code',
+            'code': code,
+            'redirect_uri': self.redirect_uri,
+            'scope': 'identify guilds'
+        })
+
+    def refresh(self, refresh_token):
+        """Nouveaux tokens à partir du refresh token, sans reconnexion"""
+        return self._token({'grant_type': 'refresh_token', 'refresh_token': refresh_token})
+
+    def get_user(self, access_token):
+        return self.request('GET', '/users/@me', headers={'Authorization': f'Bearer {access_token}'})
+
+    def get_guilds(self, access_token):
+        # with_counts : approximate_member_count et approximate_presence_count
+        return self.request('GET', '/users/@me/guilds', params={'with_counts': 'true'},
+                            headers={'Authorization': f'Bearer {access_token}'})
+
+    def fetch_profile(self, access_token):
+        """Utilisateur et serveurs en parallèle : (user, guilds)"""
+        user = self.executor.submit(self.get_user, access_token)
+        guilds = self.executor.submit(self.get_guilds, access_token)
+        return user.result(), guilds.result()
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        self.session.close()
+
+
+def expires_at(credentials):
+    """Date d'expiration (timestamp) du token d'accès, si Discord l'indique"""
+    expires_in = credentials.get('expires_in')
+    return time.time() + float(expires_in) if expires_in else None
+
+
+# Client partagé par tout le processus
+client = DiscordClient()
+
+
+def share_rate_limit(sqlite_path):
+    """Remplace le seau du client par un seau partagé entre les workers
+    (fichier SQLite des sessions) ; sans effet s'il l'est déjà"""
+    bucket = client.bucket
+    if isinstance(bucket, SharedTokenBucket) and bucket.sqlite_path == sqlite_path:
+        return
+    client.bucket = SharedTokenBucket(bucket.rate, sqlite_path, name='discord', capacity=bucket.capacity)
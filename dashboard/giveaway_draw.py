@@ -0,0 +1,153 @@
+import hashlib
+import heapq
+import json
+import math
+import os
+import secrets
+
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+
+from .database import dialect_insert, retry_on_locked
+from .models import db, Giveaway, GiveawayDraw, GiveawayEntrant
+
+# Nombre maximal de chances d'un participant
+MAX_ENTRANT_WEIGHT = int(os.getenv('GIVEAWAY_MAX_WEIGHT', 100))
+# Participants écrits par transaction pendant l'ingestion
+ENTRANTS_CHUNK_SIZE = 1000
+# Participants lus par aller-retour pendant un tirage
+DRAW_FETCH_SIZE = 10000
+MAX_SEED_LENGTH = GiveawayDraw.__table__.c.seed.type.length
+
+_HASH_RANGE = float(2 ** 64)
+
+
+def new_seed():
+    return secrets.token_hex(16)
+
+
+def draw_winners(entrants, count, seed, exclude=frozenset()):
+    """Tire `count` gagnants parmi (user_id, weight) en un seul passage.
+
+    u est tiré d'un hash de (graine, user_id), uniforme dans ]0, 1[ ; le
+    score log(u) / weight (Efraimidis-Spirakis) donne à chacun une chance
+    proportionnelle à son poids et les meilleurs scores gagnent. Le score
+    ne dépend que de la graine et du participant : l'ordre de lecture ne
+    change pas le résultat, et la graine suffit à refaire le tirage.
+
+    Seuls les `count` meilleurs scores sont gardés (tas de taille count) :
+    la mémoire ne dépend pas du nombre de participants. Retourne
+    (gagnants du meilleur score au moins bon, participants retenus).
+    """
+    keyed = hashlib.blake2b(key=seed.encode(), digest_size=8)
+    from_bytes, log, exp = int.from_bytes, math.log, math.exp
+    heap = []
+    # u minimal pour entrer dans le tas, par poids : évite le log pour la
+    # grande majorité des participants une fois le tas plein
+    limits = {}
+    candidates = 0
+    for user_id, weight in entrants:
+        if weight <= 0 or user_id in exclude:
+            continue
+        candidates += 1
+        digest = keyed.copy()
+        digest.update(user_id.encode())
+        u = (from_bytes(digest.digest(), 'big') + 0.5) / _HASH_RANGE
+        if len(heap) < count:
+            heapq.heappush(heap, (log(u) / weight, user_id))
+            limits.clear()
+            continue
+        limit = limits.get(weight)
+        if limit is None:
+            limit = limits[weight] = exp(heap[0][0] * weight)
+        if u > limit:
+            heapq.heapreplace(heap, (log(u) / weight, user_id))
+            limits.clear()
+    return [user_id for _, user_id in sorted(heap, reverse=True)], candidates
+
+
+def count_entrants(giveaway_id):
+    return db.session.query(func.count(GiveawayEntrant.id)).filter_by(giveaway_id=giveaway_id).scalar()
+
+
+@retry_on_locked
+def _insert_entrants(giveaway_id, rows, now):
+    stmt = dialect_insert(GiveawayEntrant.__table__).on_conflict_do_nothing(
+        index_elements=['giveaway_id', 'user_id']
+    )
+    db.session.execute(stmt, [
+        {'giveaway_id': giveaway_id, 'user_id': user_id, 'weight': weight, 'entered_at': now}
+        for user_id, weight in rows.items()
+    ])
+    db.session.commit()
+
+
+@retry_on_locked
+def _update_entrants_count(giveaway_id):
+    total = count_entrants(giveaway_id)
+    db.session.execute(update(Giveaway).where(Giveaway.id == giveaway_id).values(entrants=total))
+    db.session.commit()
+    return total
+
+
+def add_entrants(giveaway_id, entrants, now):
+    """Enregistre un flux de (user_id, weight) par lots de ENTRANTS_CHUNK_SIZE.
+
+    Un participant déjà inscrit est ignoré (son premier poids est gardé).
+    Chaque lot est validé dans sa propre transaction : un long flux ne
+    bloque pas les autres écritures. Le compteur `entrants` du giveaway est
+    recalculé à la fin. Retourne (participants ajoutés, total).
+    """
+    before = count_entrants(giveaway_id)
+    db.session.commit()
+    chunk = {}
+    for user_id, weight in entrants:
+        chunk.setdefault(user_id, weight)
+        if len(chunk) >= ENTRANTS_CHUNK_SIZE:
+            _insert_entrants(giveaway_id, chunk, now)
+            chunk = {}
+    if chunk:
+        _insert_entrants(giveaway_id, chunk, now)
+    total = _update_entrants_count(giveaway_id)
+    return total - before, total
+
+
+def list_draws(giveaway_id):
+    return GiveawayDraw.query.filter_by(giveaway_id=giveaway_id).order_by(GiveawayDraw.round).all()
+
+
+def run_draw(giveaway, count, seed=None, reroll=False):
+    """Tire les gagnants d'un giveaway et enregistre le tirage.
+
+    Sans reroll, il s'agit du tirage initial ; avec reroll, les gagnants
+    de tous les tirages précédents sont exclus. Lève ValueError si le
+    tirage initial existe déjà (ou manque pour une relance).
+    """
+    previous = list_draws(giveaway.id)
+    if previous and not reroll:
+        raise ValueError('giveaway déjà tiré, utiliser reroll')
+    if reroll and not previous:
+        raise ValueError('aucun tirage à relancer')
+    exclude = {user_id for draw in previous for user_id in json.loads(draw.winners)}
+    seed = seed or new_seed()
+
+    # Lecture directe sur la connexion : le passage par l'ORM double le coût par ligne
+    rows = db.session.connection().execute(
+        select(GiveawayEntrant.user_id, GiveawayEntrant.weight)
+        .where(GiveawayEntrant.giveaway_id == giveaway.id)
+        .execution_options(yield_per=DRAW_FETCH_SIZE)
+    )
+    winners, candidates = draw_winners(rows, count, seed, exclude)
+
+    draw = GiveawayDraw(
+        giveaway_id=giveaway.id, round=len(previous), seed=seed,
+        winners=json.dumps(winners), excluded=len(exclude), entrants=candidates
+    )
+    db.session.add(draw)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Même tour tiré en parallèle par une autre requête
+        db.session.rollback()
+        raise ValueError('tirage déjà en cours')
+    return draw
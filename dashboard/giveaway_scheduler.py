@@ -0,0 +1,248 @@
+import heapq
+import logging
+import threading
+import time
+from datetime import timedelta, timezone
+from itertools import chain
+
+from sqlalchemy import event, func, or_, update
+from sqlalchemy.orm import Session
+
+from .models import db, Giveaway
+
+logger = logging.getLogger(__name__)
+
+# Marge relue à chaque synchronisation : horloges des processus et
+# transactions validées après leur updated_at
+SYNC_OVERLAP = timedelta(seconds=60)
+
+
+def to_timestamp(end_time):
+    """Les dates naïves sont en UTC (colonnes) ; une date avec fuseau est convertie"""
+    if end_time.tzinfo is None:
+        end_time = end_time.replace(tzinfo=timezone.utc)
+    return end_time.timestamp()
+
+
+class GiveawayScheduler:
+    """Termine automatiquement les giveaways arrivés à échéance.
+
+    Les giveaways non terminés sont gardés dans un tas (min-heap) trié sur
+    end_time : ajout et report en O(log n), annulation en O(1) (suppression
+    paresseuse : l'entrée périmée est ignorée quand elle sort du tas). Le
+    thread dort jusqu'à la prochaine échéance, puis termine les giveaways dus
+    par lots via `end_giveaways(message_ids)`, qui retourne les ids terminés.
+
+    Un seul planificateur doit tourner : `flask run-giveaway-scheduler`,
+    dans un processus à part des workers web. Les giveaways créés, reportés
+    ou terminés par les autres processus sont relus toutes les
+    `sync_interval` secondes (nouvel id ou updated_at récent).
+    """
+
+    def __init__(self, end_giveaways, clock=time.time, batch_size=100,
+                 retry_delay=30, sync_interval=30):
+        self.end_giveaways = end_giveaways
+        self.clock = clock
+        self.batch_size = batch_size
+        self.retry_delay = retry_delay
+        self.sync_interval = sync_interval
+        self.app = None
+        self.active = False
+        self.ended_count = 0
+        self._heap = []
+        self._deadlines = {}
+        self._last_id = 0
+        self._synced_at = None
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def __len__(self):
+        return len(self._deadlines)
+
+    def schedule(self, message_id, end_time):
+        """Ajoute ou reporte un giveaway (end_time : datetime UTC ou timestamp)"""
+        deadline = end_time if isinstance(end_time, (int, float)) else to_timestamp(end_time)
+        with self._cond:
+            if self._deadlines.get(message_id) == deadline:
+                return
+            self._deadlines[message_id] = deadline
+            heapq.heappush(self._heap, (deadline, message_id))
+            if self._heap[0][1] == message_id:
+                self._cond.notify()
+            self._compact()
+
+    def cancel(self, message_id):
+        with self._cond:
+            self._deadlines.pop(message_id, None)
+            self._compact()
+
+    def _compact(self):
+        # Reconstruire le tas quand les entrées périmées dominent
+        if len(self._heap) > 2 * len(self._deadlines) + 1024:
+            self._heap = [(deadline, message_id) for message_id, deadline in self._deadlines.items()]
+            heapq.heapify(self._heap)
+
+    def next_deadline(self):
+        with self._cond:
+            self._drop_stale()
+            return self._heap[0][0] if self._heap else None
+
+    def _drop_stale(self):
+        heap = self._heap
+        while heap and self._deadlines.get(heap[0][1]) != heap[0][0]:
+            heapq.heappop(heap)
+
+    def pop_due(self, now=None):
+        """Retire et retourne jusqu'à batch_size giveaways échus"""
+        now = self.clock() if now is None else now
+        due = []
+        with self._cond:
+            while len(due) < self.batch_size:
+                self._drop_stale()
+                if not self._heap or self._heap[0][0] > now:
+                    break
+                _, message_id = heapq.heappop(self._heap)
+                del self._deadlines[message_id]
+                due.append(message_id)
+        return due
+
+    def process_due(self, now=None):
+        """Termine un lot de giveaways échus ; retourne le nombre terminé"""
+        now = self.clock() if now is None else now
+        due = self.pop_due(now)
+        if not due:
+            return 0
+
+        with self.app.app_context():
+            # Revalider en base : un autre processus a pu terminer ou reporter
+            rows = Giveaway.query.filter(Giveaway.message_id.in_(due), Giveaway.ended.is_(False)).all()
+            ready = []
+            for giveaway in rows:
+                if giveaway.end_time and to_timestamp(giveaway.end_time) > now:
+                    self.schedule(giveaway.message_id, giveaway.end_time)
+                else:
+                    ready.append(giveaway.message_id)
+            if not ready:
+                return 0
+
+            try:
+                ended = set(self.end_giveaways(ready))
+            except Exception:
+                # Bot injoignable : les giveaways sont retentés plus tard
+                logger.exception("Erreur fin des giveaways %s", ready)
+                ended = set()
+            if ended:
+                db.session.execute(
+                    update(Giveaway)
+                    .where(Giveaway.message_id.in_(ended), Giveaway.ended.is_(False))
+                    .values(ended=True)
+                )
+            db.session.commit()
+
+        for message_id in ready:
+            if message_id not in ended:
+                self.schedule(message_id, now + self.retry_delay)
+        self.ended_count += len(ended)
+        return len(ended)
+
+    def load(self):
+        """Charge tous les giveaways non terminés (au démarrage)"""
+        with self.app.app_context():
+            self._last_id = db.session.query(func.max(Giveaway.id)).scalar() or 0
+            self._synced_at = db.session.query(func.max(Giveaway.updated_at)).scalar()
+            rows = db.session.query(Giveaway.message_id, Giveaway.end_time).filter(
+                Giveaway.ended.is_(False), Giveaway.end_time.isnot(None), Giveaway.message_id.isnot(None),
+                Giveaway.id <= self._last_id
+            ).yield_per(10000)
+            with self._cond:
+                for message_id, end_time in rows:
+                    self._deadlines[message_id] = to_timestamp(end_time)
+                self._heap = [(deadline, message_id) for message_id, deadline in self._deadlines.items()]
+                heapq.heapify(self._heap)
+                self._cond.notify()
+
+    def sync_new(self):
+        """Applique les giveaways créés, reportés ou terminés par d'autres processus.
+
+        Relit les nouveaux ids et les lignes dont updated_at dépasse le
+        dernier vu (moins SYNC_OVERLAP) ; relire une ligne déjà appliquée
+        ne change rien.
+        """
+        changed = Giveaway.id > self._last_id
+        if self._synced_at is not None:
+            changed = or_(changed, Giveaway.updated_at >= self._synced_at - SYNC_OVERLAP)
+        with self.app.app_context():
+            rows = db.session.query(
+                Giveaway.id, Giveaway.message_id, Giveaway.end_time, Giveaway.ended, Giveaway.updated_at
+            ).filter(changed).order_by(Giveaway.id).all()
+        for giveaway_id, message_id, end_time, ended, updated_at in rows:
+            self._last_id = max(self._last_id, giveaway_id)
+            if updated_at is not None and (self._synced_at is None or updated_at > self._synced_at):
+                self._synced_at = updated_at
+            if not message_id:
+                continue
+            if ended or not end_time:
+                self.cancel(message_id)
+            else:
+                self.schedule(message_id, end_time)
+
+    def init_app(self, app, start=True):
+        self.app = app
+        self.active = True
+        self.load()
+        if start:
+            self._thread = threading.Thread(target=self.run, name='giveaway-scheduler', daemon=True)
+            self._thread.start()
+
+    def run(self):
+        """Boucle du planificateur, jusqu'à stop()"""
+        last_sync = self.clock()
+        while self.active:
+            with self._cond:
+                self._drop_stale()
+                timeout = self.sync_interval
+                if self._heap:
+                    timeout = min(timeout, max(0.0, self._heap[0][0] - self.clock()))
+                if timeout > 0:
+                    self._cond.wait(timeout)
+            try:
+                while self.process_due():
+                    pass
+                if self.clock() - last_sync >= self.sync_interval:
+                    self.sync_new()
+                    last_sync = self.clock()
+            except Exception:
+                logger.exception("Erreur planificateur giveaways")
+
+    def stop(self):
+        with self._cond:
+            self.active = False
+            self._cond.notify()
+
+
+def register_session_hooks(scheduler):
+    """Tient le planificateur à jour lors des commits de ce processus"""
+
+    @event.listens_for(Session, 'after_flush')
+    def _collect_giveaways(session, flush_context):
+        if not scheduler.active:
+            return
+        changed = session.info.setdefault('changed_giveaways', {})
+        for obj in chain(session.new, session.dirty):
+            if isinstance(obj, Giveaway) and obj.message_id:
+                changed[obj.message_id] = None if obj.ended or not obj.end_time else obj.end_time
+        for obj in session.deleted:
+            if isinstance(obj, Giveaway) and obj.message_id:
+                changed[obj.message_id] = None
+
+    @event.listens_for(Session, 'after_commit')
+    def _apply_giveaways(session):
+        for message_id, end_time in session.info.pop('changed_giveaways', {}).items():
+            if end_time is None:
+                scheduler.cancel(message_id)
+            else:
+                scheduler.schedule(message_id, end_time)
+
+    @event.listens_for(Session, 'after_rollback')
+    def _forget_giveaways(session):
+        session.info.pop('changed_giveaways', None)
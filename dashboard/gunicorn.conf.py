@@ -0,0 +1,9 @@
+import os
+
+# Lu automatiquement par gunicorn lancé depuis dashboard/ (gunicorn 'app:create_app()').
+# Le flux SSE des statistiques et le long-poll des configs gardent chacun un
+# thread pendant toute la connexion : avec des workers sync, quelques
+# dashboards ouverts suffiraient à bloquer tous les workers. gthread garde
+# un thread par connexion sans bloquer les autres requêtes du worker.
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 32))
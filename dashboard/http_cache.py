@@ -0,0 +1,185 @@
+import gzip
+import hashlib
+import os
+import threading
+from functools import wraps
+
+from flask import current_app, request, session
+from flask_login import current_user
+
+from cache import LRUCache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Types compressibles ; les images et polices le sont déjà
+COMPRESSIBLE_MIMETYPES = {
+    'text/html', 'text/css', 'text/plain', 'text/javascript', 'application/javascript',
+    'application/json', 'application/x-ndjson', 'image/svg+xml',
+    'application/vnd.paradise.config.compact+json',
+}
+COMPRESS_MIN_SIZE = 500
+
+# Un an : l'URL change avec le contenu (?v=<hash>)
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def compress(body, encoding, level=6):
+    if encoding == 'br':
+        return brotli.compress(body, quality=min(level, 11))
+    return gzip.compress(body, compresslevel=min(level, 9), mtime=0)
+
+
+def negotiate_encoding():
+    """Meilleur encodage accepté par le client : br, gzip ou None"""
+    accept = request.accept_encodings
+    candidates = ['br', 'gzip'] if brotli is not None else ['gzip']
+    best = max(candidates, key=lambda encoding: accept[encoding])
+    return best if accept[best] > 0 else None
+
+
+class StaticFingerprints:
+    """Empreinte (hash du contenu) et versions compressées des fichiers statiques.
+
+    Recalculées quand la date de modification du fichier change.
+    """
+
+    def __init__(self, static_folder):
+        self.static_folder = static_folder
+        self._hashes = {}
+        self._compressed = LRUCache(maxsize=256)
+        self._lock = threading.Lock()
+
+    def _path(self, filename):
+        path = os.path.realpath(os.path.join(self.static_folder, filename))
+        if not path.startswith(os.path.realpath(self.static_folder) + os.sep):
+            return None
+        return path
+
+    def version(self, filename):
+        path = self._path(filename)
+        try:
+            mtime = os.stat(path).st_mtime_ns if path else None
+        except OSError:
+            return None
+        with self._lock:
+            cached = self._hashes.get(filename)
+            if cached and cached[0] == mtime:
+                return cached[1]
+        with open(path, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()[:12]
+        with self._lock:
+            self._hashes[filename] = (mtime, digest)
+        return digest
+
+    def compressed(self, filename, encoding):
+        version = self.version(filename)
+        if version is None:
+            return None
+        key = (filename, version, encoding)
+        body = self._compressed.get(key)
+        if body is None:
+            with open(self._path(filename), 'rb') as f:
+                body = compress(f.read(), encoding, level=11)
+            self._compressed.set(key, body)
+        return body
+
+
+def init_http_cache(app):
+    """Compression gzip/brotli, URLs statiques versionnées et cache immuable"""
+    app.config.setdefault('PAGE_CACHE', True)
+    app.config.setdefault('COMPRESS', True)
+    fingerprints = StaticFingerprints(app.static_folder)
+    app.extensions['static_fingerprints'] = fingerprints
+    app.extensions['page_cache'] = LRUCache(maxsize=64)
+
+    @app.url_defaults
+    def _static_version(endpoint, values):
+        # url_for('static', filename=...) -> /static/...?v=<hash du contenu>
+        if endpoint == 'static' and 'v' not in values:
+            version = fingerprints.version(values.get('filename', ''))
+            if version:
+                values['v'] = version
+
+    @app.after_request
+    def _compress_response(response):
+        if request.endpoint == 'static' and response.status_code in (200, 304):
+            filename = request.view_args.get('filename', '')
+            if request.args.get('v') and request.args.get('v') == fingerprints.version(filename):
+                response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        if not app.config['COMPRESS'] or response.status_code != 200:
+            return response
+        if response.mimetype not in COMPRESSIBLE_MIMETYPES or 'Content-Encoding' in response.headers:
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = negotiate_encoding()
+        if encoding is None:
+            return response
+
+        if request.endpoint == 'static':
+            body = fingerprints.compressed(request.view_args.get('filename', ''), encoding)
+            if body is None:
+                return response
+            response.response.close()
+            response.direct_passthrough = False
+            response.headers.pop('Accept-Ranges', None)
+        elif response.is_streamed or response.direct_passthrough:
+            return response
+        else:
+            raw = response.get_data()
+            if len(raw) < COMPRESS_MIN_SIZE:
+                return response
+            body = compress(raw, encoding)
+
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+        # La représentation compressée n'est pas identique octet par octet
+        etag, weak = response.get_etag()
+        if etag:
+            response.set_etag(etag, weak=True)
+        return response
+
+
+def cached_page(view):
+    """Cache du rendu pour les pages publiques identiques pour tous les visiteurs.
+
+    Seuls les visiteurs anonymes sans message flash en attente sont servis
+    depuis le cache ; la page est gardée avec ses versions compressées, un
+    ETag, et un 304 est renvoyé si le client l'a déjà.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        app = current_app
+        if not app.config['PAGE_CACHE'] or app.debug or current_user.is_authenticated or '_flashes' in session:
+            return view(*args, **kwargs)
+
+        # Clé sur le chemin seul : l'en-tête Host vient du client ; les URLs
+        # absolues des pages sont construites avec PUBLIC_URL
+        cache = app.extensions['page_cache']
+        key = request.path
+        entry = cache.get(key)
+        if entry is None:
+            body = app.make_response(view(*args, **kwargs)).get_data()
+            entry = {
+                'body': body,
+                'etag': hashlib.sha1(body).hexdigest(),
+                'gzip': compress(body, 'gzip', level=9),
+                'br': compress(body, 'br', level=11) if brotli is not None else None,
+            }
+            cache.set(key, entry)
+
+        if request.if_none_match.contains_weak(entry['etag']):
+            response = app.response_class(status=304)
+        else:
+            response = app.response_class(entry['body'], mimetype='text/html')
+            encoding = negotiate_encoding() if app.config['COMPRESS'] else None
+            if encoding:
+                response.set_data(entry[encoding])
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(entry['etag'], weak=True)
+        response.headers['Cache-Control'] = 'no-cache'
+        response.vary.update(('Accept-Encoding', 'Cookie'))
+        return response
+    return wrapper
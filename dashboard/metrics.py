@@ -0,0 +1,477 @@
+import atexit
+import bisect
+import glob
+import hmac
+import ipaddress
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+from flask import Response, current_app, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Plusieurs workers gunicorn : chaque processus écrit ses compteurs dans ce
+# dossier (à vider au démarrage du déploiement) et /metrics les additionne
+METRICS_MULTIPROC_DIR = os.getenv('METRICS_MULTIPROC_DIR')
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 5))
+
+# Bornes des histogrammes (secondes, ou nombre de requêtes SQL)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+SQL_OPERATIONS = {'SELECT', 'INSERT', 'UPDATE', 'DELETE', 'PRAGMA'}
+
+
+class Counter:
+    """Compteur monotone, une valeur par combinaison de labels"""
+
+    type = 'counter'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def family(self):
+        with self._lock:
+            samples = [[list(labels), value] for labels, value in self.values.items()]
+        return family(self.name, self.type, self.help, self.labels, samples)
+
+    def reset(self):
+        # Après un fork : le verrou a pu être copié pendant qu'un thread le tenait
+        self._lock = threading.Lock()
+        self.values = {}
+
+
+class Histogram(Counter):
+    """Histogramme à bornes fixes : comptes par tranche (+Inf en dernier) puis somme"""
+
+    type = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self.values.get(labels)
+            if counts is None:
+                counts = self.values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[index] += 1
+            counts[-1] += value
+
+    def family(self):
+        with self._lock:
+            samples = [[list(labels), list(counts)] for labels, counts in self.values.items()]
+        return family(self.name, self.type, self.help, self.labels, samples, buckets=self.buckets)
+
+
+def family(name, type, help, labels, samples, buckets=None, mode=None):
+    """Métrique sérialisable : samples = [[valeurs des labels], valeur]
+
+    `mode` (jauges) : agrégation entre workers, 'livesum' (somme des processus
+    vivants, par défaut) ou 'max'.
+    """
+    result = {'name': name, 'type': type, 'help': help, 'labels': list(labels), 'samples': samples}
+    if buckets is not None:
+        result['buckets'] = list(buckets)
+    if mode is not None:
+        result['mode'] = mode
+    return result
+
+
+def merge(snapshots):
+    """Additionne les métriques de plusieurs processus (par nom puis par labels).
+
+    Les jauges en mode 'max' gardent la plus grande valeur au lieu de la somme.
+    """
+    merged = {}
+    for snapshot in snapshots:
+        for item in snapshot:
+            target = merged.setdefault(item['name'], dict(item, samples={}))
+            samples = target['samples']
+            for labels, value in item['samples']:
+                key = tuple(labels)
+                current = samples.get(key)
+                if current is None:
+                    samples[key] = list(value) if isinstance(value, list) else value
+                elif isinstance(value, list):
+                    samples[key] = [a + b for a, b in zip(current, value)]
+                elif item.get('mode') == 'max':
+                    samples[key] = max(current, value)
+                else:
+                    samples[key] = current + value
+    for item in merged.values():
+        item['samples'] = [[list(labels), value] for labels, value in item['samples'].items()]
+    return list(merged.values())
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape_bound(bound):
+    return f'"{bound}"' if isinstance(bound, str) else f'"{float(bound)!r}"'
+
+
+def render(families):
+    """Format texte d'exposition de Prometheus (version 0.0.4)"""
+    lines = []
+    for item in sorted(families, key=lambda item: item['name']):
+        name, names = item['name'], item['labels']
+        lines.append(f"# HELP {name} {item['help']}")
+        lines.append(f"# TYPE {name} {item['type']}")
+        for values, value in sorted(item['samples'], key=lambda sample: sample[0]):
+            if item['type'] != 'histogram':
+                lines.append(f'{name}{_labels(names, values)} {_number(value)}')
+                continue
+            cumulative = 0
+            for bound, count in zip(item['buckets'] + ['+Inf'], value[:-1]):
+                cumulative += count
+                lines.append(f'{name}_bucket{_labels(names, values, f"le={_escape_bound(bound)}")} {cumulative}')
+            lines.append(f'{name}_sum{_labels(names, values)} {_number(value[-1])}')
+            lines.append(f'{name}_count{_labels(names, values)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+class Registry:
+    """Métriques du processus, et agrégation entre workers si `directory`.
+
+    Les collecteurs sont des fonctions appelées à chaque lecture qui
+    retournent une liste de `family(...)`. Un collecteur `live` n'est pas
+    écrit dans les fichiers des workers : il est calculé par le processus
+    qui répond à /metrics (valeur partagée, par exemple les sessions en base).
+    """
+
+    def __init__(self, directory=METRICS_MULTIPROC_DIR, flush_interval=METRICS_FLUSH_INTERVAL):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.metrics = {}
+        self.collectors = {}
+        self.derived = []
+        self._lock = threading.Lock()
+        self._reset_process()
+
+    def _reset_process(self):
+        self._path = None
+        self._flusher = None
+        self._flush_lock = threading.Lock()
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            # Un fichier par processus ; le suffixe évite d'écraser celui d'un
+            # ancien worker qui aurait eu le même pid
+            self._path = os.path.join(self.directory, f'{os.getpid()}-{uuid.uuid4().hex[:8]}.json')
+
+    def after_fork(self):
+        """Dans un worker forké : repartir de zéro avec son propre fichier"""
+        self._lock = threading.Lock()
+        for metric in self.metrics.values():
+            metric.reset()
+        self._reset_process()
+
+    def _register(self, cls, name, *args, **kwargs):
+        with self._lock:
+            if name not in self.metrics:
+                self.metrics[name] = cls(name, *args, **kwargs)
+            return self.metrics[name]
+
+    def counter(self, name, help, labels=()):
+        return self._register(Counter, name, help, labels)
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram, name, help, labels, buckets=buckets)
+
+    def collector(self, name, func, live=False):
+        """Ajoute (ou remplace) le collecteur `name`"""
+        self.collectors[name] = (func, live)
+        return func
+
+    def snapshot(self):
+        """Métriques de ce processus uniquement (hors collecteurs `live`)"""
+        families = [metric.family() for metric in list(self.metrics.values())]
+        for func, live in list(self.collectors.values()):
+            if not live:
+                families.extend(func())
+        return families
+
+    def write(self, exiting=False):
+        """Écrit les métriques du processus dans son fichier (remplacement atomique).
+
+        À l'arrêt (`exiting`), les jauges ne sont plus écrites : seuls les
+        compteurs et histogrammes d'un worker terminé restent additionnés.
+        """
+        if not self._path:
+            return
+        families = self.snapshot()
+        if exiting:
+            families = [item for item in families if item['type'] != 'gauge']
+        with self._flush_lock:
+            tmp_path = f'{self._path}.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(families, f, separators=(',', ':'))
+            os.replace(tmp_path, self._path)
+
+    def write_at_exit(self):
+        try:
+            self.write(exiting=True)
+        except OSError:
+            # Dossier supprimé avant l'arrêt du processus
+            pass
+
+    def start_flusher(self):
+        """Thread d'écriture périodique, démarré au premier appel dans chaque worker"""
+        if not self._path or self._flusher is not None:
+            return
+        with self._lock:
+            if self._flusher is not None:
+                return
+            self._flusher = threading.Thread(target=self._flush_loop, name='metrics-flush', daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.write()
+            except OSError:
+                logger.exception("Erreur écriture métriques")
+
+    def _read_all(self):
+        self.write()
+        snapshots = []
+        for path in glob.glob(os.path.join(self.directory, '*.json')):
+            try:
+                with open(path) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                # Fichier supprimé entre-temps
+                continue
+            # Worker tué sans passer par atexit : ses jauges ne comptent plus
+            if not _process_alive(os.path.basename(path).split('-', 1)[0]):
+                snapshot = [item for item in snapshot if item['type'] != 'gauge']
+            snapshots.append(snapshot)
+        return snapshots
+
+    def collect(self):
+        """Toutes les métriques : celles des workers additionnées, puis les `live`"""
+        families = merge(self._read_all() if self.directory else [self.snapshot()])
+        for func, live in list(self.collectors.values()):
+            if live:
+                families.extend(func())
+        for func in self.derived:
+            families.extend(func(families))
+        return families
+
+    def render(self):
+        return render(self.collect())
+
+
+def _process_alive(pid):
+    try:
+        os.kill(int(pid), 0)
+    except PermissionError:
+        return True
+    except (OSError, ValueError):
+        return False
+    return True
+
+
+REGISTRY = Registry()
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=REGISTRY.after_fork)
+atexit.register(REGISTRY.write_at_exit)
+
+# ==================== MÉTRIQUES ====================
+
+HTTP_LATENCY = REGISTRY.histogram(
+    'paradise_http_request_duration_seconds', 'Durée de traitement des requêtes HTTP par route',
+    labels=('endpoint', 'method')
+)
+HTTP_REQUESTS = REGISTRY.counter(
+    'paradise_http_requests_total', 'Requêtes HTTP par route et code de réponse',
+    labels=('endpoint', 'method', 'status')
+)
+REQUEST_DB_QUERIES = REGISTRY.histogram(
+    'paradise_http_request_db_queries', 'Nombre de requêtes SQL par requête HTTP',
+    labels=('endpoint',), buckets=COUNT_BUCKETS
+)
+REQUEST_DB_TIME = REGISTRY.histogram(
+    'paradise_http_request_db_seconds', 'Temps passé en base par requête HTTP',
+    labels=('endpoint',), buckets=QUERY_BUCKETS
+)
+DB_QUERY_LATENCY = REGISTRY.histogram(
+    'paradise_db_query_duration_seconds', 'Durée des requêtes SQL',
+    labels=('operation',), buckets=QUERY_BUCKETS
+)
+BOT_API_LATENCY = REGISTRY.histogram(
+    'paradise_bot_api_request_duration_seconds', "Durée des appels à l'API du bot",
+    labels=('endpoint',)
+)
+BOT_API_ERRORS = REGISTRY.counter(
+    'paradise_bot_api_errors_total', "Appels à l'API du bot en échec",
+    labels=('endpoint', 'reason')
+)
+BOT_API_FALLBACKS = REGISTRY.counter(
+    'paradise_bot_api_fallbacks_total', 'Réponses servies avec les valeurs par défaut faute de données du bot',
+    labels=('endpoint',)
+)
+INGESTED_EVENTS = REGISTRY.counter(
+    'paradise_ingested_events_total', 'Événements reçus du bot par type et résultat',
+    labels=('type', 'result')
+)
+
+# ==================== BASE DE DONNÉES ====================
+
+_request = threading.local()
+_db_hooks_installed = False
+
+
+def _sql_operation(statement):
+    operation = statement.lstrip()[:6].upper()
+    return operation if operation in SQL_OPERATIONS else 'OTHER'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, '_metrics_start', None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    DB_QUERY_LATENCY.observe(elapsed, _sql_operation(statement))
+    if getattr(_request, 'start', None) is not None:
+        _request.queries += 1
+        _request.db_time += elapsed
+
+
+def install_db_hooks():
+    """Chronomètre toutes les requêtes SQL (tous les moteurs SQLAlchemy)"""
+    global _db_hooks_installed
+    if _db_hooks_installed:
+        return
+    event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    _db_hooks_installed = True
+
+# ==================== CACHES ====================
+
+
+def cache_collector(get_caches):
+    """Collecteur des compteurs de caches (LRUCache, SWRCache) : get_caches() -> {nom: cache}"""
+    def collect():
+        hits, misses, entries = [], [], []
+        for name, cache in get_caches().items():
+            stats = cache.stats()
+            hits.append([[name], stats['hits'] + stats.get('stale_hits', 0)])
+            misses.append([[name], stats['misses']])
+            entries.append([[name], stats['entries']])
+        return [
+            family('paradise_cache_hits_total', 'counter', 'Lectures servies par le cache', ('cache',), hits),
+            family('paradise_cache_misses_total', 'counter', 'Lectures absentes du cache', ('cache',), misses),
+            family('paradise_cache_entries', 'gauge', 'Entrées en cache (workers actifs)', ('cache',), entries,
+                   mode='livesum'),
+        ]
+    return collect
+
+
+def cache_hit_ratios(families):
+    """Taux de succès de chaque cache, calculé après l'agrégation des workers"""
+    by_name = {item['name']: item for item in families}
+    if 'paradise_cache_hits_total' not in by_name:
+        return []
+    misses = {tuple(labels): value for labels, value in by_name['paradise_cache_misses_total']['samples']}
+    samples = []
+    for labels, hits in by_name['paradise_cache_hits_total']['samples']:
+        lookups = hits + misses.get(tuple(labels), 0)
+        samples.append([labels, round(hits / lookups, 4) if lookups else 0.0])
+    return [family('paradise_cache_hit_ratio', 'gauge', 'Part des lectures servies par le cache',
+                   ('cache',), samples)]
+
+
+REGISTRY.derived.append(cache_hit_ratios)
+
+# ==================== FLASK ====================
+
+
+def _is_loopback(address):
+    try:
+        return ipaddress.ip_address(address or '').is_loopback
+    except ValueError:
+        return False
+
+
+def init_metrics(app, registry=REGISTRY):
+    """Latence par route, requêtes SQL par requête et endpoint /metrics.
+
+    À appeler avant les autres extensions : le hook after_request enregistré
+    en premier s'exécute en dernier et mesure donc aussi la compression.
+    METRICS_TOKEN, s'il est défini, protège /metrics (Authorization: Bearer) ;
+    sinon /metrics ne répond qu'aux clients locaux (loopback).
+    """
+    app.config.setdefault('METRICS', True)
+    if not app.config['METRICS']:
+        return
+    install_db_hooks()
+
+    @app.before_request
+    def _start_request_timer():
+        _request.start = time.perf_counter()
+        _request.queries = 0
+        _request.db_time = 0.0
+        registry.start_flusher()
+
+    @app.after_request
+    def _record_request(response):
+        start = getattr(_request, 'start', None)
+        if start is None:
+            return response
+        _request.start = None
+        # Un seul passage par le proxy `request` (coûteux à chaque attribut)
+        current = request._get_current_object()
+        endpoint = current.endpoint or 'unmatched'
+        HTTP_LATENCY.observe(time.perf_counter() - start, endpoint, current.method)
+        HTTP_REQUESTS.inc(endpoint, current.method, str(response.status_code))
+        REQUEST_DB_QUERIES.observe(_request.queries, endpoint)
+        REQUEST_DB_TIME.observe(_request.db_time, endpoint)
+        return response
+
+    def metrics_endpoint():
+        token = current_app.config.get('METRICS_TOKEN')
+        if token:
+            authorization = request.headers.get('Authorization', '')
+            if not hmac.compare_digest(authorization.encode(), f'Bearer {token}'.encode()):
+                return Response('Unauthorized\n', status=401, mimetype='text/plain')
+        elif not _is_loopback(request.remote_addr):
+            return Response('Forbidden\n', status=403, mimetype='text/plain')
+        return Response(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+    app.add_url_rule('/metrics', 'metrics', metrics_endpoint)
+    app.extensions['metrics'] = registry
@@ -1,89 +1,305 @@
-from flask_sqlalchemy import SQLAlchemy
-from flask_login import UserMixin
-from datetime import datetime
-import json
-
-db = SQLAlchemy()
-
-class User(UserMixin, db.Model):
-    __tablename__ = 'users'
-    
-    id = db.Column(db.Integer, primary_key=True)
-    discord_id = db.Column(db.String(80), unique=True, nullable=False)
-    username = db.Column(db.String(80), nullable=False)
-    avatar = db.Column(db.String(200))
-    is_owner = db.Column(db.Boolean, default=False)
-    last_login = db.Column(db.DateTime, default=datetime.utcnow)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-
-class GuildConfig(db.Model):
-    __tablename__ = 'guild_configs'
-    
-    id = db.Column(db.Integer, primary_key=True)
-    guild_id = db.Column(db.String(80), unique=True, nullable=False)
-    guild_name = db.Column(db.String(100))
-    guild_icon = db.Column(db.String(200))
-    prefix = db.Column(db.String(10), default='!')
-    language = db.Column(db.String(10), default='fr')
-    log_channel_id = db.Column(db.String(80))
-    mod_log_channel_id = db.Column(db.String(80))
-    message_log_channel_id = db.Column(db.String(80))
-    voice_log_channel_id = db.Column(db.String(80))
-    member_log_channel_id = db.Column(db.String(80))
-    welcome_enabled = db.Column(db.Boolean, default=True)
-    welcome_channel_id = db.Column(db.String(80))
-    welcome_message = db.Column(db.Text, default='Bienvenue {member} sur {server} !')
-    welcome_dm_enabled = db.Column(db.Boolean, default=False)
-    welcome_dm_message = db.Column(db.Text, default='Bienvenue sur {server} !')
-    leave_enabled = db.Column(db.Boolean, default=True)
-    leave_channel_id = db.Column(db.String(80))
-    leave_message = db.Column(db.Text, default='{member} nous a quittés...')
-    auto_role_id = db.Column(db.String(80))
-    muted_role_id = db.Column(db.String(80))
-    auto_mod_enabled = db.Column(db.Boolean, default=True)
-    bad_words_enabled = db.Column(db.Boolean, default=True)
-    bad_words_action = db.Column(db.String(20), default='delete')
-    invites_enabled = db.Column(db.Boolean, default=True)
-    invites_action = db.Column(db.String(20), default='delete')
-    caps_enabled = db.Column(db.Boolean, default=True)
-    caps_percentage = db.Column(db.Integer, default=70)
-    caps_min_length = db.Column(db.Integer, default=10)
-    giveaway_channel_id = db.Column(db.String(80))
-    custom_commands = db.Column(db.Text, default='{}')
-    total_warns = db.Column(db.Integer, default=0)
-    total_kicks = db.Column(db.Integer, default=0)
-    total_bans = db.Column(db.Integer, default=0)
-    total_mutes = db.Column(db.Integer, default=0)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, onupdate=datetime.utcnow)
-
-class ModerationLog(db.Model):
-    __tablename__ = 'moderation_logs'
-    
-    id = db.Column(db.Integer, primary_key=True)
-    guild_id = db.Column(db.String(80), nullable=False)
-    action_type = db.Column(db.String(50), nullable=False)
-    user_id = db.Column(db.String(80), nullable=False)
-    user_name = db.Column(db.String(100))
-    moderator_id = db.Column(db.String(80), nullable=False)
-    moderator_name = db.Column(db.String(100))
-    reason = db.Column(db.Text)
-    duration = db.Column(db.String(20))
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-
-class Giveaway(db.Model):
-    __tablename__ = 'giveaways'
-    
-    id = db.Column(db.Integer, primary_key=True)
-    message_id = db.Column(db.String(80), unique=True)
-    guild_id = db.Column(db.String(80), nullable=False)
-    channel_id = db.Column(db.String(80), nullable=False)
-    prize = db.Column(db.String(200), nullable=False)
-    winners_count = db.Column(db.Integer, default=1)
-    entrants = db.Column(db.Integer, default=0)
-    host_id = db.Column(db.String(80), nullable=False)
-    host_name = db.Column(db.String(100))
-    end_time = db.Column(db.DateTime)
-    ended = db.Column(db.Boolean, default=False)
-    role_required = db.Column(db.String(80))
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+from flask_sqlalchemy import SQLAlchemy
+from flask_login import UserMixin
+from datetime import datetime
+from operator import attrgetter
+import json
+
+from .automod import parse_bad_words
+
+db = SQLAlchemy()
+
+class User(UserMixin, db.Model):
+    __tablename__ = 'users'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    discord_id = db.Column(db.String(80), unique=True, nullable=False)
+    username = db.Column(db.String(80), nullable=False)
+    avatar = db.Column(db.String(200))
+    is_owner = db.Column(db.Boolean, default=False)
+    last_login = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class GuildConfig(db.Model):
+    __tablename__ = 'guild_configs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    guild_id = db.Column(db.String(80), unique=True, nullable=False)
+    guild_name = db.Column(db.String(100))
+    guild_icon = db.Column(db.String(200))
+    prefix = db.Column(db.String(10), default='!')
+    language = db.Column(db.String(10), default='fr')
+    log_channel_id = db.Column(db.String(80))
+    mod_log_channel_id = db.Column(db.String(80))
+    message_log_channel_id = db.Column(db.String(80))
+    voice_log_channel_id = db.Column(db.String(80))
+    member_log_channel_id = db.Column(db.String(80))
+    welcome_enabled = db.Column(db.Boolean, default=True)
+    welcome_channel_id = db.Column(db.String(80))
+    welcome_message = db.Column(db.Text, default='Bienvenue {member} sur {server} !')
+    welcome_dm_enabled = db.Column(db.Boolean, default=False)
+    welcome_dm_message = db.Column(db.Text, default='Bienvenue sur {server} !')
+    leave_enabled = db.Column(db.Boolean, default=True)
+    leave_channel_id = db.Column(db.String(80))
+    leave_message = db.Column(db.Text, default='{member} nous a quittés...')
+    auto_role_id = db.Column(db.String(80))
+    muted_role_id = db.Column(db.String(80))
+    auto_mod_enabled = db.Column(db.Boolean, default=True)
+    bad_words_enabled = db.Column(db.Boolean, default=True)
+    bad_words_action = db.Column(db.String(20), default='delete')
+    bad_words = db.Column(db.Text, default='[]')  # JSON : liste de mots interdits
+    invites_enabled = db.Column(db.Boolean, default=True)
+    invites_action = db.Column(db.String(20), default='delete')
+    caps_enabled = db.Column(db.Boolean, default=True)
+    caps_percentage = db.Column(db.Integer, default=70)
+    caps_min_length = db.Column(db.Integer, default=10)
+    giveaway_channel_id = db.Column(db.String(80))
+    # Ancien stockage JSON des commandes, migré vers custom_commands (init-db)
+    custom_commands = db.Column(db.Text, default='{}')
+    total_warns = db.Column(db.Integer, default=0)
+    total_kicks = db.Column(db.Integer, default=0)
+    total_bans = db.Column(db.Integer, default=0)
+    total_mutes = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, onupdate=datetime.utcnow)
+
+    def to_dict(self, commands=None):
+        """Config complète envoyée au bot (bad_words décodé).
+
+        custom_commands ({trigger: réponse}) est lu dans la table
+        custom_commands, sauf si `commands` est fourni (export par lots).
+        """
+        values = dict(zip(CONFIG_FIELDS, _read_config_fields(self)))
+        values['bad_words'] = parse_bad_words(self.bad_words)
+        if commands is None:
+            commands = dict(db.session.query(CustomCommand.trigger, CustomCommand.response)
+                            .filter_by(guild_id=self.guild_id).order_by(CustomCommand.trigger))
+        values['custom_commands'] = commands
+        return values
+
+    def to_compact_dict(self, commands=None):
+        return compact_config(self.to_dict(commands))
+
+# Schéma de sérialisation, calculé une fois depuis les colonnes
+CONFIG_FIELDS = tuple(
+    column.name for column in GuildConfig.__table__.columns
+    if column.name not in ('id', 'created_at', 'updated_at')
+)
+_read_config_fields = attrgetter(*CONFIG_FIELDS)
+
+
+def _column_default(column):
+    default = column.default
+    if default is None or not default.is_scalar:
+        return None
+    if column.name in ('bad_words', 'custom_commands'):
+        return json.loads(default.arg)
+    return default.arg
+
+
+# Valeurs par défaut de chaque champ, omises dans le format compact
+CONFIG_DEFAULTS = {name: _column_default(GuildConfig.__table__.c[name]) for name in CONFIG_FIELDS}
+
+
+def compact_config(values):
+    """Uniquement les champs différents des valeurs par défaut (et guild_id)"""
+    return {
+        key: value for key, value in values.items()
+        if key == 'guild_id' or value != CONFIG_DEFAULTS[key]
+    }
+
+class ConfigChange(db.Model):
+    """Journal des modifications de configs : l'id sert de version, croissante"""
+    __tablename__ = 'config_changes'
+    __table_args__ = (
+        db.Index('ix_config_changes_changed_at', 'changed_at'),
+        # Pas de réutilisation d'id après la purge des anciennes entrées
+        {'sqlite_autoincrement': True},
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    guild_id = db.Column(db.String(80), nullable=False)
+    changed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class CustomCommand(db.Model):
+    """Commande personnalisée d'un serveur : préfixe + trigger -> réponse"""
+    __tablename__ = 'custom_commands'
+    __table_args__ = (
+        db.UniqueConstraint('guild_id', 'trigger', name='uq_custom_commands_guild_trigger'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    guild_id = db.Column(db.String(80), nullable=False)
+    trigger = db.Column(db.String(100), nullable=False)
+    response = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'trigger': self.trigger,
+            'response': self.response,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+class ModerationLog(db.Model):
+    __tablename__ = 'moderation_logs'
+    __table_args__ = (
+        # Toutes les pages sont lues par serveur, triées par date décroissante
+        db.Index('ix_moderation_logs_guild_created', 'guild_id', 'created_at'),
+        db.Index('ix_moderation_logs_guild_user', 'guild_id', 'user_id', 'created_at'),
+        db.Index('ix_moderation_logs_guild_action', 'guild_id', 'action_type', 'created_at'),
+        db.Index('ix_moderation_logs_guild_moderator', 'guild_id', 'moderator_id', 'created_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    guild_id = db.Column(db.String(80), nullable=False)
+    action_type = db.Column(db.String(50), nullable=False)
+    user_id = db.Column(db.String(80), nullable=False)
+    user_name = db.Column(db.String(100))
+    moderator_id = db.Column(db.String(80), nullable=False)
+    moderator_name = db.Column(db.String(100))
+    reason = db.Column(db.Text)
+    duration = db.Column(db.String(20))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'guild_id': self.guild_id,
+            'action_type': self.action_type,
+            'user_id': self.user_id,
+            'user_name': self.user_name,
+            'moderator_id': self.moderator_id,
+            'moderator_name': self.moderator_name,
+            'reason': self.reason,
+            'duration': self.duration,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+class ModerationStat(db.Model):
+    """Nombre d'actions de modération par serveur, type et tranche horaire/journalière"""
+    __tablename__ = 'moderation_stats'
+    __table_args__ = (
+        db.UniqueConstraint('guild_id', 'granularity', 'bucket', 'action_type',
+                            name='uq_moderation_stats_bucket'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    guild_id = db.Column(db.String(80), nullable=False)
+    granularity = db.Column(db.String(10), nullable=False)  # 'hour' ou 'day'
+    bucket = db.Column(db.DateTime, nullable=False)
+    action_type = db.Column(db.String(50), nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+class RollupState(db.Model):
+    """Dernier id de log déjà agrégé (high-water mark) par job d'agrégation"""
+    __tablename__ = 'rollup_state'
+
+    name = db.Column(db.String(50), primary_key=True)
+    last_id = db.Column(db.Integer, nullable=False, default=0)
+    # Plus grand id vu au passage précédent, agrégé une fois pending_at assez ancien
+    pending_id = db.Column(db.Integer, nullable=False, default=0)
+    pending_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class Giveaway(db.Model):
+    __tablename__ = 'giveaways'
+    __table_args__ = (
+        # Chargement des giveaways en cours par le planificateur
+        db.Index('ix_giveaways_ended_end_time', 'ended', 'end_time'),
+        # Giveaways modifiés depuis la dernière synchronisation du planificateur
+        db.Index('ix_giveaways_updated_at', 'updated_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    message_id = db.Column(db.String(80), unique=True)
+    guild_id = db.Column(db.String(80), nullable=False)
+    channel_id = db.Column(db.String(80), nullable=False)
+    prize = db.Column(db.String(200), nullable=False)
+    winners_count = db.Column(db.Integer, default=1)
+    entrants = db.Column(db.Integer, default=0)
+    host_id = db.Column(db.String(80), nullable=False)
+    host_name = db.Column(db.String(100))
+    end_time = db.Column(db.DateTime)
+    ended = db.Column(db.Boolean, default=False)
+    role_required = db.Column(db.String(80))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class GiveawayEntrant(db.Model):
+    """Participation d'un membre à un giveaway"""
+    __tablename__ = 'giveaway_entrants'
+    __table_args__ = (
+        db.UniqueConstraint('giveaway_id', 'user_id', name='uq_giveaway_entrants_giveaway_user'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    giveaway_id = db.Column(db.Integer, db.ForeignKey('giveaways.id', ondelete='CASCADE'), nullable=False)
+    user_id = db.Column(db.String(80), nullable=False)
+    # Nombre de chances (bonus de rôle, boost...) ; 1 par défaut
+    weight = db.Column(db.Integer, nullable=False, default=1)
+    entered_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class GiveawayDraw(db.Model):
+    """Tirage (ou relance) d'un giveaway, conservé pour l'audit"""
+    __tablename__ = 'giveaway_draws'
+    __table_args__ = (
+        db.UniqueConstraint('giveaway_id', 'round', name='uq_giveaway_draws_giveaway_round'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    giveaway_id = db.Column(db.Integer, db.ForeignKey('giveaways.id', ondelete='CASCADE'), nullable=False)
+    # 0 pour le tirage initial, puis 1, 2... pour les relances
+    round = db.Column(db.Integer, nullable=False, default=0)
+    seed = db.Column(db.String(64), nullable=False)
+    winners = db.Column(db.Text, nullable=False)  # JSON
+    excluded = db.Column(db.Integer, nullable=False, default=0)
+    entrants = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'round': self.round,
+            'seed': self.seed,
+            'winners': json.loads(self.winners),
+            'excluded': self.excluded,
+            'entrants': self.entrants,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+class BotLog(db.Model):
+    """Logs envoyés par le bot (commandes, erreurs, événements des serveurs)"""
+    __tablename__ = 'bot_logs'
+    __table_args__ = (
+        db.Index('ix_bot_logs_created', 'created_at'),
+        db.Index('ix_bot_logs_guild_created', 'guild_id', 'created_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    guild_id = db.Column(db.String(80))
+    level = db.Column(db.String(10), nullable=False, default='info')
+    category = db.Column(db.String(50))
+    message = db.Column(db.Text, nullable=False)
+    data = db.Column(db.Text)  # JSON
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'guild_id': self.guild_id,
+            'level': self.level,
+            'category': self.category,
+            'message': self.message,
+            'data': json.loads(self.data) if self.data else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+class IngestedEvent(db.Model):
+    """Clés d'idempotence des événements déjà reçus du bot (dédoublonnage)"""
+    __tablename__ = 'ingested_events'
+    __table_args__ = (
+        db.Index('ix_ingested_events_received', 'received_at'),
+    )
+
+    key = db.Column(db.String(120), primary_key=True)
+    received_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
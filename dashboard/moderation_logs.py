@@ -0,0 +1,54 @@
+import base64
+from datetime import datetime
+
+from .timestamps import parse_timestamp
+from .models import ModerationLog
+
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(log):
+    """Curseur opaque pointant après `log` (date de création + id)"""
+    raw = f"{log.created_at.isoformat()}|{log.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    created_at, log_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+    return datetime.fromisoformat(created_at), int(log_id)
+
+
+def moderation_page(guild_id, cursor=None, limit=50, action_type=None,
+                    moderator_id=None, user_id=None, since=None, until=None):
+    """Une page d'actions de modération, de la plus récente à la plus ancienne.
+
+    Pagination par curseur (keyset) : la page suivante reprend après le
+    dernier (created_at, id) vu, sans OFFSET. Le coût reste le même sur la
+    première page et sur la millième, grâce aux index (guild_id, ..., created_at).
+    Retourne (logs, next_cursor) ; next_cursor vaut None sur la dernière page.
+    """
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    query = ModerationLog.query.filter(ModerationLog.guild_id == guild_id)
+
+    if action_type:
+        query = query.filter(ModerationLog.action_type == action_type)
+    if moderator_id:
+        query = query.filter(ModerationLog.moderator_id == moderator_id)
+    if user_id:
+        query = query.filter(ModerationLog.user_id == user_id)
+    if since:
+        query = query.filter(ModerationLog.created_at >= parse_timestamp(since))
+    if until:
+        query = query.filter(ModerationLog.created_at < parse_timestamp(until))
+
+    if cursor:
+        created_at, log_id = decode_cursor(cursor)
+        # Forme « range + filtre » que SQLite sait résoudre avec l'index
+        query = query.filter(
+            ModerationLog.created_at <= created_at,
+            (ModerationLog.created_at < created_at) | (ModerationLog.id < log_id)
+        )
+
+    logs = query.order_by(ModerationLog.created_at.desc(), ModerationLog.id.desc()).limit(limit + 1).all()
+    next_cursor = encode_cursor(logs[limit - 1]) if len(logs) > limit else None
+    return logs[:limit], next_cursor
@@ -0,0 +1,195 @@
+import os
+from collections import Counter
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, update
+from sqlalchemy.exc import IntegrityError
+
+from .timestamps import parse_timestamp
+from .database import dialect_insert, retry_on_locked
+from .models import db, ModerationLog, ModerationStat, RollupState
+
+ROLLUP_NAME = 'moderation_stats'
+GRANULARITIES = {
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1),
+}
+# Nombre maximal de tranches renvoyées par l'API
+MAX_BUCKETS = {'hour': 24 * 31, 'day': 366}
+# Délai avant d'agréger un id : une transaction plus ancienne qui aurait
+# obtenu un id plus petit (commit dans le désordre sous Postgres) a eu le
+# temps d'être validée. Doit dépasser la durée d'une écriture de logs.
+ROLLUP_LAG = timedelta(seconds=float(os.getenv('ROLLUP_LAG_SECONDS', 30)))
+# Intervalle de la commande update-rollups --loop
+ROLLUP_INTERVAL = float(os.getenv('ROLLUP_INTERVAL', 30))
+
+
+def floor_bucket(timestamp, granularity):
+    if granularity == 'hour':
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _count_logs(rows):
+    counts = Counter()
+    for guild_id, action_type, created_at in rows:
+        for granularity in GRANULARITIES:
+            counts[(guild_id, granularity, floor_bucket(created_at, granularity), action_type)] += 1
+    return counts
+
+
+def _upsert_counts(counts):
+    """Ajoute les comptes aux tranches existantes (INSERT ... ON CONFLICT)"""
+    if not counts:
+        return
+    stmt = dialect_insert(ModerationStat.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['guild_id', 'granularity', 'bucket', 'action_type'],
+        set_={'count': ModerationStat.__table__.c.count + stmt.excluded.count}
+    )
+    db.session.execute(stmt, [
+        {'guild_id': guild_id, 'granularity': granularity, 'bucket': bucket,
+         'action_type': action_type, 'count': count}
+        for (guild_id, granularity, bucket, action_type), count in counts.items()
+    ])
+
+
+def _rollup_state():
+    state = db.session.get(RollupState, ROLLUP_NAME)
+    if state is None:
+        try:
+            db.session.add(RollupState(name=ROLLUP_NAME, last_id=0))
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+        state = db.session.get(RollupState, ROLLUP_NAME)
+    return state
+
+
+@retry_on_locked
+def update_rollups(batch_size=10000, lag=ROLLUP_LAG, now=None):
+    """Agrège les logs ajoutés depuis le dernier passage.
+
+    Le watermark avance en deux temps : chaque passage note le plus grand
+    id visible (pending_id) et n'agrège que jusqu'à celui noté il y a au
+    moins `lag`. Un log validé après un id plus grand, mais dans ce délai,
+    est donc encore compté. Chaque lot est appliqué dans la même
+    transaction que l'avancée de last_id, avec une condition sur
+    l'ancienne valeur : si un autre processus a agrégé ce lot entre-temps,
+    la transaction est annulée et rien n'est compté deux fois. Retourne le
+    nombre de logs agrégés.
+    """
+    now = now or datetime.utcnow()
+    total = 0
+    while True:
+        state = _rollup_state()
+        last_id = state.last_id
+        if lag <= timedelta(0):
+            bound = db.session.query(func.max(ModerationLog.id)).scalar() or 0
+        elif state.pending_at is not None and state.pending_at <= now - lag:
+            bound = state.pending_id
+        else:
+            bound = last_id
+        rows = db.session.query(
+            ModerationLog.id, ModerationLog.guild_id, ModerationLog.action_type, ModerationLog.created_at
+        ).filter(ModerationLog.id > last_id, ModerationLog.id <= bound).order_by(ModerationLog.id).limit(batch_size).all()
+        if not rows:
+            # Borne atteinte (ou pas encore utilisable) : en noter une nouvelle
+            if state.pending_at is None or bound == state.pending_id or lag <= timedelta(0):
+                db.session.execute(
+                    update(RollupState)
+                    .where(RollupState.name == ROLLUP_NAME, RollupState.last_id == last_id)
+                    .values(pending_id=db.session.query(func.max(ModerationLog.id)).scalar() or 0,
+                            pending_at=now)
+                )
+            db.session.commit()
+            return total
+
+        _upsert_counts(_count_logs((guild_id, action_type, created_at)
+                                   for _, guild_id, action_type, created_at in rows))
+        moved = db.session.execute(
+            update(RollupState)
+            .where(RollupState.name == ROLLUP_NAME, RollupState.last_id == last_id)
+            .values(last_id=rows[-1][0], updated_at=datetime.utcnow())
+        ).rowcount
+        if not moved:
+            db.session.rollback()
+            continue
+        db.session.commit()
+        total += len(rows)
+
+
+def moderation_timeseries(guild_id, granularity='day', since=None, until=None, action_type=None):
+    """Série temporelle des actions d'un serveur, prête pour createChart.
+
+    Ne lit que la table d'agrégats, tenue à jour par la commande
+    update-rollups : le coût dépend du nombre de tranches, pas du nombre
+    de logs. Les tranches vides valent 0.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError('granularity doit valoir hour ou day')
+    step = GRANULARITIES[granularity]
+
+    end = floor_bucket(parse_timestamp(until) if until else datetime.utcnow(), granularity) + step
+    start = floor_bucket(parse_timestamp(since), granularity) if since else end - step * 30
+    if (end - start) / step > MAX_BUCKETS[granularity]:
+        start = end - step * MAX_BUCKETS[granularity]
+
+    query = ModerationStat.query.filter(
+        ModerationStat.guild_id == guild_id,
+        ModerationStat.granularity == granularity,
+        ModerationStat.bucket >= start,
+        ModerationStat.bucket < end
+    )
+    if action_type:
+        query = query.filter(ModerationStat.action_type == action_type)
+
+    buckets = []
+    current = start
+    while current < end:
+        buckets.append(current)
+        current += step
+    index = {bucket: i for i, bucket in enumerate(buckets)}
+
+    datasets = {}
+    for stat in query:
+        series = datasets.setdefault(stat.action_type, [0] * len(buckets))
+        series[index[stat.bucket]] = stat.count
+
+    return {
+        'granularity': granularity,
+        'labels': [bucket.isoformat() for bucket in buckets],
+        'datasets': datasets
+    }
+
+
+def check_rollups(rebuild=False):
+    """Recalcule les agrégats depuis les logs bruts et les compare à la table.
+
+    Retourne le nombre de tranches différentes ; avec rebuild=True, la
+    table est reconstruite entièrement à partir des logs.
+    """
+    last_id = _rollup_state().last_id
+    if rebuild:
+        last_id = db.session.query(func.max(ModerationLog.id)).scalar() or 0
+
+    expected = _count_logs(
+        db.session.query(ModerationLog.guild_id, ModerationLog.action_type, ModerationLog.created_at)
+        .filter(ModerationLog.id <= last_id)
+        .yield_per(10000)
+    )
+    actual = Counter({
+        (stat.guild_id, stat.granularity, stat.bucket, stat.action_type): stat.count
+        for stat in ModerationStat.query.yield_per(10000)
+    })
+    mismatches = sum(1 for key in set(expected) | set(actual) if expected[key] != actual[key])
+
+    if rebuild:
+        db.session.execute(delete(ModerationStat))
+        _upsert_counts(expected)
+        db.session.execute(
+            update(RollupState).where(RollupState.name == ROLLUP_NAME)
+            .values(last_id=last_id, updated_at=datetime.utcnow())
+        )
+        db.session.commit()
+    return mismatches
@@ -0,0 +1,208 @@
+import cProfile
+import io
+import json
+import pstats
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+
+from flask import current_app, request
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Profilage à la demande : ?_profile=1 ou en-tête X-Profile: 1 (propriétaire uniquement)
+PROFILE_QUERY_ARG = '_profile'
+PROFILE_HEADER = 'X-Profile'
+
+_active = threading.local()
+_sql_hooks_installed = False
+
+_IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_SPACES = re.compile(r'\s+')
+
+
+def statement_shape(statement):
+    """Forme d'une requête SQL : littéraux et listes IN remplacés par ?"""
+    shape = _LITERALS.sub('?', statement)
+    shape = _IN_LIST.sub('(?, ...)', shape)
+    return _SPACES.sub(' ', shape).strip()
+
+
+def find_n_plus_one(queries, threshold):
+    """Formes répétées plus de `threshold` fois : [(forme, nombre, durée totale ms)]"""
+    counts = Counter()
+    durations = Counter()
+    for query in queries:
+        shape = statement_shape(query['statement'])
+        counts[shape] += 1
+        durations[shape] += query['ms']
+    return [
+        {'shape': shape, 'count': count, 'ms': round(durations[shape], 3)}
+        for shape, count in counts.most_common() if count > threshold
+    ]
+
+
+class ProfileBuffer:
+    """Derniers profils capturés (anneau de `maxsize` entrées).
+
+    Avec `sqlite_path` (le fichier des sessions), le tampon est partagé par
+    tous les workers : /logs montre les profils quel que soit le processus
+    qui a servi la requête profilée.
+    """
+
+    def __init__(self, maxsize=50, sqlite_path=None, table='profiles'):
+        self.maxsize = maxsize
+        self.table = table
+        self._entries = deque(maxlen=maxsize)
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self._db = None
+        if sqlite_path:
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False, isolation_level=None)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute(
+                f'CREATE TABLE IF NOT EXISTS {table} '
+                '(id INTEGER PRIMARY KEY AUTOINCREMENT, created_at REAL NOT NULL, report TEXT NOT NULL)'
+            )
+
+    def add(self, report):
+        """Enregistre un profil et retourne son id"""
+        with self._lock:
+            if self._db is None:
+                report['id'] = self._next_id
+                self._next_id += 1
+                self._entries.append(report)
+                return report['id']
+            cursor = self._db.execute(
+                f'INSERT INTO {self.table} (created_at, report) VALUES (?, ?)',
+                (report['created_at'], json.dumps(report))
+            )
+            report['id'] = cursor.lastrowid
+            self._db.execute(f'DELETE FROM {self.table} WHERE id <= ?', (report['id'] - self.maxsize,))
+            return report['id']
+
+    def recent(self):
+        """Profils du plus récent au plus ancien"""
+        with self._lock:
+            if self._db is None:
+                return list(reversed(self._entries))
+            rows = self._db.execute(f'SELECT id, report FROM {self.table} ORDER BY id DESC').fetchall()
+        return [dict(json.loads(report), id=profile_id) for profile_id, report in rows]
+
+    def get(self, profile_id):
+        with self._lock:
+            if self._db is None:
+                return next((report for report in self._entries if report['id'] == profile_id), None)
+            row = self._db.execute(f'SELECT report FROM {self.table} WHERE id = ?', (profile_id,)).fetchone()
+        return dict(json.loads(row[0]), id=profile_id) if row else None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if getattr(_active, 'queries', None) is not None:
+        conn.info.setdefault('profile_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    queries = getattr(_active, 'queries', None)
+    starts = conn.info.get('profile_start')
+    if queries is None or not starts:
+        return
+    queries.append({
+        'statement': statement,
+        'ms': round((time.perf_counter() - starts.pop()) * 1000, 3),
+        'rows': len(parameters) if executemany else 1
+    })
+
+
+def _handle_error(exception_context):
+    starts = exception_context.connection.info.get('profile_start') if exception_context.connection else None
+    if starts:
+        starts.pop()
+
+
+def install_sql_hooks():
+    """Capture des requêtes SQL du thread en cours de profilage (tous les moteurs)"""
+    global _sql_hooks_installed
+    if _sql_hooks_installed:
+        return
+    event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    event.listen(Engine, 'handle_error', _handle_error)
+    _sql_hooks_installed = True
+
+
+def profiling_requested():
+    current = request._get_current_object()
+    if current.args.get(PROFILE_QUERY_ARG) != '1' and current.headers.get(PROFILE_HEADER) != '1':
+        return False
+    return current_user.is_authenticated and current_user.is_owner
+
+
+def _top_functions(profile, limit):
+    output = io.StringIO()
+    stats = pstats.Stats(profile, stream=output)
+    stats.sort_stats('cumulative').print_stats(limit)
+    return output.getvalue()
+
+
+def init_profiler(app):
+    """Profilage cProfile + SQL d'une requête, sur demande du propriétaire.
+
+    Le rapport (fonctions les plus coûteuses, requêtes SQL avec leur durée,
+    motifs N+1) est consultable depuis /logs ; son id est renvoyé dans
+    l'en-tête X-Profile-Id.
+    """
+    app.extensions['profiles'] = ProfileBuffer(
+        maxsize=app.config['PROFILE_BUFFER_SIZE'],
+        sqlite_path=app.config['SESSION_DB_PATH']
+    )
+    install_sql_hooks()
+
+    @app.before_request
+    def _start_profile():
+        if not profiling_requested():
+            return
+        _active.queries = []
+        _active.start = time.perf_counter()
+        _active.profile = cProfile.Profile()
+        _active.profile.enable()
+
+    @app.after_request
+    def _store_profile(response):
+        profile = getattr(_active, 'profile', None)
+        if profile is None:
+            return response
+        profile.disable()
+        elapsed = time.perf_counter() - _active.start
+        queries = _active.queries
+        _active.profile = _active.queries = None
+
+        config = current_app.config
+        report = {
+            'created_at': time.time(),
+            'date': datetime.now().strftime('%d/%m/%Y %H:%M:%S'),
+            'method': request.method,
+            'path': request.full_path.rstrip('?'),
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'ms': round(elapsed * 1000, 3),
+            'sql_ms': round(sum(query['ms'] for query in queries), 3),
+            'queries': queries,
+            'n_plus_one': find_n_plus_one(queries, config['PROFILE_N_PLUS_ONE_THRESHOLD']),
+            'functions': _top_functions(profile, config['PROFILE_TOP_FUNCTIONS'])
+        }
+        response.headers['X-Profile-Id'] = str(app.extensions['profiles'].add(report))
+        return response
+
+    @app.teardown_request
+    def _discard_profile(exc):
+        # Requête interrompue avant after_request : ne pas laisser le profileur actif
+        profile = getattr(_active, 'profile', None)
+        if profile is not None:
+            profile.disable()
+            _active.profile = _active.queries = None
@@ -0,0 +1,119 @@
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+
+class RateLimited(Exception):
+    """Attente trop longue avant de pouvoir appeler le service"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"limite de débit atteinte, réessayer dans {retry_after:.1f} s")
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Seau à jetons partagé par tous les threads du processus.
+
+    `rate` jetons par seconde, au plus `capacity` d'avance. `pause(seconds)`
+    vide le seau jusqu'à une date donnée (réponse 429, ou plus de requêtes
+    restantes d'après les en-têtes du service).
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = self.capacity
+        self.updated_at = clock()
+        self.paused_until = 0.0
+        self.waited = 0.0
+        self.pauses = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _state(self):
+        """Accès exclusif à tokens / updated_at / paused_until"""
+        with self._lock:
+            yield
+
+    def _reserve(self):
+        """Prend un jeton ; retourne le délai à attendre avant de l'utiliser"""
+        with self._state():
+            now = self.clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            self.tokens -= 1
+            delay = max(0.0, -self.tokens / self.rate, self.paused_until - now)
+            return delay
+
+    def acquire(self, timeout=None):
+        """Attend un jeton (lève RateLimited si l'attente dépasse `timeout`)"""
+        delay = self._reserve()
+        if timeout is not None and delay > timeout:
+            with self._state():
+                self.tokens += 1
+            raise RateLimited(delay)
+        if delay > 0:
+            self.waited += delay
+            self.sleep(delay)
+
+    def pause(self, seconds):
+        with self._state():
+            until = self.clock() + seconds
+            if until > self.paused_until:
+                self.paused_until = until
+                self.pauses += 1
+
+    def status(self):
+        with self._state():
+            return {
+                'rate': self.rate,
+                'tokens': round(self.tokens, 2),
+                'paused_for': round(max(0.0, self.paused_until - self.clock()), 3),
+                'pauses': self.pauses,
+                'waited': round(self.waited, 3)
+            }
+
+
+class SharedTokenBucket(TokenBucket):
+    """Seau à jetons partagé par tous les processus via un fichier SQLite.
+
+    Même comportement que TokenBucket, mais l'état (jetons, date de mise à
+    jour, fin de pause) est une ligne de la table `table`, lue et écrite
+    dans une transaction à chaque opération : N workers gunicorn se
+    partagent `rate` jetons par seconde au lieu d'en avoir chacun autant.
+    """
+
+    def __init__(self, rate, sqlite_path, name, capacity=None, table='rate_limits', sleep=time.sleep):
+        super().__init__(rate, capacity, clock=time.time, sleep=sleep)
+        self.sqlite_path = sqlite_path
+        self.name = name
+        self.table = table
+        self._db = sqlite3.connect(sqlite_path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            f'CREATE TABLE IF NOT EXISTS {table} '
+            '(name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL, paused_until REAL NOT NULL)'
+        )
+        self._db.execute(f'INSERT OR IGNORE INTO {table} VALUES (?, ?, ?, 0)',
+                         (name, self.capacity, self.clock()))
+
+    @contextmanager
+    def _state(self):
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                self.tokens, self.updated_at, self.paused_until = self._db.execute(
+                    f'SELECT tokens, updated_at, paused_until FROM {self.table} WHERE name = ?', (self.name,)
+                ).fetchone()
+                yield
+                self._db.execute(
+                    f'UPDATE {self.table} SET tokens = ?, updated_at = ?, paused_until = ? WHERE name = ?',
+                    (self.tokens, self.updated_at, self.paused_until, self.name)
+                )
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                raise
+            self._db.execute('COMMIT')
@@ -0,0 +1,340 @@
+import logging
+import secrets
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+
+from flask.sessions import SessionInterface, SessionMixin, session_json_serializer
+from werkzeug.datastructures import CallbackDict
+
+logger = logging.getLogger(__name__)
+
+# Intervalle entre deux purges des sessions expirées (secondes, par worker)
+SESSION_PURGE_INTERVAL = 3600
+
+
+class LRUStore:
+    """Stockage clé -> valeur en mémoire (LRU), avec persistance SQLite optionnelle.
+
+    Sans `sqlite_path`, tout reste dans le processus. Avec, SQLite fait foi
+    (partagé entre les workers gunicorn) et la mémoire ne garde que les
+    valeurs déjà décodées, revalidées par leur date de mise à jour.
+    """
+
+    def __init__(self, maxsize=10000, sqlite_path=None, table='kv'):
+        self.maxsize = maxsize
+        self.table = table
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if sqlite_path:
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False, isolation_level=None)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute(
+                f'CREATE TABLE IF NOT EXISTS {table} '
+                '(key TEXT PRIMARY KEY, value TEXT NOT NULL, updated_at REAL NOT NULL)'
+            )
+            # count(since) et purge(before) sans parcourir toute la table
+            self._db.execute(f'CREATE INDEX IF NOT EXISTS ix_{table}_updated_at ON {table} (updated_at)')
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if self._db is None:
+                if entry is None:
+                    return None
+                self._entries.move_to_end(key)
+                return entry[0]
+
+            row = self._db.execute(
+                f'SELECT value, updated_at FROM {self.table} WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                self._entries.pop(key, None)
+                return None
+            if entry is not None and entry[1] == row[1]:
+                self._entries.move_to_end(key)
+                return entry[0]
+            value = session_json_serializer.loads(row[0])
+            self._remember(key, value, row[1])
+            return value
+
+    def set(self, key, value):
+        updated_at = time.time()
+        with self._lock:
+            if self._db is not None:
+                self._db.execute(
+                    f'INSERT OR REPLACE INTO {self.table} (key, value, updated_at) VALUES (?, ?, ?)',
+                    (key, session_json_serializer.dumps(value), updated_at)
+                )
+            self._remember(key, value, updated_at)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+            if self._db is not None:
+                self._db.execute(f'DELETE FROM {self.table} WHERE key = ?', (key,))
+
+    def purge(self, before):
+        """Supprime les entrées mises à jour avant `before` ; retourne leur nombre"""
+        with self._lock:
+            for key in [key for key, (_, updated_at) in self._entries.items() if updated_at < before]:
+                del self._entries[key]
+            if self._db is None:
+                return 0
+            return self._db.execute(f'DELETE FROM {self.table} WHERE updated_at < ?', (before,)).rowcount
+
+    def _remember(self, key, value, updated_at):
+        self._entries[key] = (value, updated_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def count(self, since=0.0):
+        """Nombre d'entrées mises à jour depuis `since` (timestamp)"""
+        with self._lock:
+            if self._db is not None:
+                return self._db.execute(
+                    f'SELECT COUNT(*) FROM {self.table} WHERE updated_at >= ?', (since,)
+                ).fetchone()[0]
+            return sum(1 for _, updated_at in self._entries.values() if updated_at >= since)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    """Session dont les données restent côté serveur"""
+
+    def __init__(self, initial=None, sid=None, new=False):
+        def on_update(self):
+            self.modified = True
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """Sessions Flask stockées dans un LRUStore : le cookie ne porte que l'id.
+
+    Les sessions expirées sont refusées à la lecture, et supprimées du
+    magasin au plus toutes les `purge_interval` secondes lors d'une écriture.
+    """
+
+    def __init__(self, store, purge_interval=SESSION_PURGE_INTERVAL):
+        self.store = store
+        self.purge_interval = purge_interval
+        self._next_purge = time.monotonic() + purge_interval
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            record = self.store.get(sid)
+            if record is not None and record['expires'] > time.time():
+                return ServerSideSession(record['data'], sid=sid)
+        return ServerSideSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def regenerate(self, session):
+        """Nouvel id pour la session, à la connexion (fixation de session).
+
+        Les données sont gardées ; l'ancien id est supprimé du magasin.
+        """
+        if not session.new:
+            self.store.delete(session.sid)
+        session.sid = secrets.token_urlsafe(32)
+        session.modified = True
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session:
+            if session.modified and not session.new:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        if not self.should_set_cookie(app, session):
+            return
+
+        lifetime = app.permanent_session_lifetime.total_seconds()
+        self.store.set(session.sid, {'data': dict(session), 'expires': time.time() + lifetime})
+        if time.monotonic() >= self._next_purge:
+            self._next_purge = time.monotonic() + self.purge_interval
+            # Une session expire à updated_at + durée de vie
+            purged = self.store.purge(time.time() - lifetime)
+            if purged:
+                logger.info("%d sessions expirées supprimées", purged)
+        response.set_cookie(
+            name,
+            session.sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app)
+        )
+
+
+# Délai avant de retenter un rafraîchissement échoué, doublé à chaque échec (borné par ttl)
+REFRESH_RETRY_DELAY = 10
+
+# Borne haute d'une recherche par préfixe (plus grand point de code)
+_PREFIX_END = '\U0010ffff'
+
+
+def guild_sort_key(guild):
+    return (guild.get('name') or '').casefold()
+
+
+class GuildStore:
+    """Serveurs Discord de chaque utilisateur, indexés par id de serveur.
+
+    La liste est rafraîchie avec le token d'accès enregistré quand elle a
+    plus de `ttl` secondes ; en cas d'échec l'ancienne liste est conservée
+    et le prochain essai attend REFRESH_RETRY_DELAY secondes, puis deux fois
+    plus à chaque échec (au plus `ttl`), pour tous les workers.
+    Si le token a expiré (ou est refusé avec un 401), il est d'abord
+    renouvelé avec le refresh token via `refresh(refresh_token)`.
+
+    À chaque rafraîchissement, l'index de l'utilisateur est recalculé une
+    fois : ordre alphabétique (recherche par préfixe et pagination sans
+    parcourir la liste) et agrégats (serveurs, membres, serveurs ayant une
+    config). `configured(guild_ids)` retourne ceux qui ont une config ; il
+    n'est appelé que pour les serveurs qui n'en avaient pas encore.
+    """
+
+    def __init__(self, store, fetch, ttl=300, refresh=None, configured=None):
+        self.store = store
+        self.fetch = fetch
+        self.refresh = refresh
+        self.configured = configured
+        self.ttl = ttl
+
+    def put(self, user_id, guilds, access_token, refresh_token=None, expires_at=None):
+        previous = self.store.get(str(user_id))
+        entry = self._index(guilds, previous['guilds'] if previous else {})
+        entry.update({
+            'access_token': access_token,
+            'refresh_token': refresh_token,
+            'expires_at': expires_at,
+            'fetched_at': time.time()
+        })
+        self.store.set(str(user_id), entry)
+
+    def _index(self, guilds, previous):
+        by_id = {guild['id']: guild for guild in guilds}
+        unknown = [guild_id for guild_id in by_id if not previous.get(guild_id, {}).get('configured')]
+        configured = set()
+        if self.configured is not None and unknown:
+            try:
+                configured = set(self.configured(unknown))
+            except Exception:
+                logger.exception("Erreur lecture des configs des serveurs")
+        for guild_id, guild in by_id.items():
+            guild['configured'] = guild_id in configured or bool(previous.get(guild_id, {}).get('configured'))
+
+        order = sorted(by_id, key=lambda guild_id: (guild_sort_key(by_id[guild_id]), guild_id))
+        return {
+            'guilds': by_id,
+            'order': order,
+            'names': [guild_sort_key(by_id[guild_id]) for guild_id in order],
+            'stats': {
+                'servers': len(by_id),
+                'members': sum(guild.get('approximate_member_count') or 0 for guild in by_id.values()),
+                'configured': sum(1 for guild in by_id.values() if guild['configured'])
+            }
+        }
+
+    def _entry(self, user_id):
+        entry = self.store.get(str(user_id))
+        if entry is None:
+            return None
+        now = time.time()
+        if now - entry['fetched_at'] >= self.ttl and entry.get('retry_at', 0) <= now:
+            try:
+                tokens, guilds = self._fetch(entry)
+            except Exception as e:
+                failures = entry.get('failures', 0) + 1
+                delay = min(self.ttl, REFRESH_RETRY_DELAY * 2 ** (failures - 1))
+                logger.warning("Erreur rafraîchissement serveurs de %s (%d échecs, nouvel essai dans %.0f s): %s",
+                               user_id, failures, delay, e)
+                entry = dict(entry, failures=failures, retry_at=now + delay)
+                self.store.set(str(user_id), entry)
+            else:
+                self.put(user_id, guilds, **tokens)
+                entry = self.store.get(str(user_id))
+        if 'order' not in entry:
+            # Entrée enregistrée avant l'index : le construire une fois
+            entry = dict(entry, **self._index(list(entry['guilds'].values()), {}))
+            self.store.set(str(user_id), entry)
+        return entry
+
+    def _fetch(self, entry):
+        tokens = {
+            'access_token': entry['access_token'],
+            'refresh_token': entry.get('refresh_token'),
+            'expires_at': entry.get('expires_at')
+        }
+        can_refresh = self.refresh is not None and tokens['refresh_token']
+        if can_refresh and tokens['expires_at'] is not None and tokens['expires_at'] - 60 <= time.time():
+            tokens = self._refresh_tokens(tokens)
+        try:
+            return tokens, self.fetch(tokens['access_token'])
+        except Exception as e:
+            if not can_refresh or getattr(e, 'status', None) != 401:
+                raise
+        tokens = self._refresh_tokens(tokens)
+        return tokens, self.fetch(tokens['access_token'])
+
+    def _refresh_tokens(self, tokens):
+        credentials = self.refresh(tokens['refresh_token'])
+        expires_in = credentials.get('expires_in')
+        return {
+            'access_token': credentials['access_token'],
+            # Discord renvoie un nouveau refresh token à chaque renouvellement
+            'refresh_token': credentials.get('refresh_token', tokens['refresh_token']),
+            'expires_at': time.time() + float(expires_in) if expires_in else None
+        }
+
+    def get_all(self, user_id):
+        """Liste des serveurs de l'utilisateur (dans l'ordre renvoyé par Discord)"""
+        entry = self._entry(user_id)
+        return list(entry['guilds'].values()) if entry else []
+
+    def stats(self, user_id):
+        """Agrégats précalculés : {'servers', 'members', 'configured'}"""
+        entry = self._entry(user_id)
+        return entry['stats'] if entry else {'servers': 0, 'members': 0, 'configured': 0}
+
+    def page(self, user_id, prefix='', cursor=0, limit=50):
+        """Serveurs triés par nom dont le nom commence par `prefix`.
+
+        Retourne (serveurs, nombre de résultats, curseur suivant ou None) ;
+        le curseur est la position dans les résultats. Coût en
+        O(log n + limit) quel que soit le nombre de serveurs.
+        """
+        entry = self._entry(user_id)
+        if entry is None:
+            return [], 0, None
+        names = entry['names']
+        prefix = prefix.casefold()
+        low = bisect_left(names, prefix) if prefix else 0
+        high = bisect_left(names, prefix + _PREFIX_END, low) if prefix else len(names)
+        start = low + cursor
+        end = min(high, start + limit)
+        guilds = [entry['guilds'][guild_id] for guild_id in entry['order'][start:end]]
+        return guilds, high - low, (cursor + limit if end < high else None)
+
+    def get(self, user_id, guild_id):
+        """Un serveur de l'utilisateur, ou None s'il n'y a pas accès"""
+        entry = self._entry(user_id)
+        return entry['guilds'].get(guild_id) if entry else None
+
+    def delete(self, user_id):
+        self.store.delete(str(user_id))
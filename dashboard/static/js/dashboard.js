@@ -106,3 +106,51 @@ function createChart(ctx, type, data, options = {}) {
         }
     });
 }
+
+// Statistiques du bot en direct (Server-Sent Events)
+// onUpdate reçoit l'état complet à chaque snapshot ou delta
+function subscribeStats(onUpdate) {
+    let stats = {};
+    const source = new EventSource('/api/bot/stats/stream');
+
+    source.addEventListener('snapshot', (e) => {
+        stats = JSON.parse(e.data);
+        onUpdate({ ...stats });
+    });
+    source.addEventListener('delta', (e) => {
+        Object.assign(stats, JSON.parse(e.data));
+        onUpdate({ ...stats });
+    });
+
+    return source;
+}
+
+// Ajoute un point à un graphique créé avec createChart
+function pushChartPoint(chart, label, value, maxPoints = 30) {
+    chart.data.labels.push(label);
+    chart.data.datasets[0].data.push(value);
+    if (chart.data.labels.length > maxPoints) {
+        chart.data.labels.shift();
+        chart.data.datasets[0].data.shift();
+    }
+    chart.update('none');
+}
+
+// Graphique des actions de modération d'un serveur (agrégats par heure/jour)
+async function loadModerationChart(ctx, guildId, granularity = 'day') {
+    const response = await fetch(`/api/guild/${guildId}/moderation/stats?granularity=${granularity}`);
+    const series = await response.json();
+    const colors = { warn: '#FEE75C', kick: '#EB459E', ban: '#ED4245', mute: '#5865F2' };
+
+    return createChart(ctx, 'line', {
+        labels: series.labels.map(label => new Date(label + 'Z').toLocaleString('fr-FR', granularity === 'hour'
+            ? { hour: '2-digit', day: '2-digit', month: '2-digit' }
+            : { day: '2-digit', month: '2-digit' })),
+        datasets: Object.entries(series.datasets).map(([action, counts]) => ({
+            label: action,
+            data: counts,
+            borderColor: colors[action] || '#57F287',
+            tension: 0.3
+        }))
+    });
+}
@@ -0,0 +1,150 @@
+import json
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """File d'événements bornée d'un client SSE.
+
+    Quand la file est pleine, l'événement le plus ancien est jeté. Comme les
+    deltas suivants ne suffisent plus à reconstruire l'état, le prochain
+    événement lu est alors un snapshot complet.
+    """
+
+    def __init__(self, broadcaster, maxlen):
+        self.broadcaster = broadcaster
+        self.queue = deque(maxlen=maxlen)
+        self.cond = threading.Condition()
+        self.dropped = 0
+        self.needs_snapshot = False
+        self.closed = False
+
+    def put(self, event):
+        with self.cond:
+            if len(self.queue) == self.queue.maxlen:
+                self.dropped += 1
+                self.needs_snapshot = True
+            self.queue.append(event)
+            self.cond.notify()
+
+    def get(self, timeout=None):
+        """Prochain événement (nom, données), ou None après `timeout` secondes"""
+        with self.cond:
+            self.cond.wait_for(lambda: self.queue or self.closed, timeout)
+            if self.needs_snapshot:
+                self.needs_snapshot = False
+                self.queue.clear()
+                return ('snapshot', self.broadcaster.snapshot())
+            if self.queue:
+                return self.queue.popleft()
+            return None
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify()
+
+
+class StatsBroadcaster:
+    """Producteur unique qui interroge le bot et diffuse les changements.
+
+    Un seul thread appelle `fetch()` toutes les `interval` secondes, quel que
+    soit le nombre de clients abonnés. Chaque nouveau client reçoit d'abord un
+    snapshot, puis uniquement les clés qui ont changé (deltas). Le thread
+    s'arrête quand il n'y a plus d'abonnés.
+
+    Un broadcaster par worker gunicorn : chaque worker qui a des abonnés
+    interroge le bot. Chaque abonné garde un thread de requête pendant toute
+    la connexion, d'où les workers gthread de gunicorn.conf.py.
+    """
+
+    def __init__(self, fetch, interval=5.0, queue_size=16):
+        self.fetch = fetch
+        self.interval = interval
+        self.queue_size = queue_size
+        self.subscribers = set()
+        self.last = None
+        self.upstream_calls = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def subscribe(self):
+        sub = Subscription(self, self.queue_size)
+        with self._lock:
+            self.subscribers.add(sub)
+            if self.last is not None:
+                sub.put(('snapshot', self.last))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='stats-stream', daemon=True)
+                self._thread.start()
+        return sub
+
+    def unsubscribe(self, sub):
+        sub.close()
+        with self._lock:
+            self.subscribers.discard(sub)
+            if not self.subscribers:
+                self._wakeup.set()
+
+    def snapshot(self):
+        with self._lock:
+            return self.last
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self.subscribers:
+                    self._thread = None
+                    return
+                self._wakeup.clear()
+            try:
+                stats = self.fetch()
+            except Exception:
+                logger.exception("Erreur flux stats")
+            else:
+                self.publish(stats)
+            finally:
+                self.upstream_calls += 1
+            self._wakeup.wait(self.interval)
+
+    def publish(self, stats):
+        """Diffuse `stats` à tous les abonnés (snapshot la première fois, puis delta)"""
+        with self._lock:
+            previous, self.last = self.last, stats
+            subscribers = list(self.subscribers)
+        if previous is None:
+            event = ('snapshot', stats)
+        else:
+            delta = {key: value for key, value in stats.items() if previous.get(key) != value}
+            if not delta:
+                return
+            event = ('delta', delta)
+        for sub in subscribers:
+            sub.put(event)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'subscribers': len(self.subscribers),
+                'upstream_calls': self.upstream_calls,
+                'dropped': sum(sub.dropped for sub in self.subscribers),
+            }
+
+
+def sse_events(broadcaster, keepalive=15.0):
+    """Générateur de flux text/event-stream pour un abonné"""
+    sub = broadcaster.subscribe()
+    try:
+        while True:
+            event = sub.get(timeout=keepalive)
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            name, data = event
+            yield f"event: {name}\ndata: {json.dumps(data)}\n\n"
+    finally:
+        broadcaster.unsubscribe(sub)
@@ -0,0 +1,71 @@
+"""Fixtures communes : application sur une base SQLite temporaire.
+
+Les modules plats (app, config, cache, metrics...) sont importés depuis
+dashboard/, le paquet depuis la racine du dépôt, comme en production.
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+DASHBOARD_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(DASHBOARD_DIR))
+sys.path.insert(0, str(DASHBOARD_DIR.parent))
+
+API_KEY = 'test-api-key'
+_tmp = tempfile.mkdtemp(prefix='paradise-tests-')
+os.environ.update({
+    'DATABASE_URL': f"sqlite:///{os.path.join(_tmp, 'test.db')}",
+    'SESSION_DB_PATH': os.path.join(_tmp, 'sessions.db'),
+    'SECRET_KEY': 'test',
+    'DASHBOARD_API_KEY': API_KEY,
+    'CONFIG_FLUSH_INTERVAL': '0.05',
+    'CONFIG_FEED_POLL_INTERVAL': '0.05',
+})
+
+
+@pytest.fixture(scope='session')
+def app():
+    import app as dashboard_app
+    from config import Config
+    from dashboard.database import upgrade_schema
+
+    class TestConfig(Config):
+        METRICS = False
+        TESTING = True
+
+    application = dashboard_app.create_app(TestConfig)
+    with application.app_context():
+        upgrade_schema()
+    return application
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def api_headers():
+    return {'X-API-Key': API_KEY}
+
+
+@pytest.fixture
+def owner_client(app):
+    """Client connecté en tant que propriétaire (accès à tous les serveurs)"""
+    from dashboard.models import db, User
+
+    with app.app_context():
+        user = User.query.filter_by(discord_id='owner').first()
+        if user is None:
+            user = User(discord_id='owner', username='owner', is_owner=True)
+            db.session.add(user)
+            db.session.commit()
+        user_id = user.id
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+    return client
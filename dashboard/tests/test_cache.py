@@ -0,0 +1,83 @@
+import threading
+
+import pytest
+
+from cache import SWRCache
+
+
+class Loader:
+    """Appels amont comptés ; `release` retient les chargements en cours"""
+
+    def __init__(self, values=None):
+        self.calls = 0
+        self.values = values
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self):
+        self.calls += 1
+        self.release.wait(5)
+        if self.values is not None:
+            value = self.values.pop(0)
+            if isinstance(value, Exception):
+                raise value
+            return value
+        return self.calls
+
+
+def test_fresh_then_stale_while_revalidate():
+    now = [0.0]
+    cache = SWRCache(clock=lambda: now[0])
+    loader = Loader()
+
+    assert cache.get('stats', loader, ttl=10, stale_ttl=60) == 1
+    now[0] = 5
+    assert cache.get('stats', loader, ttl=10, stale_ttl=60) == 1
+    assert loader.calls == 1
+
+    # Trop vieille : l'ancienne valeur est servie tout de suite, un seul
+    # rafraîchissement tourne en arrière-plan
+    loader.release.clear()
+    now[0] = 20
+    assert cache.get('stats', loader, ttl=10, stale_ttl=60) == 1
+    assert cache.get('stats', loader, ttl=10, stale_ttl=60) == 1
+    refresh = cache._inflight['stats']
+    loader.release.set()
+    refresh.result(5)
+    assert loader.calls == 2
+    assert cache.get('stats', loader, ttl=10, stale_ttl=60) == 2
+
+    stats = cache.stats()
+    assert (stats['hits'], stats['stale_hits'], stats['misses'], stats['refreshes']) == (2, 2, 1, 2)
+
+
+def test_concurrent_misses_make_one_upstream_call():
+    cache = SWRCache()
+    loader = Loader()
+    loader.release.clear()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get('stats', loader, ttl=10)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    while cache.stats()['coalesced'] < 7:
+        threading.Event().wait(0.01)
+    loader.release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert loader.calls == 1
+    assert results == [1] * 8
+
+
+def test_failed_refresh_keeps_last_good_value():
+    now = [0.0]
+    cache = SWRCache(clock=lambda: now[0])
+    loader = Loader(values=[{'servers': 5}, ConnectionError('bot injoignable')])
+    assert cache.get('stats', loader, ttl=10) == {'servers': 5}
+
+    now[0] = 20
+    with pytest.raises(ConnectionError):
+        cache.get('stats', loader, ttl=10)
+    assert cache.stats()['errors'] == 1
+    assert cache._entries['stats'][0] == {'servers': 5}
@@ -0,0 +1,79 @@
+from types import SimpleNamespace
+
+import pytest
+
+from bot_api import BotAPIClient, BotAPIError, CircuitOpenError
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+def make_breaker(now):
+    return CircuitBreaker('test', failure_threshold=3, reset_timeout=5,
+                          max_reset_timeout=15, clock=lambda: now[0])
+
+
+def test_opens_after_threshold_then_half_open_with_backoff():
+    now = [0.0]
+    breaker = make_breaker(now)
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.status()['rejected'] == 1
+
+    # Délai écoulé : un seul appel de test passe
+    now[0] = 5
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()
+
+    # L'appel de test échoue : délai doublé, puis plafonné
+    breaker.record_failure()
+    assert breaker.status()['reset_timeout'] == 10
+    now[0] = 15
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.status()['reset_timeout'] == 15
+
+    now[0] = 30
+    assert breaker.allow()
+    breaker.record_success()
+    status = breaker.status()
+    assert (status['state'], status['failures'], status['reset_timeout']) == (CLOSED, 0, 5)
+
+
+def test_success_resets_consecutive_failures():
+    breaker = make_breaker([0.0])
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+
+def test_client_fails_fast_while_open():
+    now = [0.0]
+    # Port fermé : connexion refusée immédiatement
+    client = BotAPIClient(base_url='http://127.0.0.1:9', breaker=make_breaker(now))
+    try:
+        for _ in range(3):
+            with pytest.raises(BotAPIError):
+                client.call('stats')
+        with pytest.raises(CircuitOpenError):
+            client.call('stats')
+    finally:
+        client.close()
+
+
+def test_health_reports_degraded_bot_api(client, monkeypatch):
+    from dashboard import views
+
+    breaker = make_breaker([0.0])
+    for _ in range(3):
+        breaker.record_failure()
+    monkeypatch.setattr(views, '_bot_api', SimpleNamespace(client=SimpleNamespace(breaker=breaker)))
+
+    data = client.get('/health').get_json()
+    assert data['status'] == 'degraded'
+    assert data['bot_api']['state'] == OPEN
+    assert data['bot_api']['retry_in'] == 5
@@ -0,0 +1,62 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+
+@pytest.mark.parametrize('timeout', ['inf', '-inf', 'nan', 'x'])
+def test_changes_rejects_invalid_timeout(client, api_headers, timeout):
+    response = client.get('/api/guilds/config/changes', headers=api_headers,
+                          query_string={'guild_ids': '1', 'since': 0, 'timeout': timeout})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('body', ['[1, 2]', '"1"', '0'])
+def test_changes_rejects_non_object_body(client, api_headers, body):
+    response = client.post('/api/guilds/config/changes', headers=api_headers, data=body,
+                           content_type='application/json')
+    assert response.status_code == 400
+
+
+def test_changes_wait_is_capped(client, api_headers, monkeypatch):
+    from dashboard.api import config
+
+    monkeypatch.setattr(config, 'CONFIG_FEED_MAX_WAIT', 0.2)
+    since = client.get('/api/guilds/config/changes', headers=api_headers,
+                       query_string={'guild_ids': '1'}).get_json()['version']
+    start = time.monotonic()
+    response = client.get('/api/guilds/config/changes', headers=api_headers,
+                          query_string={'guild_ids': '1', 'since': since, 'timeout': 1e9})
+    assert response.status_code == 200
+    assert response.get_json()['changes'] == []
+    assert time.monotonic() - start < 5
+
+
+def test_default_wait_stays_under_worker_timeout():
+    from dashboard.api import config
+
+    assert config.CONFIG_FEED_DEFAULT_WAIT <= config.CONFIG_FEED_MAX_WAIT < 30
+
+
+def test_prune_keeps_latest_version_as_watermark(app):
+    from dashboard.api.changes import ConfigChangeFeed, current_version, record_changes
+    from dashboard.models import db, ConfigChange
+
+    with app.app_context():
+        with db.engine.begin() as conn:
+            record_changes(conn, ['prune-1', 'prune-2'], datetime.utcnow() - timedelta(days=2))
+        version = current_version()
+        feed = ConfigChangeFeed()
+        feed.init_app(app)
+        feed.prune()
+        # Tout est plus vieux que la rétention, sauf que la dernière version reste
+        assert current_version() == version
+        assert db.session.query(ConfigChange.id).all() == [(version,)]
+    assert feed.pruned_through == version - 1
+
+    # Un autre worker retrouve la limite de purge sans état partagé
+    other = ConfigChangeFeed()
+    other.init_app(app)
+    with app.app_context():
+        assert other.wait(version - 2, lambda guild_id: True, 0)[2] is True
+        assert other.wait(version - 1, lambda guild_id: True, 0)[2] is False
@@ -0,0 +1,41 @@
+COMPACT = 'application/vnd.paradise.config.compact+json'
+
+
+def test_to_dict_follows_columns(app):
+    from dashboard.models import CONFIG_DEFAULTS, CONFIG_FIELDS, GuildConfig, compact_config
+
+    assert 'prefix' in CONFIG_FIELDS and 'id' not in CONFIG_FIELDS and 'updated_at' not in CONFIG_FIELDS
+    assert CONFIG_DEFAULTS['prefix'] == '!' and CONFIG_DEFAULTS['bad_words'] == []
+
+    with app.app_context():
+        config = GuildConfig(guild_id='140', prefix='?', bad_words='["nul"]')
+        values = config.to_dict(commands={'salut': 'bonjour'})
+        assert set(values) == set(CONFIG_FIELDS)
+        assert values['bad_words'] == ['nul']
+        assert values['custom_commands'] == {'salut': 'bonjour'}
+    assert compact_config(dict(CONFIG_DEFAULTS, guild_id='141')) == {'guild_id': '141'}
+    assert compact_config(dict(CONFIG_DEFAULTS, guild_id='141', prefix='?', bad_words=['nul'])) == {
+        'guild_id': '141', 'prefix': '?', 'bad_words': ['nul']}
+
+
+def test_compact_format_negotiated_with_accept(client, api_headers):
+    response = client.post('/api/guild/142/config', json={'prefix': '?', 'caps_percentage': 50},
+                           headers=api_headers)
+    assert response.status_code == 200
+
+    full = client.get('/api/guild/142/config', headers=api_headers)
+    assert full.mimetype == 'application/json'
+    assert full.get_json()['language'] == 'fr'
+
+    compact = client.get('/api/guild/142/config', headers=dict(api_headers, Accept=COMPACT))
+    assert compact.mimetype == COMPACT
+    assert 'Accept' in compact.headers['Vary']
+    assert compact.get_json() == {'guild_id': '142', 'prefix': '?', 'caps_percentage': 50}
+    assert compact.headers['ETag'] != full.headers['ETag']
+
+    # Le format complet se reconstruit avec les valeurs par défaut
+    defaults = client.get('/api/guilds/config/defaults', headers=api_headers).get_json()
+    full_values = full.get_json()
+    full_values.pop('custom_commands')
+    defaults.pop('custom_commands')
+    assert dict(defaults, **compact.get_json()) == full_values
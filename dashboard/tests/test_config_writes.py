@@ -0,0 +1,107 @@
+import pytest
+
+
+@pytest.mark.parametrize('data', [
+    {'prefix': 'x' * 11},
+    {'caps_percentage': 'soixante-dix'},
+    {'caps_percentage': 2 ** 40},
+    {'welcome_enabled': 'oui'},
+    {'welcome_message': ['pas', 'une', 'chaîne']},
+])
+def test_config_post_rejects_invalid_values(client, api_headers, data):
+    response = client.post('/api/guild/100/config', json=data, headers=api_headers)
+    assert response.status_code == 400
+
+
+def test_config_post_accepts_valid_values(client, api_headers):
+    response = client.post('/api/guild/101/config', headers=api_headers,
+                           json={'prefix': '?', 'caps_percentage': 50, 'log_channel_id': None, 'inconnu': 1})
+    assert response.status_code == 200
+    assert response.get_json() == {'success': True, 'ignored': ['inconnu']}
+
+
+def test_flush_drops_only_unwritable_patches(app):
+    from dashboard.api.config import write_buffer
+    from dashboard.models import GuildConfig
+
+    write_buffer.flush()
+    write_buffer.patch('102', {'prefix': '$'})
+    write_buffer.patch('103', {'prefix': object()})
+    write_buffer.flush()
+    assert not write_buffer.pending()
+
+    with app.app_context():
+        assert GuildConfig.query.filter_by(guild_id='102').one().prefix == '$'
+
+
+@pytest.mark.parametrize('bad_words', [
+    'pas du json',
+    '{"mot": 1}',
+    ['ok', 3],
+    ['x' * 101],
+    ['mot'] * 1001,
+    None,
+])
+def test_config_post_rejects_invalid_bad_words(client, api_headers, bad_words):
+    response = client.post('/api/guild/110/config', json={'bad_words': bad_words}, headers=api_headers)
+    assert response.status_code == 400
+
+
+def test_bad_words_accepts_list_or_json_list(client, api_headers):
+    for bad_words in (['idiot', 'nul'], '["idiot", "nul"]'):
+        response = client.post('/api/guild/111/config', json={'bad_words': bad_words}, headers=api_headers)
+        assert response.status_code == 200
+        config = client.get('/api/guild/111/config', headers=api_headers).get_json()
+        assert config['bad_words'] == ['idiot', 'nul']
+
+
+def test_unreadable_stored_bad_words_do_not_break_reads(app, client, api_headers):
+    from dashboard.models import db, GuildConfig
+
+    with app.app_context():
+        db.session.add(GuildConfig(guild_id='112', bad_words='pas du json'))
+        db.session.commit()
+
+    response = client.get('/api/guild/112/config', headers=api_headers)
+    assert response.status_code == 200
+    assert response.get_json()['bad_words'] == []
+    response = client.post('/api/guilds/config', headers=api_headers, json={'guild_ids': ['112']})
+    assert response.status_code == 200
+    assert b'"bad_words":[]' in response.data
+
+
+@pytest.mark.parametrize('url, body', [
+    ('/api/guild/120/counters', {'total_warns': 2 ** 70}),
+    ('/api/guild/120/counters', {'total_warns': True}),
+    ('/api/guilds/counters', [{'guild_id': '120', 'total_warns': 2 ** 70}]),
+])
+def test_counters_reject_out_of_range_deltas(client, api_headers, url, body):
+    response = client.post(url, json=body, headers=api_headers)
+    assert response.status_code == 400
+
+
+def test_accumulated_counters_stay_in_range():
+    from dashboard.api.write_buffer import INT_MAX, ConfigWriteBuffer
+
+    buffer = ConfigWriteBuffer(flush_interval=60)
+    buffer.increment('121', {'total_warns': INT_MAX})
+    buffer.increment('121', {'total_warns': INT_MAX})
+    assert buffer._increments['121']['total_warns'] == INT_MAX
+
+
+def test_failed_counters_keep_the_patch(app):
+    from collections import Counter
+    from dashboard.api.write_buffer import ConfigWriteBuffer
+    from dashboard.models import GuildConfig
+
+    buffer = ConfigWriteBuffer(flush_interval=60)
+    with app.app_context():
+        buffer._write_each({'122': {'prefix': '%'}}, {'122': Counter(total_warns=2 ** 70)})
+        assert GuildConfig.query.filter_by(guild_id='122').one().prefix == '%'
+
+
+@pytest.mark.parametrize('body', ['[1, 2]', '"112"', '42', '{"guild_ids": 5}'])
+def test_bulk_export_rejects_invalid_bodies(client, api_headers, body):
+    response = client.post('/api/guilds/config', headers=api_headers, data=body,
+                           content_type='application/json')
+    assert response.status_code == 400
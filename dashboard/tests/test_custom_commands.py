@@ -0,0 +1,60 @@
+import json
+
+from click.testing import CliRunner
+
+
+def test_migration_keeps_rows_with_invalid_commands(app):
+    from dashboard.custom_commands import migrate_custom_commands
+    from dashboard.models import db, CustomCommand, GuildConfig
+
+    with app.app_context():
+        db.session.add_all([
+            GuildConfig(guild_id='200', custom_commands=json.dumps({'Regles': 'Lisez #règles'})),
+            GuildConfig(guild_id='201', custom_commands=json.dumps({'ok': 'ok', 'vide': ''})),
+            GuildConfig(guild_id='202', custom_commands='pas du json'),
+        ])
+        db.session.commit()
+
+        assert migrate_custom_commands(batch_size=2) == (1, ['201', '202'])
+        assert GuildConfig.query.filter_by(guild_id='200').one().custom_commands == '{}'
+        assert json.loads(GuildConfig.query.filter_by(guild_id='201').one().custom_commands) == {'ok': 'ok', 'vide': ''}
+        assert GuildConfig.query.filter_by(guild_id='202').one().custom_commands == 'pas du json'
+        assert CustomCommand.query.filter_by(guild_id='201').count() == 0
+
+        result = CliRunner().invoke(app.cli, ['init-db'])
+        assert result.exit_code == 1
+
+        GuildConfig.query.filter_by(guild_id='201').one().custom_commands = json.dumps({'ok': 'ok'})
+        GuildConfig.query.filter_by(guild_id='202').one().custom_commands = '{}'
+        db.session.commit()
+        assert migrate_custom_commands() == (1, [])
+
+
+def test_config_payload_lists_commands_from_table(client, api_headers):
+    response = client.post('/api/guild/210/config', headers=api_headers,
+                           json={'prefix': '?', 'custom_commands': {'Salut': 'Bonjour !', 'aide': 'Liste'}})
+    assert response.status_code == 200
+
+    config = client.get('/api/guild/210/config', headers=api_headers).get_json()
+    assert config['prefix'] == '?'
+    assert config['custom_commands'] == {'aide': 'Liste', 'salut': 'Bonjour !'}
+
+    client.put('/api/guild/210/commands/regles', headers=api_headers, json={'response': 'Lisez #règles'})
+    client.delete('/api/guild/210/commands/aide', headers=api_headers)
+    config = client.get('/api/guild/210/config', headers=api_headers).get_json()
+    assert config['custom_commands'] == {'regles': 'Lisez #règles', 'salut': 'Bonjour !'}
+
+    client.post('/api/guild/210/config', headers=api_headers, json={'custom_commands': {'seule': 'commande'}})
+    config = client.get('/api/guild/210/config', headers=api_headers).get_json()
+    assert config['custom_commands'] == {'seule': 'commande'}
+
+    export = client.post('/api/guilds/config', headers=api_headers, json={'guild_ids': ['210']})
+    assert [json.loads(line)['custom_commands'] for line in export.data.splitlines()] == [{'seule': 'commande'}]
+
+
+def test_config_post_rejects_invalid_commands(client, api_headers):
+    response = client.post('/api/guild/211/config', headers=api_headers,
+                           json={'custom_commands': {'vide': ''}})
+    assert response.status_code == 400
+    response = client.post('/api/guild/211/config', headers=api_headers, json={'custom_commands': ['liste']})
+    assert response.status_code == 400
@@ -0,0 +1,24 @@
+from types import SimpleNamespace
+
+
+def test_owner_dashboard_fetches_bot_data_in_one_fan_out(owner_client, monkeypatch):
+    from dashboard import views
+
+    calls = []
+
+    def fetch_many(**requested):
+        calls.append(sorted(requested))
+        return {
+            'stats': {'servers': 42, 'members': 12345, 'commands': 67, 'uptime': 7200},
+            'recent_actions': [{'action_type': 'warn', 'user_id': '1', 'moderator_id': '2', 'reason': 'spam'}],
+            'active_giveaways': [{'message_id': '100', 'prize': 'Nitro', 'entrants': 12}],
+        }
+
+    monkeypatch.setattr(views, '_bot_api', SimpleNamespace(
+        fetch_many=fetch_many, get_bot_stats=None, get_moderation_actions=None, get_active_giveaways=None))
+    response = owner_client.get('/dashboard')
+    assert response.status_code == 200
+    assert calls == [['active_giveaways', 'recent_actions', 'stats']]
+    page = response.get_data(as_text=True)
+    assert 'Nitro' in page and 'spam' in page and '12345' in page
+    assert 'subscribeStats(' in page
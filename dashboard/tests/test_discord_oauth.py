@@ -0,0 +1,114 @@
+import sys
+from pathlib import Path
+
+import pytest
+import requests
+
+import discord_oauth
+from discord_oauth import DiscordAPIError, DiscordClient
+from rate_limit import RateLimited, SharedTokenBucket
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'benchmarks'))
+from stub_discord import start_stub  # noqa: E402
+
+
+def make_response(status, headers=None, body=b'{}'):
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    response._content = body
+    return response
+
+
+class FakeSession:
+    """Réponses de Discord préparées à l'avance, appels enregistrés"""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def request(self, method, url, **kwargs):
+        self.calls.append((method, url, kwargs.get('headers', {}).get('Authorization')))
+        return self.responses.pop(0)
+
+
+def make_client(responses):
+    client = DiscordClient(api_url='http://discord.test', max_wait=1, max_retries=0)
+    client.session = FakeSession(responses)
+    return client
+
+
+def test_exhausted_bucket_only_pauses_that_token():
+    client = make_client([
+        make_response(200, {'X-RateLimit-Bucket': 'guilds', 'X-RateLimit-Remaining': '0',
+                            'X-RateLimit-Reset-After': '30'}),
+        make_response(200, {'X-RateLimit-Bucket': 'guilds', 'X-RateLimit-Remaining': '4'}),
+        make_response(200, {'X-RateLimit-Bucket': 'user'}),
+    ])
+    client.get_guilds('a')
+    with pytest.raises(RateLimited):
+        client.get_guilds('a')
+    client.get_guilds('b')
+    client.get_user('a')
+    assert client.bucket.status()['paused_for'] == 0
+    assert len(client.session.calls) == 3
+
+
+def test_route_429_does_not_pause_other_calls():
+    client = make_client([
+        make_response(429, {'X-RateLimit-Bucket': 'guilds', 'Retry-After': '30'}),
+        make_response(200),
+    ])
+    with pytest.raises(DiscordAPIError):
+        client.get_guilds('a')
+    assert client.bucket.status()['paused_for'] == 0
+    with pytest.raises(RateLimited):
+        client.get_guilds('a')
+    client.get_user('a')
+
+
+def test_global_429_pauses_everything():
+    client = make_client([make_response(429, {'X-RateLimit-Global': 'true', 'Retry-After': '30'})])
+    with pytest.raises(DiscordAPIError):
+        client.get_guilds('a')
+    assert client.bucket.status()['paused_for'] > 0
+    with pytest.raises(RateLimited):
+        client.get_user('b')
+
+
+def test_shared_bucket_is_shared_between_processes(tmp_path):
+    # Deux instances sur le même fichier, comme deux workers
+    path = str(tmp_path / 'sessions.db')
+    first = SharedTokenBucket(1, path, name='discord', capacity=2)
+    second = SharedTokenBucket(1, path, name='discord', capacity=2)
+    first.acquire(timeout=0)
+    first.acquire(timeout=0)
+    with pytest.raises(RateLimited):
+        second.acquire(timeout=0)
+    second.pause(30)
+    assert first.status()['paused_for'] > 0
+
+
+def test_callback_against_stub_discord(app, client, monkeypatch):
+    from dashboard.models import User
+
+    server, url = start_stub()
+    try:
+        monkeypatch.setattr(discord_oauth.client, 'api_url', url)
+        response = client.get('/callback?code=4242')
+        assert response.status_code == 302
+        assert response.headers['Location'].endswith('/dashboard')
+        # Échange du code, puis utilisateur et serveurs
+        assert server.request_count == 3
+
+        with app.app_context():
+            assert User.query.filter_by(discord_id='4242').one().username == 'bench-4242'
+        entry = app.extensions['guild_store'].store.get('4242')
+        assert entry['access_token'].startswith('at-')
+        assert entry['refresh_token'].startswith('rt-')
+        assert entry['expires_at'] is not None
+        # Seuls les serveurs où l'utilisateur est admin sont gardés
+        assert entry['stats']['servers'] == 10
+        assert isinstance(discord_oauth.client.bucket, SharedTokenBucket)
+    finally:
+        server.shutdown()
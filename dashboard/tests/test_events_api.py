@@ -0,0 +1,28 @@
+import json
+from datetime import datetime
+
+
+def post_events(client, headers, events):
+    body = '\n'.join(json.dumps(event) for event in events)
+    return client.post('/api/events', data=body, headers=headers)
+
+
+def test_out_of_range_lines_are_rejected_alone(app, client, api_headers):
+    from dashboard.models import BotLog
+
+    response = post_events(client, api_headers, [
+        {'event_id': 'log-ok', 'type': 'log', 'message': 'ok'},
+        {'event_id': 'log-overflow', 'type': 'log', 'message': 'trop loin', 'created_at': '1e20'},
+        {'event_id': 'log-offset', 'type': 'log', 'message': 'décalé',
+         'created_at': '2024-01-01T05:00:00+05:00'},
+        {'event_id': 'gw-overflow', 'type': 'giveaway', 'message_id': '1', 'guild_id': '1',
+         'channel_id': '1', 'prize': 'Nitro', 'host_id': '1', 'entrants': 10 ** 30},
+    ])
+    assert response.status_code == 200
+    result = response.get_json()
+    assert result['accepted'] == 2
+    assert [r['line'] for r in result['rejected']] == [2, 4]
+
+    with app.app_context():
+        log = BotLog.query.filter_by(message='décalé').one()
+        assert log.created_at == datetime(2024, 1, 1)
@@ -0,0 +1,38 @@
+import json
+
+
+def create_giveaway(app, message_id):
+    from dashboard.models import db, Giveaway
+
+    with app.app_context():
+        db.session.add(Giveaway(message_id=message_id, guild_id='1', channel_id='1', prize='Nitro',
+                                host_id='1', winners_count=1))
+        db.session.commit()
+
+
+def test_invalid_draw_parameters_are_rejected(app, client, api_headers):
+    create_giveaway(app, 'draw-params')
+    url = '/api/giveaway/draw-params/draw'
+    client.post('/api/giveaway/draw-params/entrants', headers=api_headers,
+                data='\n'.join(json.dumps({'user_id': str(i)}) for i in range(3)))
+
+    # 64 caractères mais 128 octets en UTF-8
+    response = client.post(url, headers=api_headers, json={'seed': 'é' * 64})
+    assert response.status_code == 400
+    response = client.post(url, headers=api_headers, data='{"count": 1e999}',
+                           content_type='application/json')
+    assert response.status_code == 400
+
+    response = client.post(url, headers=api_headers, json={'seed': 'e' * 64})
+    assert response.status_code == 201
+    assert response.get_json()['seed'] == 'e' * 64
+
+
+def test_overflowing_weight_rejects_the_line(app, client, api_headers):
+    create_giveaway(app, 'draw-weight')
+    body = '{"user_id": "1", "weight": 1e999}\n{"user_id": "2"}'
+    response = client.post('/api/giveaway/draw-weight/entrants', headers=api_headers, data=body)
+    assert response.status_code == 200
+    result = response.get_json()
+    assert (result['accepted'], result['rejected']) == (1, 1)
+    assert result['errors'][0]['line'] == 1
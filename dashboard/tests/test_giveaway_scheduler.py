@@ -0,0 +1,140 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import update
+
+from dashboard.giveaway_scheduler import GiveawayScheduler, to_timestamp
+
+
+def test_to_timestamp_converts_aware_datetimes():
+    naive = datetime(2026, 1, 1, 12, 0)
+    assert to_timestamp(naive) == datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc).timestamp()
+    paris = timezone(timedelta(hours=1))
+    assert to_timestamp(datetime(2026, 1, 1, 13, 0, tzinfo=paris)) == to_timestamp(naive)
+
+
+def test_sync_picks_up_changes_from_other_processes(app):
+    from dashboard.models import db, Giveaway
+
+    end_time = datetime.utcnow() + timedelta(hours=1)
+    with app.app_context():
+        for message_id in ('g1', 'g2'):
+            db.session.add(Giveaway(message_id=message_id, guild_id='1', channel_id='1', prize='Nitro',
+                                    host_id='1', end_time=end_time))
+        db.session.commit()
+
+    scheduler = GiveawayScheduler(lambda message_ids: message_ids)
+    scheduler.init_app(app, start=False)
+    assert len(scheduler) == 2
+
+    # Modifications faites par un worker web (sans les hooks de ce planificateur)
+    later = end_time + timedelta(hours=1)
+    with app.app_context():
+        db.session.execute(update(Giveaway).where(Giveaway.message_id == 'g1').values(end_time=later))
+        db.session.execute(update(Giveaway).where(Giveaway.message_id == 'g2').values(ended=True))
+        db.session.add(Giveaway(message_id='g3', guild_id='1', channel_id='1', prize='Nitro',
+                                host_id='1', end_time=end_time))
+        db.session.commit()
+
+    scheduler.sync_new()
+    assert len(scheduler) == 2
+    assert scheduler.next_deadline() == to_timestamp(end_time)
+    assert scheduler.pop_due(to_timestamp(end_time)) == ['g3']
+    assert scheduler.next_deadline() == to_timestamp(later)
+
+
+def test_schedule_same_deadline_is_not_duplicated():
+    scheduler = GiveawayScheduler(lambda message_ids: message_ids)
+    for _ in range(3):
+        scheduler.schedule('g', 100.0)
+    assert len(scheduler._heap) == 1
+    assert scheduler.pop_due(100.0) == ['g']
+
+
+class StubBot:
+    """Faux bot : termine les giveaways demandés, sauf ceux de `refuse`"""
+
+    def __init__(self, refuse=(), fail=False):
+        self.refuse = set(refuse)
+        self.fail = fail
+        self.calls = []
+
+    def end_giveaways(self, message_ids):
+        self.calls.append(list(message_ids))
+        if self.fail:
+            raise ConnectionError('bot injoignable')
+        return [message_id for message_id in message_ids if message_id not in self.refuse]
+
+
+def make_scheduler(app, bot, now, **kwargs):
+    scheduler = GiveawayScheduler(bot.end_giveaways, clock=lambda: now[0], **kwargs)
+    scheduler.app = app
+    return scheduler
+
+
+def add_giveaways(app, end_time, *message_ids, ended=False):
+    from dashboard.models import db, Giveaway
+
+    with app.app_context():
+        for message_id in message_ids:
+            db.session.add(Giveaway(message_id=message_id, guild_id='1', channel_id='1', prize='Nitro',
+                                    host_id='1', end_time=end_time, ended=ended))
+        db.session.commit()
+
+
+def ended_in_db(app, *message_ids):
+    from dashboard.models import Giveaway
+
+    with app.app_context():
+        return {g.message_id: g.ended for g in Giveaway.query.filter(Giveaway.message_id.in_(message_ids))}
+
+
+def test_process_due_rechecks_db_and_ends_in_batches(app):
+    end_time = datetime(2026, 1, 1, 12, 0)
+    later = end_time + timedelta(hours=1)
+    add_giveaways(app, end_time, 'pd1', 'pd2', 'pd3')
+    add_giveaways(app, end_time, 'pd-ended', ended=True)
+    add_giveaways(app, later, 'pd-later')
+
+    now = [to_timestamp(end_time)]
+    bot = StubBot()
+    scheduler = make_scheduler(app, bot, now, batch_size=2)
+    # Échéances vues par ce processus avant les modifications des autres
+    for message_id in ('pd1', 'pd2', 'pd3', 'pd-ended', 'pd-later'):
+        scheduler.schedule(message_id, end_time)
+
+    # 5 échus par lots de 2 : trois lots, puis plus rien à terminer
+    assert sum(scheduler.process_due() for _ in range(4)) == 3
+    # Lots de batch_size ; déjà terminé ou reporté en base : pas d'appel au bot
+    assert sorted(sum(bot.calls, [])) == ['pd1', 'pd2', 'pd3']
+    assert all(len(call) <= 2 for call in bot.calls)
+    assert ended_in_db(app, 'pd1', 'pd2', 'pd3', 'pd-later') == {
+        'pd1': True, 'pd2': True, 'pd3': True, 'pd-later': False}
+    assert scheduler.next_deadline() == to_timestamp(later)
+    assert scheduler.ended_count == 3
+
+
+def test_process_due_retries_when_the_bot_fails(app):
+    end_time = datetime(2026, 1, 2, 12, 0)
+    add_giveaways(app, end_time, 'pf1', 'pf2')
+    now = [to_timestamp(end_time)]
+    bot = StubBot(fail=True)
+    scheduler = make_scheduler(app, bot, now, retry_delay=30)
+    scheduler.schedule('pf1', end_time)
+    scheduler.schedule('pf2', end_time)
+
+    assert scheduler.process_due() == 0
+    assert ended_in_db(app, 'pf1', 'pf2') == {'pf1': False, 'pf2': False}
+    assert scheduler.next_deadline() == now[0] + 30
+
+    # Le bot ne termine qu'une partie : l'autre est retentée plus tard
+    bot.fail, bot.refuse = False, {'pf2'}
+    now[0] += 30
+    assert scheduler.process_due() == 1
+    assert ended_in_db(app, 'pf1', 'pf2') == {'pf1': True, 'pf2': False}
+    assert scheduler.next_deadline() == now[0] + 30
+
+    bot.refuse = set()
+    now[0] += 30
+    assert scheduler.process_due() == 1
+    assert ended_in_db(app, 'pf2') == {'pf2': True}
+    assert len(scheduler) == 0
@@ -0,0 +1,8 @@
+def test_page_cache_ignores_host_header(app, client):
+    cache = app.extensions['page_cache']
+    cache.clear()
+    first = client.get('/', headers={'Host': 'evil.example'})
+    second = client.get('/', headers={'Host': 'other.example'})
+    assert first.status_code == second.status_code == 200
+    assert cache.stats()['entries'] == 1
+    assert b'evil.example' not in second.get_data()
@@ -0,0 +1,62 @@
+import json
+import os
+import sys
+
+from flask import Flask
+
+from metrics import Registry, family, init_metrics, merge
+
+
+def metrics_client(token=None):
+    application = Flask(__name__)
+    application.config['METRICS_TOKEN'] = token
+    init_metrics(application, registry=Registry(directory=None))
+    return application.test_client()
+
+
+def test_metrics_without_token_is_loopback_only():
+    client = metrics_client()
+    assert client.get('/metrics').status_code == 200
+    remote = client.get('/metrics', environ_base={'REMOTE_ADDR': '203.0.113.7'})
+    assert remote.status_code == 403
+
+
+def test_metrics_token_required_when_set():
+    client = metrics_client(token='secret')
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer secreT'}).status_code == 401
+    response = client.get('/metrics', headers={'Authorization': 'Bearer secret'},
+                          environ_base={'REMOTE_ADDR': '203.0.113.7'})
+    assert response.status_code == 200
+
+
+def test_flat_modules_loaded_once(app):
+    # Importés aussi sous dashboard.* : deux copies, deux registres et caches
+    assert 'dashboard.cache' not in sys.modules
+    assert 'dashboard.metrics' not in sys.modules
+
+
+def test_gauge_max_mode():
+    snapshots = [[family('g', 'gauge', 'g', (), [[[], value]], mode='max')] for value in (3, 7, 5)]
+    assert merge(snapshots)[0]['samples'] == [[[], 7]]
+
+
+def test_dead_worker_gauges_are_ignored(tmp_path):
+    def snapshot(value):
+        return [family('entries', 'gauge', 'e', (), [[[], value]]),
+                family('hits', 'counter', 'h', (), [[[], value]])]
+
+    # Pid qui n'existe pas : worker tué sans écrire son fichier de sortie
+    with open(tmp_path / '999999999-dead.json', 'w') as f:
+        json.dump(snapshot(10), f)
+    registry = Registry(directory=str(tmp_path))
+    registry.collector('test', lambda: snapshot(1))
+
+    samples = {item['name']: item['samples'] for item in registry.collect()}
+    assert samples['entries'] == [[[], 1]]
+    assert samples['hits'] == [[[], 11]]
+
+    registry.write(exiting=True)
+    with open(registry._path) as f:
+        assert [item['name'] for item in json.load(f)] == ['hits']
+    os.remove(registry._path)
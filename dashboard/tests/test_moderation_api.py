@@ -0,0 +1,19 @@
+import pytest
+
+
+@pytest.mark.parametrize('params', [
+    {'since': '1e20'},
+    {'until': 'inf'},
+    {'since': 'pas une date'},
+    {'cursor': 'pas-un-curseur'},
+    {'limit': 'x'},
+])
+def test_moderation_page_rejects_invalid_parameters(owner_client, params):
+    response = owner_client.get('/api/guild/1/moderation', query_string=params)
+    assert response.status_code == 400
+
+
+def test_moderation_page_accepts_offset_dates(owner_client):
+    response = owner_client.get('/api/guild/1/moderation', query_string={'since': '2024-01-01T00:00:00Z'})
+    assert response.status_code == 200
+    assert response.get_json() == {'items': [], 'next_cursor': None}
@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from dashboard.models import db, ModerationLog, ModerationStat, RollupState
+from dashboard.moderation_stats import ROLLUP_LAG, ROLLUP_NAME, moderation_timeseries, update_rollups
+
+GUILD_ID = 'rollup-guild'
+
+
+@pytest.fixture
+def clean_rollups(app):
+    with app.app_context():
+        db.session.query(ModerationStat).delete()
+        db.session.query(ModerationLog).delete()
+        db.session.query(RollupState).filter_by(name=ROLLUP_NAME).delete()
+        db.session.commit()
+        yield
+        db.session.rollback()
+
+
+def add_log(log_id, created_at):
+    db.session.add(ModerationLog(id=log_id, guild_id=GUILD_ID, action_type='ban', user_id='1',
+                                 moderator_id='2', created_at=created_at))
+    db.session.commit()
+
+
+def test_rollup_waits_for_out_of_order_commits(clean_rollups):
+    t0 = datetime(2030, 1, 1, 12)
+    add_log(1005, t0)
+    # Premier passage : la borne est seulement notée
+    assert update_rollups(now=t0) == 0
+    # Id plus petit validé après coup (commit dans le désordre sous Postgres)
+    add_log(1003, t0)
+    assert update_rollups(now=t0 + ROLLUP_LAG / 2) == 0
+    assert update_rollups(now=t0 + ROLLUP_LAG) == 2
+
+    series = moderation_timeseries(GUILD_ID, 'day', since='2030-01-01', until='2030-01-01T23:00:00')
+    assert series['datasets'] == {'ban': [2]}
+    # Rien n'est compté deux fois
+    assert update_rollups(now=t0 + ROLLUP_LAG * 3) == 0
+
+
+def test_rollup_without_lag(clean_rollups):
+    add_log(2001, datetime(2030, 1, 2))
+    assert update_rollups(lag=timedelta(0)) == 1
+
+
+def test_stats_endpoint_is_read_only(app, owner_client, clean_rollups):
+    add_log(3001, datetime.utcnow())
+    response = owner_client.get(f'/api/guild/{GUILD_ID}/moderation/stats')
+    assert response.status_code == 200
+    assert ModerationStat.query.count() == 0
+    assert db.session.get(RollupState, ROLLUP_NAME) is None
+
+
+@pytest.mark.parametrize('since', ['2024-01-01T00:00:00Z', '2024-01-01T02:00:00+02:00'])
+def test_stats_endpoint_accepts_offset_dates(owner_client, since):
+    response = owner_client.get(f'/api/guild/{GUILD_ID}/moderation/stats', query_string={'since': since, 'until': '2024-01-10'})
+    assert response.status_code == 200
+    assert response.get_json()['labels'][0] == '2024-01-01T00:00:00'
+
+
+def test_stats_endpoint_rejects_invalid_dates(owner_client):
+    response = owner_client.get(f'/api/guild/{GUILD_ID}/moderation/stats', query_string={'since': '1e20'})
+    assert response.status_code == 400
@@ -0,0 +1,22 @@
+import functools
+
+from flask import Flask
+
+
+def test_profiles_shared_through_default_session_file(tmp_path, monkeypatch):
+    import app as dashboard_app
+    from config import Config
+
+    class DefaultPathConfig(Config):
+        METRICS = False
+        TESTING = True
+        SESSION_DB_PATH = None
+
+    monkeypatch.setattr(dashboard_app, 'Flask', functools.partial(Flask, instance_path=str(tmp_path)))
+    application = dashboard_app.create_app(DefaultPathConfig)
+
+    session_db_path = str(tmp_path / 'sessions.db')
+    assert application.config['SESSION_DB_PATH'] == session_db_path
+    profiles = application.extensions['profiles']
+    assert profiles._db is not None
+    assert profiles._db.execute('PRAGMA database_list').fetchone()[2] == session_db_path
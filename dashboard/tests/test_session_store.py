@@ -0,0 +1,104 @@
+import time
+
+from flask import request
+
+from session_store import GuildStore, LRUStore
+
+
+def test_regenerate_issues_new_sid(app):
+    interface = app.session_interface
+    sid = 'fixed-by-attacker'
+    interface.store.set(sid, {'data': {'oauth_state': 'x'}, 'expires': time.time() + 60})
+
+    with app.test_request_context('/', headers={'Cookie': f'{app.config["SESSION_COOKIE_NAME"]}={sid}'}):
+        current = interface.open_session(app, request)
+        assert current.sid == sid
+        interface.regenerate(current)
+        assert current.sid != sid
+        assert dict(current) == {'oauth_state': 'x'}
+        assert interface.store.get(sid) is None
+
+        response = app.response_class()
+        interface.save_session(app, current, response)
+        assert current.sid in response.headers['Set-Cookie']
+        assert interface.store.get(current.sid)['data'] == {'oauth_state': 'x'}
+
+
+def test_failed_refresh_backs_off():
+    calls = []
+
+    def fetch(token):
+        calls.append(token)
+        raise RuntimeError('Discord indisponible')
+
+    store = GuildStore(LRUStore(), fetch=fetch, ttl=300)
+    store.put('1', [{'id': '10', 'name': 'Paradise'}], 'token')
+    entry = store.store.get('1')
+    store.store.set('1', dict(entry, fetched_at=0))
+
+    for _ in range(5):
+        assert [guild['id'] for guild in store.get_all('1')] == ['10']
+    assert len(calls) == 1
+    entry = store.store.get('1')
+    assert entry['failures'] == 1 and entry['retry_at'] > time.time()
+
+    store.store.set('1', dict(entry, retry_at=0))
+    store.get_all('1')
+    assert len(calls) == 2
+    assert store.store.get('1')['failures'] == 2
+
+
+def test_expired_sessions_are_purged(app, tmp_path):
+    from session_store import ServerSideSession, ServerSideSessionInterface
+
+    store = LRUStore(sqlite_path=str(tmp_path / 'sessions.db'), table='sessions')
+    store.set('ancienne', {'data': {}, 'expires': 0})
+    lifetime = app.permanent_session_lifetime.total_seconds()
+    store._db.execute('UPDATE sessions SET updated_at = ? WHERE key = ?', (time.time() - lifetime - 1, 'ancienne'))
+    assert store._db.execute("SELECT name FROM sqlite_master WHERE name = 'ix_sessions_updated_at'").fetchone()
+
+    interface = ServerSideSessionInterface(store, purge_interval=0)
+    session = ServerSideSession(sid='active', new=True)
+    session['user'] = 1
+    with app.test_request_context('/'):
+        interface.save_session(app, session, app.response_class())
+
+    assert store._db.execute('SELECT key FROM sessions').fetchall() == [('active',)]
+    assert store.get('ancienne') is None
+
+
+def test_guild_index_pages_by_name_prefix():
+    checked = []
+
+    def configured(guild_ids):
+        checked.append(sorted(guild_ids))
+        return ['2']
+
+    store = GuildStore(LRUStore(), fetch=None, configured=configured)
+    guilds = [{'id': str(i), 'name': name, 'approximate_member_count': 10 * i}
+              for i, name in enumerate(['Paradise', 'pâtisserie', 'Modération', 'paradis', 'Zen'], 1)]
+    store.put('1', guilds, 'token')
+
+    assert store.stats('1') == {'servers': 5, 'members': 150, 'configured': 1}
+    page, total, cursor = store.page('1', prefix='PARA', limit=1)
+    assert ([guild['name'] for guild in page], total, cursor) == (['paradis'], 2, 1)
+    page, total, cursor = store.page('1', prefix='para', cursor=cursor, limit=1)
+    assert ([guild['name'] for guild in page], total, cursor) == (['Paradise'], 2, None)
+    assert [guild['name'] for guild in store.page('1')[0]] == ['Modération', 'paradis', 'Paradise', 'pâtisserie', 'Zen']
+
+    # Les serveurs déjà configurés ne sont pas revérifiés au rafraîchissement
+    store.put('1', guilds, 'token')
+    assert checked[1] == ['1', '3', '4', '5']
+    assert store.page('1', prefix='x') == ([], 0, None)
+
+
+def test_user_guilds_endpoint(app, owner_client):
+    store = app.extensions['guild_store']
+    store.put('owner', [{'id': str(i), 'name': f'Serveur {i:02d}'} for i in range(5)], 'token')
+    try:
+        data = owner_client.get('/api/user/guilds?q=serveur&limit=2&cursor=2').get_json()
+        assert [guild['id'] for guild in data['items']] == ['2', '3']
+        assert (data['total'], data['next_cursor'], data['stats']['servers']) == (5, 4, 5)
+        assert owner_client.get('/api/user/guilds?limit=0').status_code == 400
+    finally:
+        store.delete('owner')
@@ -0,0 +1,27 @@
+import pytest
+
+from dashboard.timestamps import parse_timestamp
+
+
+@pytest.mark.parametrize('value', ['1e20', 'inf', '-inf', 'nan', '1e9999', 'abc', None, [1]])
+def test_parse_timestamp_rejects_invalid_values(value):
+    with pytest.raises(ValueError):
+        parse_timestamp(value)
+
+
+@pytest.mark.parametrize('value', ['2024-01-01T05:00:00+05:00', '2024-01-01T00:00:00Z', '2024-01-01T00:00:00'])
+def test_parse_timestamp_returns_naive_utc(value):
+    parsed = parse_timestamp(value)
+    assert parsed.tzinfo is None
+    assert parsed.isoformat() == '2024-01-01T00:00:00'
+
+
+def test_parse_timestamp_unix():
+    assert parse_timestamp('1700000000').isoformat() == '2023-11-14T22:13:20'
+    assert parse_timestamp(1700000000) == parse_timestamp('1700000000')
+
+
+@pytest.mark.parametrize('since', ['1e20', 'inf', 'nan'])
+def test_bulk_export_rejects_out_of_range_changed_since(client, api_headers, since):
+    response = client.get('/api/guilds/config', query_string={'changed_since': since}, headers=api_headers)
+    assert response.status_code == 400
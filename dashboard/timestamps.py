@@ -0,0 +1,22 @@
+from datetime import datetime, timezone
+
+
+def parse_timestamp(value):
+    """Accepte un timestamp Unix ou une date ISO 8601 ; retourne une date UTC naïve.
+
+    Une date avec fuseau (Z, +05:00) est convertie en UTC, comme les
+    colonnes. Lève ValueError pour toute valeur illisible ou hors limites.
+    """
+    try:
+        return datetime.utcfromtimestamp(float(value))
+    except (OverflowError, OSError) as e:
+        raise ValueError(f'timestamp hors limites: {value}') from e
+    except (TypeError, ValueError):
+        pass
+    try:
+        parsed = datetime.fromisoformat(value)
+    except TypeError as e:
+        raise ValueError(f'date invalide: {value!r}') from e
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
@@ -0,0 +1,467 @@
+import os
+from datetime import datetime
+from types import SimpleNamespace
+
+from flask import Blueprint, Response, current_app, render_template, redirect, url_for, request, flash, jsonify, session, render_template_string
+from flask_login import login_user, logout_user, login_required, current_user
+from sqlalchemy.exc import IntegrityError
+
+from .database import retry_on_locked
+from .http_cache import cached_page
+from .models import db, BotLog, User, GuildConfig
+from .moderation_logs import moderation_page
+from .moderation_stats import moderation_timeseries
+from stats_stream import sse_events
+
+main = Blueprint('main', __name__)
+
+# Nombre d'ids par requête IN (limite de paramètres de SQLite)
+GUILD_IDS_CHUNK_SIZE = 500
+# Serveurs affichés sur le dashboard, puis par page de /api/user/guilds
+DASHBOARD_GUILDS = 6
+USER_GUILDS_MAX_LIMIT = 100
+
+_bot_api = None
+
+
+def bot_api():
+    """Module de l'API du bot, importé au premier usage (requests est lourd
+    à importer et n'est pas nécessaire au démarrage des workers)"""
+    global _bot_api
+    if _bot_api is None:
+        try:
+            import bot_api as module
+        except ImportError:
+            module = _fallback_bot_api()
+        _bot_api = module
+    return _bot_api
+
+
+def _fallback_bot_api():
+    # Fonctions factices si le module n'existe pas
+    from cache import SWRCache
+    from circuit_breaker import CircuitBreaker
+    return SimpleNamespace(
+        cache=SWRCache(),
+        client=SimpleNamespace(breaker=CircuitBreaker('bot_api')),
+        get_bot_stats=lambda: {'servers': 5, 'members': 100, 'commands': 50, 'active_giveaways': 2, 'uptime': 3600, 'cogs': 8},
+        get_moderation_actions=lambda limit=5: [],
+        get_active_giveaways=lambda: [],
+        end_giveaways=lambda message_ids: [],
+        fetch_many=lambda **calls: {
+            key: call[0](*call[1:]) if isinstance(call, tuple) else call()
+            for key, call in calls.items()
+        },
+    )
+
+
+def discord():
+    """Module du client Discord, importé au premier usage comme bot_api().
+
+    La limite de débit est partagée entre les workers par le fichier des sessions.
+    """
+    import discord_oauth
+    discord_oauth.share_rate_limit(current_app.config['SESSION_DB_PATH'])
+    return discord_oauth
+
+
+def admin_guilds(guilds):
+    """Serveurs où l'utilisateur a les permissions admin"""
+    return [g for g in guilds if (int(g.get('permissions', 0)) & 0x8)]
+
+
+def fetch_user_guilds(access_token):
+    """Récupère les serveurs où l'utilisateur a les permissions admin"""
+    return admin_guilds(discord().client.get_guilds(access_token))
+
+
+def configured_guild_ids(guild_ids):
+    """Serveurs parmi guild_ids qui ont une config (le bot y est ou y a été)"""
+    configured = []
+    for i in range(0, len(guild_ids), GUILD_IDS_CHUNK_SIZE):
+        configured.extend(guild_id for guild_id, in db.session.query(GuildConfig.guild_id).filter(
+            GuildConfig.guild_id.in_(guild_ids[i:i + GUILD_IDS_CHUNK_SIZE])
+        ))
+    return configured
+
+
+def refresh_discord_token(refresh_token):
+    return discord().client.refresh(refresh_token)
+
+
+def guild_store():
+    return current_app.extensions['guild_store']
+
+# ==================== ROUTES ====================
+
+@main.route('/')
+@cached_page
+def index():
+    """Page d'accueil publique"""
+    return render_template('index.html')
+
+@main.route('/debug')
+def debug():
+    """Page de débogage pour voir les templates disponibles"""
+    templates = current_app.jinja_env.list_templates()
+    return render_template_string("""
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <title>Debug - Templates</title>
+        <style>
+            body { font-family: Arial; padding: 20px; background: #1a1a1a; color: white; }
+            h1 { color: #5865F2; }
+            ul { list-style: none; padding: 0; }
+            li { padding: 8px; margin: 5px 0; background: #2a2a2a; border-radius: 5px; }
+            .ok { color: #57F287; }
+            .missing { color: #ED4245; }
+        </style>
+    </head>
+    <body>
+        <h1>🔍 Debug - Templates disponibles</h1>
+        <ul>
+        {% for template in templates %}
+            <li class="ok">✅ {{ template }}</li>
+        {% endfor %}
+        </ul>
+        <p>Total: {{ templates|length }} templates</p>
+    </body>
+    </html>
+    """, templates=templates)
+
+@main.route('/invite')
+@cached_page
+def invite_page():
+    """Page d'invitation du bot"""
+    return render_template('invite.html',
+                         client_id=os.getenv('DISCORD_CLIENT_ID', ''),
+                         permissions='8')
+
+@main.route('/commands')
+@cached_page
+def commands_page():
+    """Page des commandes"""
+    return render_template('commands.html')
+
+@main.route('/login')
+def discord_login():
+    """Redirection vers Discord OAuth2"""
+    discord_oauth_url = (
+        f"https://discord.com/api/oauth2/authorize"
+        f"?client_id={os.getenv('DISCORD_CLIENT_ID')}"
+        f"&redirect_uri={os.getenv('DISCORD_REDIRECT_URI', 'http://localhost:5000/callback')}"
+        f"&response_type=code"
+        f"&scope=identify%20guilds"
+    )
+    return redirect(discord_oauth_url)
+
+@retry_on_locked
+def save_user(user_data, avatar_url, is_owner):
+    """Crée ou met à jour l'utilisateur"""
+    user = User.query.filter_by(discord_id=user_data['id']).first()
+    if not user:
+        user = User(
+            discord_id=user_data['id'],
+            username=user_data['username'],
+            avatar=avatar_url,
+            is_owner=is_owner
+        )
+        db.session.add(user)
+    else:
+        user.username = user_data['username']
+        user.avatar = avatar_url
+        user.last_login = datetime.utcnow()
+    db.session.commit()
+    return user
+
+@main.route('/callback')
+def discord_callback():
+    """Callback après authentification Discord"""
+    code = request.args.get('code')
+
+    if not code:
+        flash("Code d'authentification manquant", 'danger')
+        return redirect(url_for('main.index'))
+
+    try:
+        oauth = discord()
+        # Échanger le code contre un token
+        credentials = oauth.client.exchange_code(code)
+
+        if 'access_token' not in credentials:
+            flash("Erreur d'authentification Discord", 'danger')
+            return redirect(url_for('main.index'))
+
+        access_token = credentials['access_token']
+
+        # Utilisateur et serveurs récupérés en parallèle
+        user_data, guilds = oauth.client.fetch_profile(access_token)
+
+        # Construire l'URL de l'avatar
+        if user_data.get('avatar'):
+            avatar_url = f"https://cdn.discordapp.com/avatars/{user_data['id']}/{user_data['avatar']}.png"
+        else:
+            avatar_url = f"https://cdn.discordapp.com/embed/avatars/{int(user_data.get('discriminator', 0)) % 5}.png"
+
+        # Vérifier si c'est le propriétaire
+        is_owner = (int(user_data['id']) == current_app.config['OWNER_ID'])
+
+        user = save_user(user_data, avatar_url, is_owner)
+        # Nouvel id de session à la connexion : un id imposé avant (fixation) ne sert plus
+        current_app.session_interface.regenerate(session)
+        login_user(user)
+
+        # Serveurs et tokens stockés côté serveur (le refresh token permet
+        # de rafraîchir la liste plus tard sans reconnexion)
+        guild_store().put(
+            user.discord_id, admin_guilds(guilds), access_token,
+            refresh_token=credentials.get('refresh_token'),
+            expires_at=oauth.expires_at(credentials)
+        )
+
+        return redirect(url_for('main.dashboard'))
+
+    except Exception as e:
+        flash(f"Erreur de connexion: {str(e)}", 'danger')
+        return redirect(url_for('main.index'))
+
+@main.route('/dashboard')
+@login_required
+def dashboard():
+    """Dashboard principal de l'utilisateur"""
+    store = guild_store()
+    # Agrégats calculés au rafraîchissement de la liste, pas à chaque page
+    totals = store.stats(current_user.discord_id)
+    guilds, _, _ = store.page(current_user.discord_id, limit=DASHBOARD_GUILDS)
+
+    # Données du bot (tous serveurs confondus) : propriétaire uniquement.
+    # Les trois appels partent en parallèle, la page attend le plus lent.
+    bot = {'stats': None, 'recent_actions': [], 'active_giveaways': []}
+    if current_user.is_owner:
+        api = bot_api()
+        bot = api.fetch_many(
+            stats=api.get_bot_stats,
+            recent_actions=(api.get_moderation_actions, 5),
+            active_giveaways=api.get_active_giveaways
+        )
+
+    # Statistiques
+    stats = {
+        'servers': totals['servers'],
+        'members': totals['members'],
+        'managed_servers': totals['servers'],
+        'configured_servers': totals['configured'],
+        'active_giveaways': len(bot['active_giveaways'])
+    }
+
+    return render_template('dashboard.html',
+                         stats=stats,
+                         guilds=guilds,
+                         user=current_user,
+                         bot_stats=bot['stats'],
+                         recent_actions=bot['recent_actions'],
+                         active_giveaways=bot['active_giveaways'])
+
+@retry_on_locked
+def get_or_create_guild_config(guild_id, guild):
+    """Récupère ou crée la configuration d'un serveur"""
+    config = GuildConfig.query.filter_by(guild_id=guild_id).first()
+    if not config:
+        config = GuildConfig(
+            guild_id=guild_id,
+            guild_name=guild.get('name', 'Inconnu'),
+            guild_icon=f"https://cdn.discordapp.com/icons/{guild_id}/{guild.get('icon')}.png" if guild.get('icon') else None
+        )
+        db.session.add(config)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Créée entre-temps par une autre requête
+            db.session.rollback()
+            config = GuildConfig.query.filter_by(guild_id=guild_id).first()
+    return config
+
+@main.route('/dashboard/guild/<guild_id>')
+@login_required
+def guild_dashboard(guild_id):
+    """Dashboard de configuration pour un serveur spécifique"""
+    guild = guild_store().get(current_user.discord_id, guild_id)
+
+    if not guild:
+        flash("Vous n'avez pas accès à ce serveur", 'danger')
+        return redirect(url_for('main.dashboard'))
+
+    config = get_or_create_guild_config(guild_id, guild)
+
+    return render_template('guild_dashboard.html',
+                         guild=guild,
+                         config=config.to_dict())
+
+@main.route('/moderation')
+@login_required
+def moderation():
+    if not current_user.is_owner:
+        flash("Accès réservé au propriétaire", 'danger')
+        return redirect(url_for('main.dashboard'))
+    return render_template('moderation.html')
+
+@main.route('/giveaways')
+@login_required
+def giveaways():
+    if not current_user.is_owner:
+        flash("Accès réservé au propriétaire", 'danger')
+        return redirect(url_for('main.dashboard'))
+    return render_template('giveaways.html')
+
+@main.route('/logs')
+@login_required
+def logs():
+    if not current_user.is_owner:
+        flash("Accès réservé au propriétaire", 'danger')
+        return redirect(url_for('main.dashboard'))
+    # Logs envoyés par le bot (POST /api/events), lus en base sans appel au bot
+    bot_logs = BotLog.query.order_by(BotLog.created_at.desc(), BotLog.id.desc()).limit(100).all()
+    return render_template('logs.html', bot_logs=bot_logs, profiles=current_app.extensions['profiles'].recent())
+
+@main.route('/logs/profile/<int:profile_id>')
+@login_required
+def profile_report(profile_id):
+    """Rapport d'une requête profilée (?_profile=1)"""
+    if not current_user.is_owner:
+        flash("Accès réservé au propriétaire", 'danger')
+        return redirect(url_for('main.dashboard'))
+    report = current_app.extensions['profiles'].get(profile_id)
+    if report is None:
+        flash("Profil introuvable (remplacé par des profils plus récents)", 'warning')
+        return redirect(url_for('main.logs'))
+    return render_template('profile.html', report=report)
+
+@main.route('/logout')
+@login_required
+def logout():
+    guild_store().delete(current_user.discord_id)
+    logout_user()
+    session.clear()
+    return redirect(url_for('main.index'))
+
+# ==================== API ROUTES ====================
+
+@main.route('/health')
+def health():
+    """État du dashboard et de ses dépendances (pour les opérateurs)"""
+    breaker = bot_api().client.breaker.status()
+    return jsonify({
+        'status': 'ok' if breaker['state'] == 'closed' else 'degraded',
+        'bot_api': breaker
+    })
+
+@main.route('/api/bot/stats')
+@login_required
+def api_bot_stats():
+    if not current_user.is_owner:
+        return jsonify({'error': 'Unauthorized'}), 403
+    return jsonify(bot_api().get_bot_stats())
+
+@main.route('/api/bot/stats/stream')
+@login_required
+def api_bot_stats_stream():
+    """Flux SSE des statistiques : un snapshot puis les deltas.
+
+    La connexion occupe un thread du worker tant que le client reste abonné :
+    workers gthread ou gevent requis (gunicorn.conf.py), pas sync.
+    """
+    if not current_user.is_owner:
+        return jsonify({'error': 'Unauthorized'}), 403
+    broadcaster = current_app.extensions['stats_broadcaster']
+    return Response(sse_events(broadcaster), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@main.route('/api/bot/cache')
+@login_required
+def api_bot_cache():
+    """Compteurs du cache de l'API du bot (hits, misses, valeurs périmées...)"""
+    if not current_user.is_owner:
+        return jsonify({'error': 'Unauthorized'}), 403
+    return jsonify(bot_api().cache.stats())
+
+@main.route('/api/user/guilds')
+@login_required
+def api_user_guilds():
+    """Serveurs de l'utilisateur triés par nom, paginés par curseur.
+
+    q filtre sur le début du nom (sans tenir compte de la casse) ; limit
+    et cursor (valeur next_cursor de la page précédente).
+    """
+    try:
+        cursor = int(request.args.get('cursor', 0))
+        limit = min(int(request.args.get('limit', 50)), USER_GUILDS_MAX_LIMIT)
+        if cursor < 0 or limit < 1:
+            raise ValueError
+    except ValueError:
+        return jsonify({'error': 'Paramètres invalides'}), 400
+
+    store = guild_store()
+    guilds, total, next_cursor = store.page(
+        current_user.discord_id, prefix=request.args.get('q', ''), cursor=cursor, limit=limit
+    )
+    return jsonify({
+        'items': guilds,
+        'total': total,
+        'next_cursor': next_cursor,
+        'stats': store.stats(current_user.discord_id)
+    })
+
+@main.route('/api/guild/<guild_id>/moderation')
+@login_required
+def api_guild_moderation(guild_id):
+    """Historique de modération d'un serveur, paginé par curseur.
+
+    Filtres : action_type, moderator_id, user_id, since, until ; pagination :
+    limit et cursor (valeur next_cursor de la page précédente).
+    """
+    if not current_user.is_owner and not guild_store().get(current_user.discord_id, guild_id):
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    args = request.args
+    try:
+        logs, next_cursor = moderation_page(
+            guild_id,
+            cursor=args.get('cursor'),
+            limit=args.get('limit', 50),
+            action_type=args.get('action_type'),
+            moderator_id=args.get('moderator_id'),
+            user_id=args.get('user_id'),
+            since=args.get('since'),
+            until=args.get('until')
+        )
+    except ValueError:
+        return jsonify({'error': 'Paramètres invalides'}), 400
+
+    return jsonify({
+        'items': [log.to_dict() for log in logs],
+        'next_cursor': next_cursor
+    })
+
+@main.route('/api/guild/<guild_id>/moderation/stats')
+@login_required
+def api_guild_moderation_stats(guild_id):
+    """Actions de modération par heure ou par jour (données de createChart).
+
+    Lecture seule : les agrégats sont tenus à jour par flask update-rollups.
+    """
+    if not current_user.is_owner and not guild_store().get(current_user.discord_id, guild_id):
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    try:
+        return jsonify(moderation_timeseries(
+            guild_id,
+            granularity=request.args.get('granularity', 'day'),
+            since=request.args.get('since'),
+            until=request.args.get('until'),
+            action_type=request.args.get('action_type')
+        ))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400